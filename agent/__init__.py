@@ -1,3 +1,25 @@
 from .agent import *
+from .http_clients import ClientRegistry, clients
+from .memory import ConversationMemory
+from .router import IntentClassifier, IntentRouter
+from .speculation import Speculator
+from .tool_metrics import ToolMetrics, tool_metrics
+from .tracing import Trace, Tracer, start_metrics_server, tracer
 
-__all__ = ['process_query_sync']
+__all__ = [
+    'process_query',
+    'process_query_sync',
+    'process_query_stream',
+    'ClientRegistry',
+    'clients',
+    'ConversationMemory',
+    'IntentClassifier',
+    'IntentRouter',
+    'Speculator',
+    'ToolMetrics',
+    'tool_metrics',
+    'Trace',
+    'Tracer',
+    'start_metrics_server',
+    'tracer',
+]
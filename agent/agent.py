@@ -1,7 +1,18 @@
-from typing import Optional
-from pydantic import BaseModel
+import asyncio
+import re
+import time
+from typing import Callable, List, Optional
+from pydantic import BaseModel, PrivateAttr
 from pydantic_ai import Agent
-from . import gmail_tools
+from pydantic_ai.messages import ArgsDict, ModelResponse, ToolCallPart
+from pydantic_ai.models.openai import OpenAIModel
+from pydantic_core import from_json
+from . import gmail_tools, mailbox_index
+from .http_clients import clients
+from .memory import ConversationMemory
+from .speculation import wait_for_commit
+from .tool_metrics import timed
+from .tracing import span, tracer
 
 class UserQuery(BaseModel):
     """Structure for user queries and responses"""
@@ -13,10 +24,17 @@ class QueryResponse(BaseModel):
     confidence: float
     source: Optional[str] = None
     requires_followup: bool = False  # Add this field
+    # Tools the run called; kept out of the schema the model fills in
+    _tools_called: List[str] = PrivateAttr(default_factory=list)
+
+    @property
+    def tools_called(self) -> List[str]:
+        return self._tools_called
 
 # Initialize the agent with structured input/output
 agent = Agent(
-    'openai:gpt-4o',  # Using GPT-4 model
+    # GPT-4o, on the pooled connections shared with TTS
+    OpenAIModel('gpt-4o', openai_client=clients.async_openai()),
     deps_type=UserQuery,  # Input type
     result_type=QueryResponse,  # Output type
     system_prompt=(
@@ -29,21 +47,124 @@ agent = Agent(
     )
 )
 
-def process_query_sync(question: str) -> QueryResponse:
-    """Synchronous version of process_query"""
+def called_tools(messages) -> List[str]:
+    """Names of the tools called in messages, apart from the final answer"""
+    return [
+        part.tool_name for message in messages if isinstance(message, ModelResponse)
+        for part in message.parts if isinstance(part, ToolCallPart) and part.tool_name != 'final_result'
+    ]
+
+async def process_query(question: str, memory: Optional[ConversationMemory] = None) -> QueryResponse:
+    """Run the agent on the caller's event loop, continuing the conversation in memory if given"""
     query = UserQuery(question=question)
     
-    result = agent.run_sync(
-        question,
-        deps=query
-    )
+    with span('agent'):
+        result = await agent.run(
+            question,
+            deps=query,
+            message_history=memory.history() if memory else None
+        )
+    if memory:
+        # A speculative run only becomes part of the conversation once it is accepted
+        await wait_for_commit()
+        memory.add(result.new_messages())
     
-    return result.data
+    response = result.data
+    response._tools_called = called_tools(result.new_messages())
+    return response
+
+def process_query_sync(question: str, memory: Optional[ConversationMemory] = None) -> QueryResponse:
+    """Synchronous version of process_query"""
+    # Same loop handling as agent.run_sync so the cached HTTP client stays usable
+    return asyncio.get_event_loop().run_until_complete(process_query(question, memory))
+
+class SentenceSegmenter:
+    """Splits a growing answer into complete sentences as they become available"""
+
+    # Sentence-ending punctuation (plus closing quotes/brackets) followed by whitespace
+    BOUNDARY = re.compile(r'[.!?]+["\')\]]*\s+')
+
+    def __init__(self):
+        self.emitted = 0
+
+    def feed(self, text: str) -> List[str]:
+        """Return sentences completed since the last call, given the answer so far"""
+        sentences = []
+        for match in self.BOUNDARY.finditer(text, self.emitted):
+            sentence = text[self.emitted:match.end()].strip()
+            if sentence:
+                sentences.append(sentence)
+            self.emitted = match.end()
+        return sentences
+
+    def flush(self, text: str) -> List[str]:
+        """Return whatever is left once the answer is final"""
+        sentences = self.feed(text)
+        tail = text[self.emitted:].strip()
+        self.emitted = len(text)
+        return sentences + ([tail] if tail else [])
+
+def partial_answer(message: ModelResponse) -> str:
+    """The answer so far from a partially streamed final_result call.
+
+    Parsed leniently rather than validated as a QueryResponse: until the
+    model gets to confidence, the partial arguments are missing a required field.
+    """
+    for part in message.parts:
+        if isinstance(part, ToolCallPart) and part.tool_name == 'final_result':
+            if isinstance(part.args, ArgsDict):
+                answer = part.args.args_dict.get('answer', '')
+            else:
+                answer = from_json(part.args.args_json or '{}', allow_partial='trailing-strings').get('answer', '')
+            return answer if isinstance(answer, str) else ''
+    return ''
+
+async def process_query_stream(
+    question: str,
+    on_sentence: Callable[[str], None],
+    memory: Optional[ConversationMemory] = None
+) -> QueryResponse:
+    """Run the agent with a streamed answer, passing each sentence on as soon as it is complete"""
+    query = UserQuery(question=question)
+    segmenter = SentenceSegmenter()
+    started = time.monotonic()
+    first = True
+
+    def emit(sentence: str):
+        nonlocal first
+        if first:
+            first = False
+            tracer.record('agent.first_sentence', started)
+        on_sentence(sentence)
+
+    with span('agent'):
+        async with agent.run_stream(
+            question,
+            deps=query,
+            message_history=memory.history() if memory else None
+        ) as result:
+            # Partial responses, whose final_result arguments grow as tokens arrive
+            async for message, _ in result.stream_structured(debounce_by=0.05):
+                for sentence in segmenter.feed(partial_answer(message)):
+                    emit(sentence)
+            response = await result.get_data()
+    response._tools_called = called_tools(result.new_messages())
+    if memory:
+        await wait_for_commit()
+        memory.add(result.new_messages())
+
+    for sentence in segmenter.flush(response.answer):
+        emit(sentence)
+    return response
 
-# Register tools from gmail_tools
-agent.tool(gmail_tools.fetch_recent_emails)
-agent.tool(gmail_tools.create_draft_email)
-agent.tool(gmail_tools.send_draft)
+# Register tools; listing and search questions are answered from the local mailbox index.
+# Every call is timed into tool_metrics; tools with side effects are timed once a speculative run is accepted.
+agent.tool(timed(mailbox_index.recent_emails))
+agent.tool(timed(mailbox_index.emails_from))
+agent.tool(timed(mailbox_index.emails_between))
+agent.tool(timed(mailbox_index.unread_email_count))
+agent.tool(timed(gmail_tools.create_draft_email, held=True))
+agent.tool(timed(gmail_tools.send_draft, held=True))
 
 # result = process_query_sync("Create a new email draft to chisholm.craig@gmail.com telling them I'm going to be late")
 # print(result)
\ No newline at end of file
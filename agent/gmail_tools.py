@@ -1,13 +1,50 @@
-from typing import Optional
+from typing import Dict, List, Optional
 from pydantic import BaseModel
 from pydantic_ai import RunContext
+import asyncio
 import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from google_auth_oauthlib.flow import InstalledAppFlow
 from google.auth.transport.requests import Request
+from google_auth_httplib2 import AuthorizedHttp
 from googleapiclient.discovery import build
+from googleapiclient.errors import HttpError
+from googleapiclient.http import BatchHttpRequest
+import httplib2
 import pickle
 import base64
 from email.mime.text import MIMEText
+from .speculation import wait_for_commit
+
+SCOPES = ['https://www.googleapis.com/auth/gmail.modify']
+
+# Gmail accepts up to 100 calls per batch but recommends no more than 50
+BATCH_SIZE = 50
+# Batches sent at once; each worker thread uses its own connection
+BATCH_CONCURRENCY = 4
+# Batch items that are rate limited or hit a server error are tried up to
+# BATCH_ATTEMPTS times in all, waiting BATCH_BACKOFF_SECONDS, then twice that, ...
+BATCH_ATTEMPTS = 4
+BATCH_BACKOFF_SECONDS = 0.5
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+class MessageFetchError(Exception):
+    """Some messages could not be fetched, even after retrying.
+
+    messages holds the ones that were, in the order requested; errors maps
+    each failed message id to its exception.
+    """
+
+    def __init__(self, messages: List[Dict], errors: Dict[str, Exception]):
+        super().__init__(f"{len(errors)} message(s) could not be fetched: {next(iter(errors.values()))}")
+        self.messages = messages
+        self.errors = errors
+
+def is_not_found(error: Exception) -> bool:
+    return isinstance(error, HttpError) and error.resp.status == 404
 
 class EmailMessage(BaseModel):
     """Structure for email messages"""
@@ -17,46 +54,193 @@ class EmailMessage(BaseModel):
     from_email: Optional[str] = None
     draft_id: Optional[str] = None
 
-def get_gmail_service():
-    """Helper function to authenticate and create Gmail service"""
-    SCOPES = ['https://www.googleapis.com/auth/gmail.modify']
-    creds = None
-    
-    if os.path.exists('agent/token.pickle'):
-        with open('agent/token.pickle', 'rb') as token:
-            creds = pickle.load(token)
-    
-    if not creds or not creds.valid:
-        if creds and creds.expired and creds.refresh_token:
-            creds.refresh(Request())
-        else:
-            flow = InstalledAppFlow.from_client_secrets_file(
-                'agent/credentials.json', SCOPES)
-            creds = flow.run_local_server(port=0)
+class GmailClient:
+    """Long-lived Gmail API client shared by every tool call.
+
+    Credentials are loaded once and refreshed under a lock when they expire,
+    the service object is built once, and each thread gets its own
+    keep-alive HTTP connection (httplib2 is not thread-safe).
+    """
+
+    def __init__(
+        self,
+        token_path: str = 'agent/token.pickle',
+        credentials_path: str = 'agent/credentials.json',
+        credentials=None,
+        api_endpoint: Optional[str] = None,
+    ):
+        self.token_path = token_path
+        self.credentials_path = credentials_path
+        self.api_endpoint = api_endpoint
+        self._credentials = credentials
+        self._service = None
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._executor = ThreadPoolExecutor(max_workers=BATCH_CONCURRENCY, thread_name_prefix='gmail')
+
+    def _load_credentials(self):
+        creds = None
+        if os.path.exists(self.token_path):
+            with open(self.token_path, 'rb') as token:
+                creds = pickle.load(token)
         
-        with open('agent/token.pickle', 'wb') as token:
+        if not creds or not creds.valid:
+            if creds and creds.expired and creds.refresh_token:
+                creds.refresh(Request())
+            else:
+                flow = InstalledAppFlow.from_client_secrets_file(
+                    self.credentials_path, SCOPES)
+                creds = flow.run_local_server(port=0)
+            self._save_credentials(creds)
+        return creds
+
+    def _save_credentials(self, creds):
+        with open(self.token_path, 'wb') as token:
             pickle.dump(creds, token)
+
+    @property
+    def credentials(self):
+        with self._lock:
+            if self._credentials is None:
+                self._credentials = self._load_credentials()
+            elif getattr(self._credentials, 'expired', False) and getattr(self._credentials, 'refresh_token', None):
+                self._credentials.refresh(Request())
+                self._save_credentials(self._credentials)
+            return self._credentials
+
+    @property
+    def service(self):
+        credentials = self.credentials
+        with self._lock:
+            if self._service is None:
+                client_options = {'api_endpoint': self.api_endpoint} if self.api_endpoint else None
+                self._service = build(
+                    'gmail', 'v1',
+                    credentials=credentials,
+                    client_options=client_options,
+                    static_discovery=True
+                )
+            return self._service
+
+    def _http(self):
+        """Per-thread authorized connection, reused across calls on that thread"""
+        http = getattr(self._local, 'http', None)
+        if http is None:
+            http = self._local.http = AuthorizedHttp(self.credentials, http=httplib2.Http())
+        return http
+
+    def execute(self, request):
+        """Execute a request built from self.service on this thread's connection"""
+        self.credentials  # refresh up front if expired
+        return request.execute(http=self._http())
+
+    def _new_batch(self, callback):
+        if self.api_endpoint:
+            # The discovery document's batch URI ignores api_endpoint overrides
+            return BatchHttpRequest(callback=callback, batch_uri=self.api_endpoint.rstrip('/') + '/batch/gmail/v1')
+        return self.service.new_batch_http_request(callback=callback)
+
+    def get_messages(self, message_ids: List[str], **params) -> List[Dict]:
+        """Fetch many messages with batched requests, returned in the order given.
+
+        Gmail reports rate limits and server errors per item inside a batch
+        response; those items are retried with exponential backoff. Messages
+        that no longer exist (404) are left out. If any other item still
+        fails, MessageFetchError is raised with everything that was fetched.
+        """
+        users = self.service.users()
+        results = {}
+        errors = {}
+        pending = list(message_ids)
+        for attempt in range(BATCH_ATTEMPTS):
+            if attempt:
+                # Jittered so concurrent callers don't retry in lockstep
+                time.sleep(BATCH_BACKOFF_SECONDS * 2 ** (attempt - 1) * random.uniform(1.0, 1.5))
+            failed = []
+
+            def on_response(request_id, response, exception):
+                if exception is None:
+                    results[request_id] = response
+                    errors.pop(request_id, None)
+                else:
+                    errors[request_id] = exception
+                    failed.append(request_id)
+
+            batches = []
+            for start in range(0, len(pending), BATCH_SIZE):
+                batch = self._new_batch(on_response)
+                for message_id in pending[start:start + BATCH_SIZE]:
+                    batch.add(users.messages().get(userId='me', id=message_id, **params), request_id=message_id)
+                batches.append(batch)
+            if len(batches) == 1:
+                self.execute(batches[0])
+            else:
+                list(self._executor.map(self.execute, batches))
+            pending = [
+                message_id for message_id in failed
+                if isinstance(errors[message_id], HttpError) and errors[message_id].resp.status in RETRY_STATUSES
+            ]
+            if not pending:
+                break
+        messages = [results[message_id] for message_id in message_ids if message_id in results]
+        errors = {message_id: error for message_id, error in errors.items() if not is_not_found(error)}
+        if errors:
+            raise MessageFetchError(messages, errors)
+        return messages
+
+_client = None
+_client_lock = threading.Lock()
+
+def get_gmail_client() -> GmailClient:
+    """Return the process-wide Gmail client, creating it on first use"""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = GmailClient(api_endpoint=os.getenv('GMAIL_API_ENDPOINT'))
+        return _client
+
+def get_gmail_service():
+    """Helper function returning the shared Gmail service"""
+    return get_gmail_client().service
+
+def header_value(message: Dict, name: str, default: str = '') -> str:
+    """Value of the first header called name in a message payload"""
+    for header in message.get('payload', {}).get('headers', []):
+        if header['name'].lower() == name.lower():
+            return header['value']
+    return default
+
+def list_recent_emails(client: GmailClient, max_results: int = 20) -> List[Dict]:
+    """Subject/From metadata for the newest inbox messages, fetched in batches (see GmailClient.get_messages)"""
+    service = client.service
+    results = client.execute(service.users().messages().list(
+        userId='me', maxResults=max_results, labelIds=['INBOX'], fields='messages/id'
+    ))
     
-    return build('gmail', 'v1', credentials=creds)
+    ids = [msg['id'] for msg in results.get('messages', [])]
+    # Only the two headers are needed, not the full message payload
+    return client.get_messages(
+        ids,
+        format='metadata',
+        metadataHeaders=['Subject', 'From'],
+        fields='id,payload/headers'
+    )
 
 async def fetch_recent_emails(ctx: RunContext, max_results: int = 20) -> str:
     """Fetch recent emails from Gmail"""
-    service = get_gmail_service()
-    results = service.users().messages().list(
-        userId='me', maxResults=max_results, labelIds=['INBOX']
-    ).execute()
-    
+    try:
+        fetched = await asyncio.to_thread(list_recent_emails, get_gmail_client(), max_results)
+        missing = 0
+    except MessageFetchError as e:
+        fetched, missing = e.messages, len(e.errors)
     messages = []
-    for msg in results.get('messages', []):
-        message = service.users().messages().get(
-            userId='me', id=msg['id']
-        ).execute()
-        
-        headers = message['payload']['headers']
-        subject = next(h['value'] for h in headers if h['name'] == 'Subject')
-        sender = next(h['value'] for h in headers if h['name'] == 'From')
+    for message in fetched:
+        subject = header_value(message, 'Subject', '(no subject)')
+        sender = header_value(message, 'From', '(unknown sender)')
         
         messages.append(f"From: {sender}\nSubject: {subject}\n---")
+    if missing:
+        messages.append(f"({missing} more email{'s' if missing != 1 else ''} could not be loaded from Gmail)")
     
     return "\n\n".join(messages)
 
@@ -67,7 +251,8 @@ async def create_draft_email(
     to: str
 ) -> str:
     """Create a draft email"""
-    service = get_gmail_service()
+    await wait_for_commit()
+    client = get_gmail_client()
     
     message = EmailMessage(
         subject=subject,
@@ -81,26 +266,28 @@ async def create_draft_email(
     
     encoded_message = base64.urlsafe_b64encode(mime_message.as_bytes()).decode()
     
-    draft = service.users().drafts().create(
+    # googleapiclient blocks, so requests run on a worker thread and tool calls can overlap
+    draft = await asyncio.to_thread(lambda: client.execute(client.service.users().drafts().create(
         userId='me',
         body={
             'message': {
                 'raw': encoded_message
             }
         }
-    ).execute()
+    )))
     
     return f"Draft created with ID: {draft['id']}"
 
 async def send_draft(ctx: RunContext, draft_id: str) -> str:
     """Send an existing draft email"""
-    service = get_gmail_service()
+    await wait_for_commit()
+    client = get_gmail_client()
     
     try:
-        service.users().drafts().send(
+        await asyncio.to_thread(lambda: client.execute(client.service.users().drafts().send(
             userId='me',
             body={'id': draft_id}
-        ).execute()
+        )))
         return f"Draft {draft_id} sent successfully"
     except Exception as e:
         return f"Error sending draft: {str(e)}"
\ No newline at end of file
@@ -0,0 +1,114 @@
+import asyncio
+import os
+import threading
+from typing import Dict, Optional, Tuple
+
+import httpx
+from openai import AsyncOpenAI, OpenAI
+
+from .tracing import span
+
+
+def http2_available() -> bool:
+    """HTTP/2 needs the optional h2 package (pip install 'httpx[http2]')"""
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+class ClientRegistry:
+    """Long-lived OpenAI clients shared by everything that calls the API.
+
+    TTS runs on the speech queue's worker threads and uses the sync client;
+    the agent runs on the event loop and uses the async one. Each kind gets
+    one client per base URL, on a connection pool that keeps idle connections
+    for keepalive_seconds (httpx closes them after 5 s, so every turn used to
+    start with a new connection and TLS handshake) and that speaks HTTP/2 when
+    h2 is installed, so concurrent requests share one connection.
+    keep_warm() pings every pool so its connection is open by the time a turn
+    needs it.
+    """
+
+    def __init__(self, keepalive_seconds: Optional[float] = None, max_connections: int = 8, http2: Optional[bool] = None):
+        if keepalive_seconds is None:
+            keepalive_seconds = float(os.getenv('HTTP_KEEPALIVE_SECONDS', '120'))
+        self.keepalive_seconds = keepalive_seconds
+        self.max_connections = max_connections
+        self.http2 = http2_available() if http2 is None else http2
+        self.pings = 0
+        self.ping_errors = 0
+        self._sync: Dict[Optional[str], Tuple[OpenAI, httpx.Client]] = {}
+        self._async: Dict[Optional[str], Tuple[AsyncOpenAI, httpx.AsyncClient]] = {}
+        self._lock = threading.Lock()
+        self._warming = None
+
+    def _pool_options(self) -> dict:
+        return {
+            # Same timeouts as the OpenAI SDK's own client
+            'timeout': httpx.Timeout(600.0, connect=5.0),
+            'limits': httpx.Limits(
+                max_connections=self.max_connections,
+                max_keepalive_connections=self.max_connections,
+                keepalive_expiry=self.keepalive_seconds
+            ),
+            'http2': self.http2,
+        }
+
+    def openai(self, base_url: Optional[str] = None, api_key: Optional[str] = None) -> OpenAI:
+        """The shared sync client for base_url (default: OPENAI_BASE_URL or the OpenAI API)"""
+        with self._lock:
+            if base_url not in self._sync:
+                http_client = httpx.Client(**self._pool_options())
+                self._sync[base_url] = (OpenAI(base_url=base_url, api_key=api_key, http_client=http_client), http_client)
+            return self._sync[base_url][0]
+
+    def async_openai(self, base_url: Optional[str] = None, api_key: Optional[str] = None) -> AsyncOpenAI:
+        """The shared async client for base_url, for use on the event loop"""
+        with self._lock:
+            if base_url not in self._async:
+                http_client = httpx.AsyncClient(**self._pool_options())
+                self._async[base_url] = (
+                    AsyncOpenAI(base_url=base_url, api_key=api_key, http_client=http_client), http_client
+                )
+            return self._async[base_url][0]
+
+    def _ping_sync(self, client: OpenAI, http_client: httpx.Client):
+        try:
+            http_client.head(str(client.base_url))
+        except httpx.HTTPError:
+            self.ping_errors += 1
+
+    async def _ping_async(self, client: AsyncOpenAI, http_client: httpx.AsyncClient):
+        try:
+            await http_client.head(str(client.base_url))
+        except httpx.HTTPError:
+            self.ping_errors += 1
+
+    async def _keep_warm(self):
+        with self._lock:
+            sync_clients = list(self._sync.values())
+            async_clients = list(self._async.values())
+        with span('http.keep_warm'):
+            await asyncio.gather(
+                *(asyncio.to_thread(self._ping_sync, *clients) for clients in sync_clients),
+                *(self._ping_async(*clients) for clients in async_clients)
+            )
+        self.pings += 1
+
+    def keep_warm(self) -> asyncio.Task:
+        """Ping every pool in the background, on the running loop.
+
+        A HEAD on the API's base URL reuses the pooled connection if it is
+        still open and opens (and handshakes) a new one if the server has
+        dropped it, without sending credentials. A ping already in flight
+        is returned instead of starting another.
+        """
+        if self._warming is None or self._warming.done():
+            self._warming = asyncio.create_task(self._keep_warm())
+        return self._warming
+
+
+# Process-wide registry used by the agent and, through va.py, by TTS
+clients = ClientRegistry()
@@ -0,0 +1,296 @@
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional
+
+from googleapiclient.errors import HttpError
+from pydantic_ai import RunContext
+
+from .gmail_tools import GmailClient, MessageFetchError, get_gmail_client, header_value
+
+# Metadata kept per message; everything the query tools need, no bodies
+METADATA_FIELDS = 'id,threadId,labelIds,snippet,internalDate,historyId,payload/headers'
+METADATA_HEADERS = ['From', 'Subject']
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS messages (
+    id TEXT PRIMARY KEY,
+    thread_id TEXT,
+    sender TEXT,
+    subject TEXT,
+    date INTEGER,
+    snippet TEXT,
+    labels TEXT
+);
+CREATE INDEX IF NOT EXISTS messages_date ON messages (date);
+CREATE INDEX IF NOT EXISTS messages_sender ON messages (sender COLLATE NOCASE);
+CREATE TABLE IF NOT EXISTS state (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+class MailboxIndex:
+    """Local SQLite copy of mailbox metadata, kept current with Gmail's history API.
+
+    The first sync lists the newest full_sync_limit messages and records the
+    mailbox historyId. Later syncs only ask users.history.list for changes
+    since that id and refetch metadata for the messages that changed, so an
+    unchanged mailbox costs a single request. If Gmail no longer has history
+    that far back (404), the index is rebuilt with a full sync. If some
+    messages cannot be fetched, whatever did arrive is stored but the
+    historyId is not advanced, so the next sync asks for the same changes.
+
+    Labels are stored space-delimited with a leading and trailing space so a
+    label can be matched with LIKE '% UNREAD %'.
+    """
+
+    def __init__(
+        self,
+        client: GmailClient,
+        path: str = 'agent/mailbox.db',
+        full_sync_limit: int = 1000,
+        max_age_seconds: float = 30.0,
+    ):
+        self.client = client
+        self.full_sync_limit = full_sync_limit
+        self.max_age_seconds = max_age_seconds
+        self.last_sync = None  # monotonic time of the last successful sync
+        self._lock = threading.RLock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        self._db.executescript(SCHEMA)
+
+    @property
+    def history_id(self) -> Optional[str]:
+        row = self._db.execute("SELECT value FROM state WHERE key = 'history_id'").fetchone()
+        return row['value'] if row else None
+
+    def sync(self) -> int:
+        """Bring the index up to date; returns the number of messages written or removed"""
+        with self._lock:
+            history_id = self.history_id
+            try:
+                if history_id is None:
+                    changed = self.full_sync()
+                else:
+                    try:
+                        changed = self._sync_history(history_id)
+                    except HttpError as e:
+                        if e.resp.status != 404:
+                            raise
+                        print("Mailbox history expired, rebuilding the index")
+                        changed = self.full_sync()
+            except MessageFetchError as e:
+                # What was fetched is stored, but the history id stays put and the index is
+                # not marked fresh, so the next query syncs these changes again
+                print(f"Mailbox sync incomplete, {len(e.errors)} message(s) could not be fetched; will retry")
+                return len(e.messages)
+            self.last_sync = time.monotonic()
+            return changed
+
+    def sync_if_stale(self) -> int:
+        """Sync unless the last sync is more recent than max_age_seconds"""
+        with self._lock:
+            if self.last_sync is not None and time.monotonic() - self.last_sync < self.max_age_seconds:
+                return 0
+            return self.sync()
+
+    def full_sync(self) -> int:
+        users = self.client.service.users()
+        # Take the history id first so changes made during the listing are picked up next time
+        history_id = self.client.execute(users.getProfile(userId='me', fields='historyId'))['historyId']
+        ids = []
+        page_token = None
+        while len(ids) < self.full_sync_limit:
+            response = self.client.execute(users.messages().list(
+                userId='me',
+                maxResults=min(500, self.full_sync_limit - len(ids)),
+                pageToken=page_token,
+                fields='messages/id,nextPageToken'
+            ))
+            ids.extend(message['id'] for message in response.get('messages', []))
+            page_token = response.get('nextPageToken')
+            if not page_token:
+                break
+
+        try:
+            messages = self._fetch(ids)
+        except MessageFetchError as e:
+            # Keep the old contents alongside what did arrive; with no new history id the next sync rebuilds
+            with self._lock, self._db:
+                self._store(e.messages)
+            raise
+        with self._lock, self._db:
+            self._db.execute("DELETE FROM messages")
+            self._store(messages)
+            self._set_history_id(history_id)
+        return len(messages)
+
+    def _sync_history(self, history_id: str) -> int:
+        users = self.client.service.users()
+        changed = set()
+        deleted = set()
+        page_token = None
+        while True:
+            response = self.client.execute(users.history().list(
+                userId='me',
+                startHistoryId=history_id,
+                historyTypes=['messageAdded', 'messageDeleted', 'labelAdded', 'labelRemoved'],
+                pageToken=page_token,
+                maxResults=500
+            ))
+            for record in response.get('history', []):
+                for kind in ('messagesAdded', 'labelsAdded', 'labelsRemoved'):
+                    for change in record.get(kind, []):
+                        changed.add(change['message']['id'])
+                        deleted.discard(change['message']['id'])
+                for change in record.get('messagesDeleted', []):
+                    deleted.add(change['message']['id'])
+                    changed.discard(change['message']['id'])
+            page_token = response.get('nextPageToken')
+            if not page_token:
+                break
+
+        failed = None
+        try:
+            messages = self._fetch(sorted(changed))
+        except MessageFetchError as e:
+            messages, failed = e.messages, e
+        # Changed messages that are gone by the time they are fetched (404) leave the index too
+        deleted |= changed - {message['id'] for message in messages} - set(failed.errors if failed else ())
+        with self._lock, self._db:
+            self._store(messages)
+            self._db.executemany("DELETE FROM messages WHERE id = ?", [(message_id,) for message_id in deleted])
+            if failed is None:
+                self._set_history_id(response['historyId'])
+        if failed is not None:
+            raise failed
+        return len(messages) + len(deleted)
+
+    def _fetch(self, ids: List[str]) -> List[Dict]:
+        return self.client.get_messages(
+            ids,
+            format='metadata',
+            metadataHeaders=METADATA_HEADERS,
+            fields=METADATA_FIELDS
+        )
+
+    def _store(self, messages: List[Dict]):
+        self._db.executemany(
+            "INSERT OR REPLACE INTO messages (id, thread_id, sender, subject, date, snippet, labels) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            [
+                (
+                    message['id'],
+                    message.get('threadId'),
+                    header_value(message, 'From'),
+                    header_value(message, 'Subject'),
+                    int(message.get('internalDate', 0)),
+                    message.get('snippet', ''),
+                    f" {' '.join(message.get('labelIds', []))} ",
+                )
+                for message in messages
+            ]
+        )
+
+    def _set_history_id(self, history_id: str):
+        self._db.execute("INSERT OR REPLACE INTO state (key, value) VALUES ('history_id', ?)", (str(history_id),))
+
+    def _query(self, where: str, params: tuple, limit: int) -> List[Dict]:
+        with self._lock:
+            rows = self._db.execute(
+                f"SELECT * FROM messages WHERE {where} ORDER BY date DESC LIMIT ?",
+                params + (limit,)
+            ).fetchall()
+        return [dict(row, labels=row['labels'].split()) for row in rows]
+
+    def recent(self, label: str = 'INBOX', limit: int = 20) -> List[Dict]:
+        """Newest messages carrying label"""
+        return self._query("labels LIKE ?", (f"% {label} %",), limit)
+
+    def from_sender(self, sender: str, limit: int = 20, label: Optional[str] = 'INBOX') -> List[Dict]:
+        """Newest messages carrying label (None for any) whose From header contains sender (name or address)"""
+        return self._query("sender LIKE ? AND labels LIKE ?", (f"%{sender}%", self._label_pattern(label)), limit)
+
+    def between(self, start_ms: int, end_ms: int, limit: int = 50, label: Optional[str] = 'INBOX') -> List[Dict]:
+        """Messages carrying label (None for any) received in [start_ms, end_ms), as epoch milliseconds"""
+        return self._query(
+            "date >= ? AND date < ? AND labels LIKE ?", (start_ms, end_ms, self._label_pattern(label)), limit
+        )
+
+    @staticmethod
+    def _label_pattern(label: Optional[str]) -> str:
+        # The index holds every label, sent mail and drafts included; received mail is INBOX
+        return '%' if label is None else f"% {label} %"
+
+    def unread_count(self, label: str = 'INBOX') -> int:
+        with self._lock:
+            return self._db.execute(
+                "SELECT COUNT(*) FROM messages WHERE labels LIKE ? AND labels LIKE '% UNREAD %'",
+                (f"% {label} %",)
+            ).fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+_index = None
+_index_lock = threading.Lock()
+
+def get_mailbox_index() -> MailboxIndex:
+    """Return the process-wide mailbox index, creating it on first use"""
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = MailboxIndex(get_gmail_client(), os.getenv('MAILBOX_INDEX_PATH', 'agent/mailbox.db'))
+        return _index
+
+def _synced_index() -> MailboxIndex:
+    # Syncing and querying block on the network and the index lock, so tools call this via asyncio.to_thread
+    index = get_mailbox_index()
+    index.sync_if_stale()
+    return index
+
+def _format(messages: List[Dict]) -> str:
+    if not messages:
+        return "No matching emails."
+    return "\n\n".join(
+        f"From: {message['sender'] or '(unknown sender)'}\n"
+        f"Subject: {message['subject'] or '(no subject)'}\n"
+        f"Date: {datetime.fromtimestamp(message['date'] / 1000):%Y-%m-%d %H:%M}"
+        f"{' (unread)' if 'UNREAD' in message['labels'] else ''}\n---"
+        for message in messages
+    )
+
+def _epoch_ms(day: date) -> int:
+    return int(datetime.combine(day, datetime.min.time()).timestamp() * 1000)
+
+async def recent_emails(ctx: RunContext, max_results: int = 20) -> str:
+    """List the most recent emails in the inbox"""
+    return _format(await asyncio.to_thread(lambda: _synced_index().recent('INBOX', max_results)))
+
+async def emails_from(ctx: RunContext, sender: str, max_results: int = 20) -> str:
+    """Find recent emails in the inbox from a sender, matched against their name or address"""
+    return _format(await asyncio.to_thread(lambda: _synced_index().from_sender(sender, max_results)))
+
+async def emails_between(ctx: RunContext, start_date: str, end_date: str, max_results: int = 50) -> str:
+    """Find emails received in the inbox between two dates (YYYY-MM-DD, both inclusive)"""
+    try:
+        start = date.fromisoformat(start_date)
+        end = date.fromisoformat(end_date) + timedelta(days=1)
+    except ValueError as e:
+        return f"Invalid date: {e}"
+    return _format(await asyncio.to_thread(
+        lambda: _synced_index().between(_epoch_ms(start), _epoch_ms(end), max_results)
+    ))
+
+async def unread_email_count(ctx: RunContext) -> str:
+    """Count the unread emails in the inbox"""
+    count = await asyncio.to_thread(lambda: _synced_index().unread_count('INBOX'))
+    return f"{count} unread email{'s' if count != 1 else ''} in the inbox"
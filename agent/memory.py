@@ -0,0 +1,168 @@
+import json
+import threading
+import time
+from dataclasses import replace
+from typing import List, Optional
+
+from pydantic_ai.messages import (
+    ModelMessage,
+    ModelRequest,
+    ModelResponse,
+    SystemPromptPart,
+    TextPart,
+    ToolCallPart,
+    ToolReturnPart,
+    UserPromptPart,
+)
+
+# Rough OpenAI tokenization for English text; good enough for budgeting
+CHARS_PER_TOKEN = 4
+
+
+def part_text(part) -> str:
+    if isinstance(part, ToolCallPart):
+        return part.tool_name + part.args_as_json_str()
+    content = getattr(part, 'content', '')
+    return content if isinstance(content, str) else json.dumps(content, default=str)
+
+
+def estimate_tokens(messages: List[ModelMessage]) -> int:
+    return sum(len(part_text(part)) for message in messages for part in message.parts) // CHARS_PER_TOKEN
+
+
+def _is_turn_start(message: ModelMessage) -> bool:
+    return isinstance(message, ModelRequest) and any(isinstance(part, UserPromptPart) for part in message.parts)
+
+
+class ConversationMemory:
+    """Message history for one conversation, kept within a token budget.
+
+    After every agent run its new messages are appended with large tool
+    results cut down to max_tool_chars (an inbox listing is only useful to
+    the turn that asked for it). While the history is over max_tokens the
+    oldest turn is evicted whole, so tool calls always keep their returns.
+    Evicted turns are folded into a short extractive summary, held in the
+    system prompt, of what was asked, what was answered and any short tool
+    results (such as draft IDs), so follow-ups can still refer to them.
+
+    The conversation starts over after idle_seconds without a turn.
+    """
+
+    def __init__(
+        self,
+        max_tokens: int = 2000,
+        max_tool_chars: int = 1200,
+        summary_tokens: int = 300,
+        idle_seconds: float = 600.0,
+    ):
+        self.max_tokens = max_tokens
+        self.max_tool_chars = max_tool_chars
+        self.summary_tokens = summary_tokens
+        self.idle_seconds = idle_seconds
+        self.evicted_turns = 0
+        self._messages: List[ModelMessage] = []
+        self._summary: List[str] = []
+        self._last_turn = None
+        self._lock = threading.Lock()
+
+    def _expire(self):
+        if self._last_turn is not None and time.monotonic() - self._last_turn > self.idle_seconds:
+            self._messages = []
+            self._summary = []
+            self._last_turn = None
+
+    @property
+    def empty(self) -> bool:
+        """Whether the next question starts a new conversation"""
+        with self._lock:
+            self._expire()
+            return not self._messages
+
+    def history(self) -> Optional[List[ModelMessage]]:
+        """Messages to pass as message_history, or None to start fresh"""
+        with self._lock:
+            self._expire()
+            if not self._messages:
+                return None
+            if not self._summary:
+                return list(self._messages)
+            summary = SystemPromptPart("Earlier in this conversation:\n" + "\n".join(self._summary))
+            first = self._messages[0]
+            # Keep the summary right after the original system prompt
+            system = [part for part in first.parts if isinstance(part, SystemPromptPart)]
+            rest = [part for part in first.parts if not isinstance(part, SystemPromptPart)]
+            return [replace(first, parts=[*system, summary, *rest])] + self._messages[1:]
+
+    def add(self, messages: List[ModelMessage]):
+        """Append the new messages of an agent run, then compact and evict to stay in budget"""
+        with self._lock:
+            self._expire()
+            self._messages.extend(self._compact(message) for message in messages)
+            self._last_turn = time.monotonic()
+            self._enforce_budget()
+
+    def record(self, question: str, answer: str):
+        """Add an exchange answered without the agent, so follow-ups can refer to it"""
+        with self._lock:
+            self._expire()
+            if not self._messages:
+                # Without a first request holding the system prompt the agent would run without one
+                return
+            self._messages.append(ModelRequest([UserPromptPart(question)]))
+            self._messages.append(ModelResponse([TextPart(answer)]))
+            self._last_turn = time.monotonic()
+            self._enforce_budget()
+
+    def clear(self):
+        with self._lock:
+            self._messages = []
+            self._summary = []
+            self._last_turn = None
+
+    def tokens(self) -> int:
+        with self._lock:
+            return estimate_tokens(self._messages) + sum(len(line) for line in self._summary) // CHARS_PER_TOKEN
+
+    def _compact(self, message: ModelMessage) -> ModelMessage:
+        if not isinstance(message, ModelRequest):
+            return message
+        parts = []
+        for part in message.parts:
+            if isinstance(part, ToolReturnPart):
+                content = part_text(part)
+                if len(content) > self.max_tool_chars:
+                    cut = len(content) - self.max_tool_chars
+                    part = replace(part, content=f"{content[:self.max_tool_chars]}\n[{cut} more characters omitted]")
+            parts.append(part)
+        return replace(message, parts=parts)
+
+    def _enforce_budget(self):
+        while estimate_tokens(self._messages) > self.max_tokens:
+            starts = [i for i, message in enumerate(self._messages) if _is_turn_start(message)]
+            if len(starts) < 2:
+                break  # never evict the turn in progress
+            end = starts[1]
+            self._summarize(self._messages[:end])
+            # The first request also carries the system prompt; keep that part
+            system = [part for part in self._messages[0].parts if isinstance(part, SystemPromptPart)]
+            next_turn = self._messages[end]
+            self._messages = [replace(next_turn, parts=[*system, *next_turn.parts])] + self._messages[end + 1:]
+            self.evicted_turns += 1
+
+    def _summarize(self, turn: List[ModelMessage]):
+        for message in turn:
+            for part in message.parts:
+                if isinstance(part, UserPromptPart):
+                    self._summary.append(f"User: {part.content[:200]}")
+                elif isinstance(part, ToolCallPart) and part.tool_name == 'final_result':
+                    answer = part.args_as_dict().get('answer', '')
+                    self._summary.append(f"Assistant: {answer[:200]}")
+                elif isinstance(part, TextPart) and part.content:
+                    self._summary.append(f"Assistant: {part.content[:200]}")
+                elif isinstance(part, ToolReturnPart) and part.tool_name != 'final_result':
+                    content = part_text(part)
+                    if len(content) <= 120:
+                        self._summary.append(f"{part.tool_name} returned: {content}")
+        # Oldest summary lines go first when the summary itself is over budget
+        while sum(len(line) for line in self._summary) // CHARS_PER_TOKEN > self.summary_tokens:
+            self._summary.pop(0)
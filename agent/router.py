@@ -0,0 +1,224 @@
+import re
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .agent import QueryResponse, SentenceSegmenter
+from .memory import ConversationMemory
+
+# Leading/trailing filler that doesn't change what is being asked
+FILLER = re.compile(r"^(?:(?:hey|ok(?:ay)?|so|um+|uh+|please|can you|could you|would you|tell me)\s+)+|(?:\s+please)+$")
+# Questions that ask the agent to do something are never answered from the cache
+ACTION_WORDS = re.compile(r"\b(?:send|draft|write|create|compose|reply|forward|delete|archive|mark|remind|schedule)\b")
+
+
+def normalize(text: str) -> str:
+    """Lowercase, strip punctuation and filler so near-identical phrasings compare equal"""
+    text = re.sub(r"[^\w\s']", ' ', text.lower())
+    text = re.sub(r"\s+", ' ', text).strip()
+    return FILLER.sub('', text).strip()
+
+
+# Words whose presence doesn't change the question, ignored when matching cached answers
+STOPWORDS = {'a', 'an', 'the', 'is', 'are', 'am', 'do', 'does', 'just', 'please', 'again'}
+
+
+def cache_key(text: str) -> str:
+    """Content words of text in order; questions with the same key are near-identical"""
+    text = re.sub(r"\b(what|who|how|where|when|that|it)'s\b", r"\1 is", normalize(text))
+    return ' '.join(word for word in text.split() if word not in STOPWORDS)
+
+
+# Built-in answers use the machine's local time; in Docker that is UTC unless TZ is set (see docker-compose.yaml)
+def _time_answer(now: datetime) -> str:
+    return f"It's {now:%I:%M %p}.".replace("It's 0", "It's ")
+
+
+def _date_answer(now: datetime) -> str:
+    return f"Today is {now:%A, %B} {now.day}."
+
+
+# name -> (pattern on normalized text, answer builder); an empty answer means say nothing
+INTENTS: Dict[str, Tuple[re.Pattern, Callable[[datetime], str]]] = {
+    'time': (re.compile(r"^(?:what(?:'s| is)? the time(?: now)?|what time is it(?: now)?|time)$"), _time_answer),
+    'date': (
+        re.compile(r"^(?:what(?:'s| is)? (?:the date|today'?s date)(?: today)?|what day is (?:it|today)(?: today)?)$"),
+        _date_answer
+    ),
+    'stop': (re.compile(r"^(?:stop|cancel|never ?mind|forget it|that's all|nothing|be quiet|shut up)$"), lambda now: ''),
+    'thanks': (re.compile(r"^(?:thanks?|thank you)(?: (?:so|very) much)?$"), lambda now: "You're welcome."),
+}
+
+# Example utterances per intent for the optional classifier
+EXAMPLES: Dict[str, List[str]] = {
+    'time': ["what time is it", "do you know what time it is", "what's the current time", "got the time",
+             "how late is it", "tell me the time"],
+    'date': ["what's the date", "what day is it today", "what is today's date", "which day of the week is it",
+             "what's the date today"],
+    'stop': ["stop", "cancel that", "never mind", "forget about it", "stop talking", "that's enough", "cancel"],
+    'thanks': ["thank you", "thanks a lot", "cheers", "thanks that's great", "much appreciated"],
+}
+
+
+# Words that can be added to any built-in intent without changing what is asked
+NEUTRAL_WORDS = {'a', 'an', 'the', 'is', 'it', 'me', 'you', 'now', 'right', 'just', 'again', 'currently', 'exactly'}
+
+
+class IntentClassifier:
+    """Tiny bag-of-words classifier for built-in intents, cheap enough to run on every turn.
+
+    Utterances are embedded as hashed unigram+bigram counts; an utterance is
+    assigned the intent of the most similar example (cosine) if that
+    similarity reaches threshold and it uses no words outside that intent's
+    examples and NEUTRAL_WORDS, otherwise None. "what time is it in tokyo"
+    is close to "what time is it" but is not a question the local clock answers.
+    """
+
+    def __init__(self, examples: Dict[str, List[str]] = EXAMPLES, threshold: float = 0.75, dimensions: int = 512):
+        self.threshold = threshold
+        self.dimensions = dimensions
+        self.labels = [intent for intent, phrases in examples.items() for _ in phrases]
+        self.matrix = np.stack([self.embed(phrase) for phrases in examples.values() for phrase in phrases])
+        self.vocabulary = {
+            intent: {word for phrase in phrases for word in normalize(phrase).split()} | NEUTRAL_WORDS
+            for intent, phrases in examples.items()
+        }
+
+    def embed(self, text: str) -> np.ndarray:
+        words = normalize(text).split()
+        vector = np.zeros(self.dimensions, dtype=np.float32)
+        for feature in words + [f"{a} {b}" for a, b in zip(words, words[1:])]:
+            vector[hash(feature) % self.dimensions] += 1.0
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def classify(self, text: str) -> Tuple[Optional[str], float]:
+        scores = self.matrix @ self.embed(text)
+        best = int(np.argmax(scores))
+        score = float(scores[best])
+        label = self.labels[best]
+        if score < self.threshold or not set(normalize(text).split()) <= self.vocabulary[label]:
+            return None, score
+        return label, score
+
+
+class IntentRouter:
+    """Answers what it can locally and only sends the rest to the LLM agent.
+
+    Built-in intents (time, date, stop, thanks) are matched by rules and, if
+    a classifier is given, by the classifier. Agent answers are cached for
+    ttl_seconds and served again for the same or a near-identical question
+    (same content words after dropping filler, punctuation and contractions),
+    except for follow-up questions, answers that called a tool (they read
+    live mail) and requests that ask the agent to act (send, draft, ...).
+    Fuzzy matching is deliberately avoided: "2 plus 3" and "2 plus 4" are
+    near-identical as strings but not as questions.
+
+    With a conversation memory, only answers to questions that opened a
+    conversation are cached (later ones may depend on context), and local
+    answers are recorded so follow-ups can refer to them.
+    """
+
+    def __init__(
+        self,
+        run_agent: Callable[[str, Callable[[str], None]], Awaitable[QueryResponse]],
+        ttl_seconds: float = 300.0,
+        max_entries: int = 128,
+        classifier: Optional[IntentClassifier] = None,
+        memory: Optional[ConversationMemory] = None,
+    ):
+        self.run_agent = run_agent
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.classifier = classifier
+        self.memory = memory
+        self.turns = 0
+        self.intent_hits = 0
+        self.cache_hits = 0
+        self.saved_seconds = 0.0
+        self.agent_seconds = None  # moving average of agent latency, the time a local answer saves
+        self.last_source = None
+        self._cache = OrderedDict()  # cache_key(question) -> (expires at, response)
+
+    def match_intent(self, text: str) -> Optional[str]:
+        normalized = normalize(text)
+        for name, (pattern, _) in INTENTS.items():
+            if pattern.match(normalized):
+                return name
+        if self.classifier is not None:
+            return self.classifier.classify(normalized)[0]
+        return None
+
+    def is_local(self, text: str) -> bool:
+        """Whether text would be answered without the agent"""
+        return self.match_intent(text) is not None or self.lookup(text) is not None
+
+    def lookup(self, text: str, now: float = None) -> Optional[QueryResponse]:
+        """Cached response for text or a near-identical question, if still fresh"""
+        now = time.monotonic() if now is None else now
+        for key in [key for key, (expires, _) in self._cache.items() if expires <= now]:
+            del self._cache[key]
+        key = cache_key(text)
+        if key not in self._cache:
+            return None
+        self._cache.move_to_end(key)
+        return self._cache[key][1]
+
+    def store(self, text: str, response: QueryResponse, now: float = None):
+        if response.requires_followup or response.tools_called or ACTION_WORDS.search(normalize(text)):
+            return
+        now = time.monotonic() if now is None else now
+        key = cache_key(text)
+        self._cache[key] = (now + self.ttl_seconds, response)
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.max_entries:
+            self._cache.popitem(last=False)
+
+    def clear(self):
+        self._cache.clear()
+
+    async def route(self, text: str, on_sentence: Callable[[str], None]) -> QueryResponse:
+        """Answer text locally if possible, otherwise through the agent; sentences go to on_sentence"""
+        self.turns += 1
+        fresh = self.memory is None or self.memory.empty
+        intent = self.match_intent(text)
+        if intent is not None:
+            self.intent_hits += 1
+            self.last_source = f'intent:{intent}'
+            response = QueryResponse(answer=INTENTS[intent][1](datetime.now()), confidence=1.0, source=self.last_source)
+        else:
+            response = self.lookup(text)
+            if response is not None:
+                self.cache_hits += 1
+                self.last_source = 'cache'
+        if response is not None:
+            if self.agent_seconds is not None:
+                self.saved_seconds += self.agent_seconds
+            for sentence in SentenceSegmenter().flush(response.answer):
+                on_sentence(sentence)
+            if self.memory is not None and response.answer:
+                self.memory.record(text, response.answer)
+            return response
+
+        self.last_source = 'agent'
+        started = time.monotonic()
+        response = await self.run_agent(text, on_sentence)
+        elapsed = time.monotonic() - started
+        self.agent_seconds = elapsed if self.agent_seconds is None else 0.8 * self.agent_seconds + 0.2 * elapsed
+        if fresh:
+            self.store(text, response)
+        return response
+
+    def stats(self) -> dict:
+        local = self.intent_hits + self.cache_hits
+        return {
+            'turns': self.turns,
+            'intent_hits': self.intent_hits,
+            'cache_hits': self.cache_hits,
+            'hit_rate': local / self.turns if self.turns else 0.0,
+            'saved_seconds': self.saved_seconds,
+            'cache_entries': len(self._cache),
+        }
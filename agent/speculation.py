@@ -0,0 +1,135 @@
+import asyncio
+import contextvars
+import time
+from difflib import SequenceMatcher
+from typing import Awaitable, Callable, List, Optional
+
+# Set inside speculative runs; side effects wait on it until the transcript is final
+_commit_gate: contextvars.ContextVar[Optional[asyncio.Event]] = contextvars.ContextVar('commit_gate', default=None)
+
+
+async def wait_for_commit():
+    """Hold a side effect until the current speculative run is accepted; no-op otherwise.
+
+    If the speculation is discarded instead, the run is cancelled while waiting
+    here, so the side effect never happens.
+    """
+    gate = _commit_gate.get()
+    if gate is not None:
+        await gate.wait()
+
+
+def divergence(a: str, b: str) -> float:
+    """0.0 for the same words in the same order, up to 1.0 for nothing in common"""
+    return 1.0 - SequenceMatcher(None, a.lower().split(), b.lower().split()).ratio()
+
+
+class _SpeculativeRun:
+    def __init__(self, text: str, run_agent):
+        self.text = text
+        self.started = time.monotonic()
+        self.finished = None
+        self.gate = asyncio.Event()
+        self._sentences: List[str] = []
+        self._on_sentence = None
+        self.task = asyncio.create_task(self._run(run_agent))
+        # A discarded run that failed should not warn about an unretrieved exception
+        self.task.add_done_callback(lambda task: task.cancelled() or task.exception())
+
+    async def _run(self, run_agent):
+        # The task runs in its own copy of the context, so this only affects the speculative run
+        _commit_gate.set(self.gate)
+        try:
+            return await run_agent(self.text, self._sentence)
+        finally:
+            self.finished = time.monotonic()
+
+    def _sentence(self, sentence: str):
+        if self._on_sentence is None:
+            self._sentences.append(sentence)
+        else:
+            self._on_sentence(sentence)
+
+    def accept(self, on_sentence: Callable[[str], None]):
+        """Release held side effects and pass on the buffered sentences, then the rest live"""
+        for sentence in self._sentences:
+            on_sentence(sentence)
+        self._sentences.clear()
+        self._on_sentence = on_sentence
+        self.gate.set()
+
+    def cancel(self):
+        self.task.cancel()
+
+
+class Speculator:
+    """Starts the agent on a stable partial transcript before the user has finished speaking.
+
+    speculate() is called with partial transcripts while listening. run() is
+    then called with the final transcript: if it is within max_divergence of
+    the speculated text the speculative run is accepted and its answer used,
+    otherwise it is cancelled and the agent runs on the final text. Until a
+    run is accepted its sentences are buffered rather than spoken, and
+    anything awaiting wait_for_commit() (side-effecting tools, the memory
+    update) is held, so a discarded run leaves no trace.
+    """
+
+    def __init__(
+        self,
+        run_agent: Callable[[str, Callable[[str], None]], Awaitable],
+        max_divergence: float = 0.0,
+        min_words: int = 2,
+    ):
+        self.run_agent = run_agent
+        self.max_divergence = max_divergence
+        self.min_words = min_words
+        self.started = 0
+        self.accepted = 0
+        self.wasted = 0
+        self.saved_seconds = 0.0
+        self._run: Optional[_SpeculativeRun] = None
+
+    def speculate(self, text: str):
+        """Start (or restart) a speculative run on a partial transcript; call on the event loop"""
+        text = text.strip()
+        if len(text.split()) < self.min_words:
+            return
+        if self._run is not None:
+            if divergence(self._run.text, text) <= self.max_divergence:
+                return
+            self.discard()
+        self._run = _SpeculativeRun(text, self.run_agent)
+        self.started += 1
+
+    def discard(self):
+        """Cancel the speculative run, if any, e.g. when the turn is abandoned"""
+        if self._run is not None:
+            self._run.cancel()
+            self._run = None
+            self.wasted += 1
+
+    async def run(self, text: str, on_sentence: Callable[[str], None]):
+        """Answer the final transcript, reusing the speculative run when it still matches"""
+        run, self._run = self._run, None
+        if run is not None and divergence(run.text, text) <= self.max_divergence:
+            committed = time.monotonic()
+            self.accepted += 1
+            run.accept(on_sentence)
+            try:
+                return await run.task
+            finally:
+                # The head start: how much of the run was already done when the transcript became final
+                self.saved_seconds += min(committed, run.finished or committed) - run.started
+        if run is not None:
+            run.cancel()
+            self.wasted += 1
+        return await self.run_agent(text, on_sentence)
+
+    def stats(self) -> dict:
+        return {
+            'started': self.started,
+            'accepted': self.accepted,
+            'wasted': self.wasted,
+            'waste_rate': self.wasted / self.started if self.started else 0.0,
+            'saved_seconds': self.saved_seconds,
+        }
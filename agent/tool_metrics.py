@@ -0,0 +1,115 @@
+import functools
+import threading
+import time
+from typing import Dict, List
+
+from .speculation import wait_for_commit
+from .tracing import span
+
+# Upper bounds (seconds) of the latency histogram buckets
+BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class ToolMetrics:
+    """Per-tool call counts, errors and latency, safe to update from any thread.
+
+    snapshot() returns plain numbers for logging; render_prometheus() returns
+    the same data in the Prometheus text exposition format for scraping.
+    """
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._tools: Dict[str, dict] = {}
+
+    def record(self, name: str, seconds: float, error: bool = False):
+        with self._lock:
+            tool = self._tools.setdefault(name, {
+                'calls': 0,
+                'errors': 0,
+                'seconds': 0.0,
+                'max_seconds': 0.0,
+                'buckets': [0] * len(self.buckets),
+            })
+            tool['calls'] += 1
+            tool['errors'] += int(error)
+            tool['seconds'] += seconds
+            tool['max_seconds'] = max(tool['max_seconds'], seconds)
+            for i, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    tool['buckets'][i] += 1
+
+    def snapshot(self) -> Dict[str, dict]:
+        with self._lock:
+            return {
+                name: {
+                    'calls': tool['calls'],
+                    'errors': tool['errors'],
+                    'error_rate': tool['errors'] / tool['calls'],
+                    'mean_seconds': tool['seconds'] / tool['calls'],
+                    'max_seconds': tool['max_seconds'],
+                }
+                for name, tool in self._tools.items()
+            }
+
+    def render_prometheus(self) -> str:
+        with self._lock:
+            tools = sorted((name, dict(tool, buckets=list(tool['buckets']))) for name, tool in self._tools.items())
+        lines: List[str] = [
+            '# HELP agent_tool_calls_total Agent tool calls.',
+            '# TYPE agent_tool_calls_total counter',
+        ]
+        lines += [f'agent_tool_calls_total{{tool="{name}"}} {tool["calls"]}' for name, tool in tools]
+        lines += [
+            '# HELP agent_tool_errors_total Agent tool calls that raised.',
+            '# TYPE agent_tool_errors_total counter',
+        ]
+        lines += [f'agent_tool_errors_total{{tool="{name}"}} {tool["errors"]}' for name, tool in tools]
+        lines += [
+            '# HELP agent_tool_duration_seconds Agent tool call duration.',
+            '# TYPE agent_tool_duration_seconds histogram',
+        ]
+        for name, tool in tools:
+            for bound, count in zip(self.buckets, tool['buckets']):
+                lines.append(f'agent_tool_duration_seconds_bucket{{tool="{name}",le="{bound}"}} {count}')
+            lines.append(f'agent_tool_duration_seconds_bucket{{tool="{name}",le="+Inf"}} {tool["calls"]}')
+            lines.append(f'agent_tool_duration_seconds_sum{{tool="{name}"}} {tool["seconds"]:.6f}')
+            lines.append(f'agent_tool_duration_seconds_count{{tool="{name}"}} {tool["calls"]}')
+        return '\n'.join(lines) + '\n'
+
+    def reset(self):
+        with self._lock:
+            self._tools.clear()
+
+
+tool_metrics = ToolMetrics()
+
+
+def timed(func=None, *, held: bool = False):
+    """Wrap an async tool so every call is recorded in tool_metrics under its name
+    and traced as a tool.<name> span of the current turn.
+
+    held=True is for side-effecting tools that wait_for_commit(): the wait for
+    a speculative run to be accepted happens first, traced as its own
+    speculation.hold span, so it does not count as the tool's latency.
+    """
+    if func is None:
+        return functools.partial(timed, held=held)
+
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        if held:
+            with span('speculation.hold'):
+                await wait_for_commit()
+        started = time.perf_counter()
+        error = False
+        try:
+            with span(f'tool.{func.__name__}'):
+                return await func(*args, **kwargs)
+        except Exception:
+            error = True
+            raise
+        finally:
+            tool_metrics.record(func.__name__, time.perf_counter() - started, error)
+
+    return wrapper
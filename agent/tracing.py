@@ -0,0 +1,248 @@
+import contextlib
+import json
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional
+
+# Upper bounds (seconds) of the stage latency histogram buckets
+BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUANTILES = (0.5, 0.95, 0.99)
+
+_NOT_TRACED = contextlib.nullcontext()
+
+
+class Trace:
+    """The spans of one turn, with time.monotonic() start and end times"""
+
+    def __init__(self, turn: int, reason: str = '', started: Optional[float] = None):
+        self.turn = turn
+        self.reason = reason
+        self.started = time.monotonic() if started is None else started
+        self.wall_started = time.time() - (time.monotonic() - self.started)
+        self.finished = None
+        self.spans: List[dict] = []
+        self._lock = threading.Lock()
+
+    def add(self, name: str, start: float, end: float, status: str = 'ok'):
+        with self._lock:
+            self.spans.append({'name': name, 'start': start, 'end': end, 'status': status})
+
+    def to_dict(self) -> dict:
+        end = self.finished or time.monotonic()
+        with self._lock:
+            spans = sorted(self.spans, key=lambda span: span['start'])
+        return {
+            'turn': self.turn,
+            'reason': self.reason,
+            'started_at': datetime.fromtimestamp(self.wall_started, timezone.utc).isoformat(timespec='milliseconds'),
+            'duration_ms': round((end - self.started) * 1000, 1),
+            'spans': [
+                {
+                    'name': span['name'],
+                    'offset_ms': round((span['start'] - self.started) * 1000, 1),
+                    'duration_ms': round((span['end'] - span['start']) * 1000, 1),
+                    'status': span['status'],
+                }
+                for span in spans
+            ],
+        }
+
+    def breakdown(self) -> str:
+        """Human-readable per-stage timing, one line per span in start order"""
+        trace = self.to_dict()
+        lines = [f"Turn {trace['turn']} ({trace['reason']}): {trace['duration_ms']:.0f} ms"]
+        for span in trace['spans']:
+            status = '' if span['status'] == 'ok' else f"  [{span['status']}]"
+            lines.append(f"  {span['name']:28s} +{span['offset_ms']:6.0f} ms {span['duration_ms']:7.0f} ms{status}")
+        return '\n'.join(lines)
+
+
+class _StageStats:
+    def __init__(self, buckets, window):
+        self.count = 0
+        self.seconds = 0.0
+        self.buckets = [0] * len(buckets)
+        self.recent = deque(maxlen=window)
+
+
+def _quantile(values: List[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class Tracer:
+    """Collects per-turn traces of the voice pipeline and per-stage latency statistics.
+
+    start_turn() makes a trace active; span() and record() add to it from any
+    thread, so stages running in worker threads land in the same turn.
+    finish() closes the trace, folds its spans into the stage statistics and
+    writes it as one JSON line to the log, if one is set. Only one turn is
+    active at a time, as in the main loop.
+    """
+
+    def __init__(self, log: Optional[Callable[[str], None]] = None, buckets=BUCKETS, window: int = 1000):
+        self.log = log
+        self.buckets = buckets
+        self.window = window
+        self.active: Optional[Trace] = None
+        self.turns = 0
+        self._lock = threading.Lock()
+        self._stages: Dict[str, _StageStats] = {}
+
+    def start_turn(self, reason: str = '', started: Optional[float] = None) -> Trace:
+        """Begin tracing a turn; started is when it was triggered (e.g. the wake word)"""
+        with self._lock:
+            self.turns += 1
+            self.active = Trace(self.turns, reason, started)
+        return self.active
+
+    def finish(self, trace: Optional[Trace] = None) -> Optional[Trace]:
+        trace = trace or self.active
+        if trace is None:
+            return None
+        trace.finished = time.monotonic()
+        with self._lock:
+            if self.active is trace:
+                self.active = None
+            for span in list(trace.spans) + [{'name': 'turn', 'start': trace.started, 'end': trace.finished,
+                                              'status': 'ok'}]:
+                if span['status'] == 'ok':
+                    self._observe(span['name'], span['end'] - span['start'])
+        if self.log is not None:
+            self.log(json.dumps(trace.to_dict()))
+        return trace
+
+    def _observe(self, stage: str, seconds: float):
+        stats = self._stages.get(stage)
+        if stats is None:
+            stats = self._stages[stage] = _StageStats(self.buckets, self.window)
+        stats.count += 1
+        stats.seconds += seconds
+        stats.recent.append(seconds)
+        for i, bound in enumerate(self.buckets):
+            if seconds <= bound:
+                stats.buckets[i] += 1
+
+    def record(self, name: str, start: float, end: Optional[float] = None, status: str = 'ok'):
+        """Add a span measured elsewhere to the active turn; ignored between turns"""
+        trace = self.active
+        if trace is not None:
+            trace.add(name, start, time.monotonic() if end is None else end, status)
+
+    def span(self, name: str):
+        """Time the enclosed block as a span of the active turn"""
+        trace = self.active
+        if trace is None:
+            return _NOT_TRACED
+        return self._span(trace, name)
+
+    @contextlib.contextmanager
+    def _span(self, trace: Trace, name: str):
+        start = time.monotonic()
+        status = 'ok'
+        try:
+            yield
+        except Exception:
+            status = 'error'
+            raise
+        except BaseException:
+            status = 'cancelled'
+            raise
+        finally:
+            trace.add(name, start, time.monotonic(), status)
+
+    def stage_stats(self) -> Dict[str, dict]:
+        """Per-stage count, mean and p50/p95/p99 over the last `window` spans, in seconds"""
+        with self._lock:
+            return {
+                stage: {
+                    'count': stats.count,
+                    'mean_seconds': stats.seconds / stats.count,
+                    **{f'p{round(q * 100)}_seconds': _quantile(stats.recent, q) for q in QUANTILES},
+                }
+                for stage, stats in self._stages.items()
+            }
+
+    def render_prometheus(self) -> str:
+        with self._lock:
+            stages = sorted(
+                (stage, stats.count, stats.seconds, list(stats.buckets), list(stats.recent))
+                for stage, stats in self._stages.items()
+            )
+            turns = self.turns
+        lines: List[str] = [
+            '# HELP voice_turns_total Turns started.',
+            '# TYPE voice_turns_total counter',
+            f'voice_turns_total {turns}',
+            '# HELP voice_stage_duration_seconds Duration of each pipeline stage.',
+            '# TYPE voice_stage_duration_seconds histogram',
+        ]
+        for stage, count, seconds, buckets, _ in stages:
+            for bound, hits in zip(self.buckets, buckets):
+                lines.append(f'voice_stage_duration_seconds_bucket{{stage="{stage}",le="{bound}"}} {hits}')
+            lines.append(f'voice_stage_duration_seconds_bucket{{stage="{stage}",le="+Inf"}} {count}')
+            lines.append(f'voice_stage_duration_seconds_sum{{stage="{stage}"}} {seconds:.6f}')
+            lines.append(f'voice_stage_duration_seconds_count{{stage="{stage}"}} {count}')
+        lines += [
+            f'# HELP voice_stage_recent_seconds Stage duration quantiles over the last {self.window} spans.',
+            '# TYPE voice_stage_recent_seconds summary',
+        ]
+        for stage, _, _, _, recent in stages:
+            for q in QUANTILES:
+                lines.append(f'voice_stage_recent_seconds{{stage="{stage}",quantile="{q}"}} {_quantile(recent, q):.6f}')
+            lines.append(f'voice_stage_recent_seconds_sum{{stage="{stage}"}} {sum(recent):.6f}')
+            lines.append(f'voice_stage_recent_seconds_count{{stage="{stage}"}} {len(recent)}')
+        return '\n'.join(lines) + '\n'
+
+    def reset(self):
+        with self._lock:
+            self.active = None
+            self.turns = 0
+            self._stages.clear()
+
+
+tracer = Tracer()
+
+
+def span(name: str):
+    """Time the enclosed block as a span of the active turn of the global tracer"""
+    return tracer.span(name)
+
+
+def json_log(path: str) -> Callable[[str], None]:
+    """A tracer log writing one JSON line per turn to path, or to stdout for '-'"""
+    if path == '-':
+        return print
+    lock = threading.Lock()
+
+    def write(line: str):
+        with lock, open(path, 'a') as log:
+            log.write(line + '\n')
+
+    return write
+
+
+def start_metrics_server(port: int, *renderers: Callable[[], str], host: str = '0.0.0.0') -> ThreadingHTTPServer:
+    """Serve the concatenated output of renderers at /metrics on a daemon thread"""
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split('?')[0] != '/metrics':
+                self.send_error(404)
+                return
+            body = ''.join(render() for render in renderers).encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
@@ -0,0 +1,347 @@
+import asyncio
+import threading
+import time
+
+import agent
+from voice import (
+    Endpointer,
+    SpeechQueue,
+    SpeechRecognitionError,
+    SpeechTimeoutError,
+    VoiceActivityDetector,
+    WakeWordEngine,
+)
+
+
+class Assistant:
+    """The wake word -> listen -> answer -> speak loop, built from swappable components.
+
+    streams are voice.WakeStreams, one per microphone, each with an input
+    (see voice.PyAudioInput) and a wake engine with Porcupine's interface.
+    They must share one sample rate and block length. The first stream to
+    detect a wake word owns the turn: the utterance is captured from it.
+    speech_to_text is a voice.SpeechToText and speaker a
+    voice.StreamingSpeaker. Nothing here opens a device or calls a service
+    itself, so the same loop runs from microphones in va.py and from
+    recordings in benchmarks/replay_bench.py. wake_word_engine may be a
+    voice.WakeWordEngine over streams that is already running, e.g. started
+    before the slow imports this module needs; run() takes it over.
+    """
+
+    def __init__(
+        self,
+        streams,
+        speech_to_text,
+        speaker,
+        memory: agent.ConversationMemory = None,
+        notification: bytes = None,
+        speech_cache=None,
+        preroll_seconds: float = 0.3,
+        barge_in_preroll_seconds: float = 0.6,
+        vad_threshold_db: float = 9.0,
+        vad_hangover_ms: int = 500,
+        barge_in_mode: str = 'speech',
+        speculation: bool = True,
+        speculation_max_divergence: float = 0.0,
+        partial_stable_seconds: float = 0.3,
+        response_cache_ttl: float = 300.0,
+        intent_classifier: bool = False,
+        trace_turns: bool = False,
+        keep_warm: bool = True,
+        wake_word_engine: WakeWordEngine = None,
+    ):
+        self.streams = streams
+        self.wake_word_engine = wake_word_engine or WakeWordEngine(streams)
+        # The stream whose wake word started the current (or last) turn
+        self.active_stream = streams[0]
+        self.speech_to_text = speech_to_text
+        # Cue PCM (voice.PCM_SAMPLE_RATE) played through the speech queue when the wake word is heard
+        self.notification = notification
+        self.speech_cache = speech_cache
+        # Seconds of audio from before the hotword fired that the utterance capture starts with
+        self.preroll_seconds = preroll_seconds
+        # Longer pre-roll when the user barges in by talking, so the start of their speech is kept
+        self.barge_in_preroll_seconds = barge_in_preroll_seconds
+        # 'speech' interrupts playback on the hotword or on user speech over it,
+        # 'hotword' only on the hotword, 'off' never
+        self.barge_in_mode = barge_in_mode
+        self.speculation = speculation
+        # Seconds a partial transcript must stay unchanged before the agent is started on it
+        self.partial_stable_seconds = partial_stable_seconds
+        self.trace_turns = trace_turns
+        # Ping the API's pooled connections as soon as a turn starts, so they are open
+        # again by the time the transcript is ready
+        self.keep_warm = keep_warm
+
+        if len({(stream.sample_rate, stream.block_length) for stream in streams}) > 1:
+            raise ValueError("All input streams must share one sample rate and block length")
+        # Voice activity detection runs on every block of every stream in the wake-word workers, so
+        # the noise floor is always current when a turn starts, without an adjust_for_ambient_noise pause.
+        # The endpointer runs on another thread, so it gets its own detector seeded from the stream's VAD
+        self.endpointer = Endpointer(
+            VoiceActivityDetector(streams[0].sample_rate, threshold_db=vad_threshold_db),
+            streams[0].block_length,
+            hangover_ms=vad_hangover_ms
+        )
+
+        # Answers are spoken sentence by sentence while the agent is still generating the rest;
+        # what is played is the reference signal every stream's echo gate uses to ignore it
+        self.speech_queue = SpeechQueue(speaker, on_playback=self.on_playback, on_span=agent.tracer.record)
+
+        # Turns within a conversation share history, trimmed to a token budget
+        self.memory = memory or agent.ConversationMemory()
+        # With a streaming recognizer the agent starts on a stable partial transcript;
+        # side-effecting tools are held until the final transcript confirms it
+        self.speculator = agent.Speculator(
+            lambda text, on_sentence: agent.process_query_stream(text, on_sentence, self.memory),
+            max_divergence=speculation_max_divergence
+        )
+        # Built-in intents and repeats of recent questions are answered without calling the LLM
+        self.router = agent.IntentRouter(
+            self.speculator.run,
+            ttl_seconds=response_cache_ttl,
+            classifier=agent.IntentClassifier() if intent_classifier else None,
+            memory=self.memory
+        )
+
+        # True while a turn is generating or speaking an answer, the only time barge-in applies
+        self.responding = False
+        # Set whenever no turn is running
+        self.idle = threading.Event()
+        self.idle.set()
+        # Posts (reason, stream, detected_at, subscription) to the main loop from the wake-word workers, set by run()
+        self.post_wake = None
+
+    def start_capture(self) -> bool:
+        """Open every stream's input; False if any could not be opened"""
+        return all([stream.start_capture() for stream in self.streams])
+
+    def close(self):
+        self.wake_word_engine.stopping.set()
+        for stream in self.streams:
+            stream.close()
+
+    def on_playback(self, pcm):
+        for stream in self.streams:
+            stream.echo_gate.on_playback(pcm)
+
+    async def respond(self, text):
+        """Run the agent on text, speaking each sentence as soon as it is complete"""
+        speech_queue = self.speech_queue
+        speech_queue.reset_timing()
+        self.responding = True
+        started = time.monotonic()
+        try:
+            with agent.tracer.span('answer'):
+                response = await self.router.route(text, speech_queue.put)
+            if self.router.last_source != 'agent':
+                # Answered locally, so a run speculated on a partial transcript was never used
+                self.speculator.discard()
+            print(f"Returned Text ({self.router.last_source}): {response.answer}")
+            with agent.tracer.span('speech.drain'):
+                await asyncio.to_thread(speech_queue.join)
+        finally:
+            self.responding = False
+        if speech_queue.time_to_first_audio is not None:
+            agent.tracer.record('first_audio', started, speech_queue.first_audio_at)
+            print(f"Time to first audio: {speech_queue.time_to_first_audio * 1000:.0f} ms")
+        print(f"Conversation memory: ~{self.memory.tokens()} tokens, "
+              f"{self.memory.evicted_turns} turns summarized")
+        stats = self.speculator.stats()
+        if stats['started']:
+            print(f"Speculation: {stats['accepted']} accepted, {stats['wasted']} wasted of {stats['started']} runs, "
+                  f"~{stats['saved_seconds']:.1f} s saved")
+        stats = self.router.stats()
+        print(f"Router: {stats['intent_hits']} intent, {stats['cache_hits']} cache hits in {stats['turns']} turns "
+              f"({stats['hit_rate']:.0%}), ~{stats['saved_seconds']:.1f} s of agent time saved")
+        if self.speech_cache is not None:
+            stats = self.speech_cache.stats()
+            print(f"Speech cache: {stats['hits']} hits, {stats['misses']} misses ({stats['hit_rate']:.0%} hit rate)")
+        return response
+
+    def listen_for_utterance(self, on_stable_partial=None, subscription=None):
+        """Capture one utterance from the active stream's bus and return its transcript.
+
+        on_stable_partial is called (from this thread) with each partial transcript
+        that stayed unchanged for partial_stable_seconds. subscription, if given,
+        is the subscription to the bus taken when the wake-up was detected, with
+        its pre-roll; otherwise listening starts now.
+        """
+        stream = self.active_stream
+        subscription = subscription or stream.audio_bus.subscribe()
+        partial = {'text': '', 'since': None, 'reported': ''}
+
+        def on_audio(data):
+            text = self.speech_to_text.accept(data)
+            now = time.monotonic()
+            if text != partial['text']:
+                partial.update(text=text, since=now)
+            elif (on_stable_partial is not None and text and text != partial['reported']
+                  and now - partial['since'] >= self.partial_stable_seconds):
+                partial['reported'] = text
+                on_stable_partial(text)
+
+        try:
+            # The backend decodes each block as it is read, so only the tail is left at the end
+            self.speech_to_text.start()
+            self.endpointer.vad.noise_floor_db = stream.ambient_vad.noise_floor_db
+            with agent.tracer.span('listen'):
+                self.endpointer.listen(
+                    subscription, timeout=5, phrase_time_limit=10, on_audio=on_audio,
+                    preroll_blocks=subscription.preroll_blocks,
+                    # The mic hears the cue (and any answer still fading out); it must not start the utterance
+                    is_echo=lambda energy: stream.echo_gate.is_echo(energy, subscription.last_block_time, learn=False)
+                )
+        finally:
+            subscription.close()
+        with agent.tracer.span('asr'):
+            return self.speech_to_text.finish()
+
+    def on_block(self, stream, pcm, decisions):
+        """Barge-in stage, called from each stream's wake-word worker with every block"""
+        if self.speech_queue.is_speaking():
+            # Every stream tracks whether its mic hears the user, but only the room the turn
+            # belongs to can interrupt by talking
+            if (stream.barge_in.process(decisions, stream.ambient_vad.last_energies)
+                    and self.barge_in_mode == 'speech' and stream is self.active_stream):
+                print("Speech detected over playback")
+                # Longer pre-roll so the start of what the user is saying is kept
+                self.post_wake('speech', stream, time.monotonic(),
+                               stream.audio_bus.subscribe(preroll_seconds=self.barge_in_preroll_seconds))
+
+    def on_wake(self, stream, keyword, detected_at):
+        # During playback only trust the hotword if the user, not the echo, was heard
+        if self.speech_queue.is_speaking() and not stream.barge_in.user_voice_recent():
+            print(f"Ignoring hotword in assistant playback on {stream.name}")
+            return
+        print(f"Hotword '{keyword}' detected on {stream.name}!")
+        # Listening starts here, before the cue, with the end of the wake word as pre-roll
+        self.post_wake('hotword', stream, detected_at, stream.audio_bus.subscribe(preroll_seconds=self.preroll_seconds))
+
+    def speculate(self, text):
+        """Start the agent early on a stable partial transcript, unless it would be answered locally"""
+        if not self.router.is_local(text):
+            self.speculator.speculate(text)
+
+    async def listen(self, subscription=None):
+        """Endpointing + ASR stage, off the event loop; returns None if nothing usable was heard"""
+        loop = asyncio.get_running_loop()
+        on_stable_partial = None
+        if self.speculation:
+            on_stable_partial = lambda text: loop.call_soon_threadsafe(self.speculate, text)
+        try:
+            text = await asyncio.to_thread(self.listen_for_utterance, on_stable_partial, subscription)
+        except SpeechTimeoutError:
+            print("No speech detected within timeout period")
+            text = None
+        except SpeechRecognitionError as e:
+            print(f"Could not request results; {e}")
+            text = None
+        else:
+            if not text:
+                print("Could not understand audio")
+                text = None
+        if text is None:
+            self.speculator.discard()
+        return text
+
+    async def run_turn(self, reason, detected_at, subscription):
+        """One traced turn, timed from when the wake-up was detected"""
+        trace = agent.tracer.start_turn(f"{reason}@{self.active_stream.name}", detected_at)
+        agent.tracer.record('wake', detected_at)
+        if self.keep_warm:
+            agent.clients.keep_warm()
+        try:
+            await self.converse(reason, subscription)
+        finally:
+            subscription.close()
+            agent.tracer.finish(trace)
+            if self.trace_turns:
+                print(trace.breakdown())
+
+    async def converse(self, reason, subscription):
+        """subscription has buffered the stream's audio since the wake-up was detected"""
+        # No beep when the user is already talking over playback ('speech'), or when it was
+        # played as soon as the wake word was heard during startup ('startup')
+        if reason == 'hotword' and self.notification:
+            with agent.tracer.span('notification'):
+                await asyncio.to_thread(self.speech_queue.play, self.notification)
+        print("Listening...")
+        text = await self.listen(subscription)
+        if self.speech_queue.cancel_latency is not None:
+            print(f"Playback cancelled in {self.speech_queue.cancel_latency * 1000:.0f} ms")
+            self.speech_queue.cancel_latency = None
+        if text is None:
+            return
+        print(f"Recognized Text: {text}")
+
+        # Speech starts after the first sentence instead of after the whole answer
+        response = await self.respond(text)
+
+        # Add automatic follow-up listening if required
+        if response.requires_followup:
+            print("Listening for follow-up...")
+            follow_up_text = await self.listen()
+            if follow_up_text is not None:
+                print(f"Follow-up response: {follow_up_text}")
+                await self.respond(follow_up_text)
+
+    async def run(self, startup_wakes=None):
+        """Serve wake-ups until cancelled.
+
+        startup_wakes is a list the running engine's previous on_wake callback
+        appends (stream, detected_at, subscription) to for a wake word heard
+        before the assistant was ready. It is read once the callbacks have been
+        handed over, so no wake-up in between is lost, and the first entry's
+        utterance is read from its subscription.
+        """
+        loop = asyncio.get_running_loop()
+        # Holds at most one pending wake-up; extra detections while it is queued are dropped
+        wake_events = asyncio.Queue(maxsize=1)
+
+        def post_wake_event(reason, stream, detected_at, subscription):
+            # The first stream to fire wins: detections of the same wake word by other mics are dropped
+            if wake_events.full():
+                subscription.close()
+            else:
+                wake_events.put_nowait((reason, stream, detected_at, subscription))
+
+        self.post_wake = lambda *event: loop.call_soon_threadsafe(post_wake_event, *event)
+        self.wake_word_engine.start(self.on_block, self.on_wake)
+
+        turn = None
+        if startup_wakes:
+            stream, detected_at, subscription = startup_wakes[0]
+            turn = self.start_turn('startup', stream, detected_at, subscription)
+        try:
+            while True:
+                reason, stream, detected_at, subscription = await wake_events.get()
+                if turn is not None and not turn.done():
+                    # Wake-ups while the user is still being listened to don't start another turn
+                    if not self.responding or self.barge_in_mode == 'off':
+                        subscription.close()
+                        continue
+                    print("Interrupting playback...")
+                    self.speech_queue.cancel()
+                    turn.cancel()
+                    await asyncio.gather(turn, return_exceptions=True)
+                    self.speculator.discard()
+                turn = self.start_turn(reason, stream, detected_at, subscription)
+        finally:
+            if turn is not None:
+                turn.cancel()
+            await asyncio.to_thread(self.wake_word_engine.stop)
+
+    def start_turn(self, reason, stream, detected_at, subscription):
+        for each in self.streams:
+            each.barge_in.reset()
+        self.active_stream = stream
+        self.idle.clear()
+        turn = asyncio.create_task(self.run_turn(reason, detected_at, subscription))
+        turn.add_done_callback(self.turn_done)
+        return turn
+
+    def turn_done(self, turn):
+        if not turn.cancelled() and turn.exception() is not None:
+            print(f"Error during turn: {str(turn.exception())}")
+        self.idle.set()
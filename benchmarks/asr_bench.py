@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""Replay WAV fixtures through ASR backends and report real-time factor and WER.
+
+Fixtures are mono 16-bit WAV files; a sibling .txt file with the same name
+holds the reference transcript. Audio is fed in capture-sized chunks, the
+same way va.py feeds the backend while recognizer.listen is running.
+
+    python benchmarks/asr_bench.py fixtures/ --backend vosk --backend google
+"""
+import argparse
+import glob
+import os
+import re
+import sys
+import time
+import wave
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from voice import create_speech_to_text
+
+CHUNK = 1536  # one hotword-loop read at 48 kHz
+
+
+def normalize(text):
+    return re.sub(r"[^a-z0-9' ]+", ' ', text.lower()).split()
+
+
+def word_errors(reference, hypothesis):
+    """Levenshtein distance over words"""
+    previous = list(range(len(hypothesis) + 1))
+    for i, ref_word in enumerate(reference, 1):
+        current = [i]
+        for j, hyp_word in enumerate(hypothesis, 1):
+            current.append(min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + (ref_word != hyp_word),
+            ))
+        previous = current
+    return previous[-1]
+
+
+def load_fixtures(directory):
+    fixtures = []
+    for path in sorted(glob.glob(os.path.join(directory, '*.wav'))):
+        with wave.open(path, 'rb') as wav_file:
+            if wav_file.getnchannels() != 1 or wav_file.getsampwidth() != 2:
+                print(f"Skipping {path}: expected mono 16-bit audio")
+                continue
+            rate = wav_file.getframerate()
+            data = wav_file.readframes(wav_file.getnframes())
+        reference_path = os.path.splitext(path)[0] + '.txt'
+        reference = open(reference_path).read() if os.path.exists(reference_path) else ''
+        fixtures.append((os.path.basename(path), rate, data, reference))
+    return fixtures
+
+
+def run_backend(name, fixtures, options):
+    backends = {}
+    total_audio = total_decode = total_finish = 0.0
+    total_errors = total_words = 0
+    for fixture, rate, data, reference in fixtures:
+        if rate not in backends:
+            backends[rate] = create_speech_to_text(name, rate, **options)
+        backend = backends[rate]
+        duration = len(data) / 2 / rate
+
+        backend.start()
+        started = time.perf_counter()
+        for offset in range(0, len(data), CHUNK * 2):
+            backend.accept(data[offset:offset + CHUNK * 2])
+        streamed = time.perf_counter()
+        hypothesis = backend.finish()
+        finished = time.perf_counter()
+
+        errors = word_errors(normalize(reference), normalize(hypothesis))
+        words = len(normalize(reference))
+        print(f"  {fixture}: RTF {(finished - started) / duration:.3f}, "
+              f"finish {1000 * (finished - streamed):.0f} ms, "
+              f"WER {errors / max(words, 1):.2%} -> {hypothesis!r}")
+        total_audio += duration
+        total_decode += finished - started
+        total_finish += finished - streamed
+        total_errors += errors
+        total_words += words
+
+    print(f"{name}: {len(fixtures)} fixtures, {total_audio:.1f} s audio, "
+          f"RTF {total_decode / max(total_audio, 1e-9):.3f}, "
+          f"mean finish latency {1000 * total_finish / max(len(fixtures), 1):.0f} ms, "
+          f"WER {total_errors / max(total_words, 1):.2%}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('fixtures', help="Directory of .wav files with .txt references")
+    parser.add_argument('--backend', action='append', help="Backend name (repeatable), default: vosk")
+    parser.add_argument('--vosk-model', default=os.getenv('VOSK_MODEL_PATH', 'model'))
+    args = parser.parse_args()
+
+    fixtures = load_fixtures(args.fixtures)
+    if not fixtures:
+        sys.exit(f"No WAV fixtures found in {args.fixtures}")
+    for name in args.backend or ['vosk']:
+        options = {'model_path': args.vosk_model} if name == 'vosk' else {}
+        run_backend(name, fixtures, options)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""Barge-in measurements on synthetic audio.
+
+1. Cancel-to-silence: SpeechQueue plays a long synthetic answer into an
+   output that consumes audio in real time; cancel() is called at random
+   points and the time until the last slice finishes is reported.
+2. Echo gating: the mic signal is a delayed, attenuated copy of the
+   playback plus noise, with user speech added in half of the trials.
+   Reports false barge-ins on echo alone and detection latency on speech.
+
+    python benchmarks/barge_in_bench.py
+"""
+import os
+import sys
+import time
+from unittest import mock
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from voice import PCM_SAMPLE_RATE, BargeInDetector, EchoGate, SpeechQueue, VoiceActivityDetector
+
+MIC_RATE = 16000
+BLOCK = 512
+TRIALS = 10
+
+
+def speech_like(rate, seconds, rng, amplitude=3000.0, pitch=140.0):
+    """Harmonic bursts at a syllable rate, roughly like voiced speech"""
+    t = np.arange(int(seconds * rate)) / rate
+    phase = 2 * np.pi * np.cumsum(pitch + 20 * np.sin(2 * np.pi * 0.7 * t)) / rate
+    voiced = sum(np.sin(k * phase) / k for k in range(1, 12))
+    syllables = np.clip(np.sin(2 * np.pi * 4 * t + rng.uniform(0, 6)), 0, None) ** 0.5
+    return amplitude * voiced * syllables
+
+
+class SyntheticSpeaker:
+    """Stands in for StreamingSpeaker: yields 100 ms chunks of synthetic speech"""
+
+    def __init__(self, output):
+        self.output = output
+
+    def stream(self, text):
+        audio = speech_like(PCM_SAMPLE_RATE, len(text) * 0.06, np.random.default_rng(len(text)))
+        pcm = audio.astype(np.int16).tobytes()
+        step = int(0.1 * PCM_SAMPLE_RATE) * 2
+        for offset in range(0, len(pcm), step):
+            time.sleep(0.01)  # network pacing, faster than real time
+            yield pcm[offset:offset + step]
+
+
+class RealtimeOutput:
+    def write(self, data):
+        time.sleep(len(data) / 2 / PCM_SAMPLE_RATE)
+
+
+def cancel_to_silence(rng):
+    queue = SpeechQueue(SyntheticSpeaker(RealtimeOutput()))
+    latencies = []
+    for _ in range(TRIALS):
+        queue.put("This is a fairly long synthetic sentence that keeps the speaker busy for a while.")
+        queue.put("And a second one queued behind it.")
+        time.sleep(rng.uniform(0.3, 2.0))
+        queue.cancel()
+        queue.join()
+        latencies.append(queue.cancel_latency)
+    latencies = np.array(latencies) * 1000
+    print(f"cancel-to-silence over {TRIALS} trials: mean {latencies.mean():.1f} ms, max {latencies.max():.1f} ms "
+          f"(slice {queue.slice_bytes / 2 / PCM_SAMPLE_RATE * 1000:.0f} ms)")
+
+
+def echo_trial(rng, with_user, coupling_db=-6.0, delay_seconds=0.08, seconds=4.0):
+    """Simulate one playback on a virtual clock and return (triggered, latency after user onset)"""
+    playback = speech_like(PCM_SAMPLE_RATE, seconds, rng)
+    # What the mic hears of the playback: resampled, delayed, attenuated, plus room noise
+    echo = np.interp(
+        np.arange(int(seconds * MIC_RATE)) / MIC_RATE - delay_seconds,
+        np.arange(len(playback)) / PCM_SAMPLE_RATE,
+        playback,
+        left=0.0
+    ) * 10 ** (coupling_db / 20)
+    mic = echo + rng.standard_normal(len(echo)) * 30
+    user_onset = 2.0
+    if with_user:
+        user = speech_like(MIC_RATE, seconds - user_onset, rng, amplitude=4000.0, pitch=210.0)
+        mic[int(user_onset * MIC_RATE):] += user
+
+    clock = [0.0]
+    with mock.patch('voice.echo.time.monotonic', lambda: clock[0]):
+        gate = EchoGate(PCM_SAMPLE_RATE)
+        vad = VoiceActivityDetector(MIC_RATE)
+        vad.process(np.clip(rng.standard_normal(MIC_RATE) * 30, -32768, 32767).astype(np.int16))
+        detector = BargeInDetector(gate, vad.frame_seconds)
+        played = 0
+        for start in range(0, len(mic) - BLOCK, BLOCK):
+            clock[0] = (start + BLOCK) / MIC_RATE
+            # Keep the reference a block ahead of the mic, as the output buffer would
+            target = int((clock[0] + BLOCK / MIC_RATE) * PCM_SAMPLE_RATE)
+            for offset in range(played, min(target, len(playback)), 480):
+                gate.on_playback(playback[offset:offset + 480].astype(np.int16).tobytes())
+            played = max(played, target)
+            block = np.clip(mic[start:start + BLOCK], -32768, 32767).astype(np.int16)
+            decisions = vad.process(block)
+            if detector.process(decisions, vad.last_energies):
+                return True, clock[0] - user_onset
+    return False, None
+
+
+def echo_gating(rng):
+    false_triggers = sum(echo_trial(rng, with_user=False)[0] for _ in range(TRIALS))
+    detections = [echo_trial(rng, with_user=True) for _ in range(TRIALS)]
+    latencies = [latency * 1000 for triggered, latency in detections if triggered and latency >= 0]
+    print(f"echo only: {false_triggers}/{TRIALS} false barge-ins")
+    if latencies:
+        print(f"user over echo: {len(latencies)}/{TRIALS} detected, "
+              f"mean onset latency {np.mean(latencies):.0f} ms")
+    else:
+        print(f"user over echo: 0/{TRIALS} detected")
+
+
+def main():
+    rng = np.random.default_rng(0)
+    cancel_to_silence(rng)
+    echo_gating(rng)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""Compare allocations and CPU of the old struct.unpack_from ingestion with PcmReader.
+
+A fake stream stands in for PyAudio so this runs without an audio device.
+PcmReader is measured the way WakeStream uses it: each block is published on
+an AudioBus, as the capture callback does, and read back through a bus
+subscription.
+Run from the repo root: python benchmarks/capture_bench.py
+"""
+import os
+import struct
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from voice import AudioBus, PcmReader, StreamingResampler
+
+FRAME_LENGTH = 512  # porcupine.frame_length
+TARGET_RATE = 16000  # porcupine.sample_rate
+SECONDS = 5
+
+
+class FakeStream:
+    """Returns pre-generated int16 bytes the way pyaudio.Stream.read does"""
+
+    def __init__(self, input_rate):
+        rng = np.random.default_rng(0)
+        self._data = (rng.standard_normal(input_rate * SECONDS) * 3000).astype(np.int16).tobytes()
+        self._offset = 0
+
+    def read(self, num_frames, exception_on_overflow=True):
+        size = num_frames * 2
+        if self._offset + size > len(self._data):
+            self._offset = 0
+        chunk = self._data[self._offset:self._offset + size]
+        self._offset += size
+        return chunk
+
+
+def legacy_ingest(stream, input_frame_length, resampler):
+    pcm = stream.read(input_frame_length, exception_on_overflow=False)
+    pcm = struct.unpack_from("h" * input_frame_length, pcm)
+    frames = resampler.process(np.array(pcm))
+    return [np.pad(frame, (0, FRAME_LENGTH - len(frame))) for frame in frames]
+
+
+def bus_ingest(stream, bus, reader, resampler):
+    bus.publish(stream.read(reader.block_length))
+    return resampler.process(reader.read())
+
+
+def measure(step, reads):
+    # CPU without tracing overhead
+    start = time.process_time()
+    for _ in range(reads):
+        step()
+    cpu = time.process_time() - start
+
+    # Sum of per-read peaks approximates bytes allocated per read
+    tracemalloc.start()
+    allocated = 0
+    for _ in range(reads):
+        tracemalloc.reset_peak()
+        baseline = tracemalloc.get_traced_memory()[0]
+        step()
+        allocated += tracemalloc.get_traced_memory()[1] - baseline
+    tracemalloc.stop()
+    return cpu / SECONDS * 1000, allocated / SECONDS / 1024
+
+
+def main():
+    for input_rate in (16000, 48000):
+        input_frame_length = int(FRAME_LENGTH * input_rate / TARGET_RATE)
+        reads = SECONDS * input_rate // input_frame_length
+
+        stream = FakeStream(input_rate)
+        resampler = StreamingResampler(input_rate, TARGET_RATE, FRAME_LENGTH)
+        legacy = measure(lambda: legacy_ingest(stream, input_frame_length, resampler), reads)
+
+        stream = FakeStream(input_rate)
+        bus = AudioBus(input_rate, input_frame_length)
+        reader = PcmReader(bus.subscribe(), input_frame_length)
+        resampler = StreamingResampler(input_rate, TARGET_RATE, FRAME_LENGTH)
+        reader_cost = measure(lambda: bus_ingest(stream, bus, reader, resampler), reads)
+
+        print(f"{input_rate} Hz input, {reads // SECONDS} reads per second")
+        print(f"  struct.unpack_from: {legacy[0]:6.2f} ms CPU/s, {legacy[1]:9.1f} KiB allocated/s")
+        print(f"  bus + PcmReader:    {reader_cost[0]:6.2f} ms CPU/s, {reader_cost[1]:9.1f} KiB allocated/s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""New API connections per turn, and how many of them a turn waits for.
+
+Runs turns against the local fake OpenAI server: a wake word, the user
+speaking for --listen-seconds, then the real streaming agent (pydantic-ai's
+OpenAI model) answering and each sentence synthesized through
+StreamingSpeaker, with --idle-seconds between turns. The server makes every
+new connection cost --connect-ms (DNS, TCP and TLS to the real API) and
+drops connections idle for --server-idle-seconds. Three setups:
+
+  per-call  a new OpenAI client for every TTS request (the old speak_text)
+            and pydantic-ai's default client for the agent
+  shared    agent.clients: one pooled, kept-alive client per kind
+  warm      shared, plus agent.clients.keep_warm() when the wake word fires
+
+Reports new connections per turn, how many were opened after the transcript
+was ready (on the critical path), and transcript -> first audio latency.
+
+    python benchmarks/connection_bench.py [--turns 4] [--idle-seconds 8] [--connect-ms 150]
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+os.environ.setdefault('OPENAI_API_KEY', 'unused')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from openai import OpenAI
+from pydantic_ai.models.openai import OpenAIModel
+
+import agent
+from agent import ClientRegistry
+from fake_openai_server import start_server
+from voice import SpeechQueue, StreamingSpeaker
+
+agent_module = sys.modules['agent.agent']
+
+
+class NullOutput:
+    def write(self, data):
+        pass
+
+
+class PerCallClient:
+    """Builds a new OpenAI client (and connection pool) for every request, like speak_text did"""
+
+    def __init__(self, base_url):
+        self.base_url = base_url
+
+    @property
+    def audio(self):
+        return OpenAI(base_url=self.base_url, api_key='unused').audio
+
+
+async def session(mode, base_url, server, args):
+    if mode == 'per-call':
+        registry = None
+        model = OpenAIModel('gpt-4o', base_url=base_url, api_key='unused')
+        tts_client = PerCallClient(base_url)
+    else:
+        registry = ClientRegistry()
+        model = OpenAIModel('gpt-4o', openai_client=registry.async_openai(base_url, 'unused'))
+        tts_client = registry.openai(base_url, 'unused')
+    speech_queue = SpeechQueue(StreamingSpeaker(tts_client, NullOutput()))
+
+    results = []
+    with agent_module.agent.override(model=model):
+        for turn in range(args.turns):
+            before = server.connections
+            if mode == 'warm':
+                registry.keep_warm()
+            # The user is still talking; in the warm setup the pings run meanwhile
+            await asyncio.sleep(args.listen_seconds)
+            transcript_at = time.monotonic()
+            at_transcript = server.connections
+            await agent.process_query_stream("what's in my inbox", speech_queue.put)
+            await asyncio.to_thread(speech_queue.join)
+            results.append({
+                'connections': server.connections - before,
+                'critical': server.connections - at_transcript,
+                'first_audio_ms': (speech_queue.first_audio_at - transcript_at) * 1000,
+            })
+            if turn < args.turns - 1:
+                await asyncio.sleep(args.idle_seconds)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--turns', type=int, default=4)
+    parser.add_argument('--idle-seconds', type=float, default=8.0, help="pause between turns")
+    parser.add_argument('--listen-seconds', type=float, default=1.0, help="wake word to transcript")
+    parser.add_argument('--connect-ms', type=int, default=150, help="cost of opening a connection")
+    parser.add_argument('--server-idle-seconds', type=float, default=30.0,
+                        help="server closes connections idle this long")
+    parser.add_argument('--modes', nargs='+', default=['per-call', 'shared', 'warm'])
+    args = parser.parse_args()
+
+    server = start_server(0, connect_delay=args.connect_ms / 1000, completion_delay=0.3, first_byte_delay=0.1)
+    server.RequestHandlerClass.timeout = args.server_idle_seconds
+    base_url = f"http://127.0.0.1:{server.server_address[1]}/v1"
+    print(f"{args.turns} turns, {args.idle_seconds:.0f} s apart; connections cost {args.connect_ms} ms "
+          f"and are dropped by the server after {args.server_idle_seconds:.0f} s idle")
+    for mode in args.modes:
+        results = asyncio.run(session(mode, base_url, server, args))
+        # The first turn starts cold in every setup; later turns show what pooling keeps
+        later = results[1:] or results
+        print(f"{mode:9s}: first turn {results[0]['connections']} new connections; later turns "
+              f"{statistics.mean(r['connections'] for r in later):.1f} new per turn, "
+              f"{statistics.mean(r['critical'] for r in later):.1f} after the transcript, "
+              f"transcript -> first audio {statistics.median(r['first_audio_ms'] for r in later):.0f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""Measure end-of-speech detection latency of the VAD endpointer.
+
+Without arguments a set of synthetic fixtures is generated (voiced harmonic
+bursts over background noise at several SNRs). A directory of mono 16-bit
+WAV files can be given instead; each needs a sibling .eos file holding the
+true end-of-speech time in seconds.
+
+    python benchmarks/endpoint_bench.py [fixtures/] [--hangover-ms 500]
+"""
+import argparse
+import glob
+import os
+import sys
+import time
+import wave
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from voice import Endpointer, VoiceActivityDetector
+
+SAMPLE_RATE = 16000
+BLOCK_LENGTH = 512
+
+
+class ReplayStream:
+    """Serves a PCM buffer in blocks, padding with trailing noise like a live mic"""
+
+    def __init__(self, samples, tail):
+        self._data = np.concatenate((samples, tail)).astype(np.int16).tobytes()
+        self._offset = 0
+
+    def read(self, num_frames, exception_on_overflow=False):
+        size = num_frames * 2
+        chunk = self._data[self._offset:self._offset + size]
+        self._offset += size
+        if len(chunk) < size:
+            raise EOFError("Fixture ended before an endpoint was detected")
+        return chunk
+
+
+def synthetic_fixture(rng, snr_db, speech_seconds=2.0, lead_seconds=0.5, tail_seconds=2.0):
+    """Syllable-like harmonic bursts between stretches of background noise"""
+    t = np.arange(int(speech_seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    pitch = 140 + 20 * np.sin(2 * np.pi * 0.7 * t)
+    phase = 2 * np.pi * np.cumsum(pitch) / SAMPLE_RATE
+    voiced = sum(np.sin(k * phase) / k for k in range(1, 12))
+    syllables = np.clip(np.sin(2 * np.pi * 4 * t), 0, None) ** 0.5
+    speech = 3000 * voiced * syllables
+
+    total = int((lead_seconds + speech_seconds + tail_seconds) * SAMPLE_RATE)
+    noise_rms = 3000 / np.sqrt(2) / (10 ** (snr_db / 20))
+    noise = rng.standard_normal(total + 10 * SAMPLE_RATE) * noise_rms
+    audio = noise[:total].copy()
+    start = int(lead_seconds * SAMPLE_RATE)
+    audio[start:start + len(speech)] += speech
+    # True end of speech is the end of the last syllable
+    last_voiced = start + np.nonzero(syllables > 0.05)[0][-1]
+    return np.clip(audio, -32768, 32767), noise[total:], last_voiced / SAMPLE_RATE
+
+
+def load_fixtures(directory):
+    fixtures = []
+    for path in sorted(glob.glob(os.path.join(directory, '*.wav'))):
+        eos_path = os.path.splitext(path)[0] + '.eos'
+        if not os.path.exists(eos_path):
+            print(f"Skipping {path}: no .eos file")
+            continue
+        with wave.open(path, 'rb') as wav_file:
+            rate = wav_file.getframerate()
+            samples = np.frombuffer(wav_file.readframes(wav_file.getnframes()), dtype=np.int16)
+        # Pad with digital silence so the endpointer always has room to fire
+        tail = np.zeros(5 * rate, dtype=np.int16)
+        room_tone = samples[:rate // 4]
+        fixtures.append((os.path.basename(path), rate, samples, tail, room_tone, float(open(eos_path).read())))
+    return fixtures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('fixtures', nargs='?', help="Directory of .wav files with .eos end-of-speech times")
+    parser.add_argument('--hangover-ms', type=int, default=500)
+    args = parser.parse_args()
+
+    if args.fixtures:
+        fixtures = load_fixtures(args.fixtures)
+    else:
+        rng = np.random.default_rng(0)
+        fixtures = []
+        for snr_db in (30, 20, 15, 10):
+            samples, tail, eos = synthetic_fixture(rng, snr_db)
+            fixtures.append((f"synthetic {snr_db} dB SNR", SAMPLE_RATE, samples, tail, tail[:SAMPLE_RATE], eos))
+
+    latencies = []
+    for name, rate, samples, tail, room_tone, eos in fixtures:
+        vad = VoiceActivityDetector(rate)
+        block_length = int(BLOCK_LENGTH * rate / SAMPLE_RATE)
+        endpointer = Endpointer(vad, block_length, hangover_ms=args.hangover_ms)
+        # Let the noise floor settle on leading room tone, as the hotword loop does
+        vad.process(room_tone.astype(np.int16))
+        stream = ReplayStream(samples, tail)
+        started = time.process_time()
+        try:
+            endpointer.listen(stream, timeout=5, phrase_time_limit=30)
+        except EOFError as e:
+            print(f"  {name}: {e}")
+            continue
+        cpu = time.process_time() - started
+        latency = endpointer.end_seconds - eos
+        latencies.append(latency)
+        print(f"  {name}: endpoint {endpointer.end_seconds:.3f} s, true end {eos:.3f} s, "
+              f"latency {1000 * latency:.0f} ms, CPU {1000 * cpu / endpointer.end_seconds:.2f} ms/s")
+
+    if latencies:
+        print(f"hangover {args.hangover_ms} ms: mean end-of-speech latency {1000 * np.mean(latencies):.0f} ms, "
+              f"max {1000 * np.max(latencies):.0f} ms over {len(latencies)} fixtures")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,309 @@
+#!/usr/bin/env python3
+"""Local stand-in for the Gmail REST API.
+
+Implements the handful of endpoints the agent uses (profile, history list,
+messages list/get, drafts create/send, batch) over an in-memory mailbox,
+with a configurable per-request latency to emulate the network round trip,
+an optional rate of injected 503 errors and per-message 429s inside batch
+responses (server.failing_items). Point GmailClient at it with
+api_endpoint=http://127.0.0.1:<port>/ and anonymous credentials.
+
+    python benchmarks/fake_gmail_server.py --port 8766 --messages 500 --latency-ms 40
+"""
+import argparse
+import email
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+API_PREFIX = '/gmail/v1/users/me'
+SENDERS = ['Alex <alex@example.com>', 'Sam <sam@example.com>', 'Jordan <jordan@example.com>']
+
+
+class Mailbox:
+    """In-memory messages, newest first, with a Gmail-style change history"""
+
+    def __init__(self, count):
+        self.lock = threading.Lock()
+        self.messages = {}
+        self.order = []
+        self.drafts = {}
+        self.draft_count = 0
+        self.history_id = 1000
+        self.history = []
+        self.next_id = 1
+        for i in range(count):
+            self.add(f"Message {i}", SENDERS[i % len(SENDERS)], f"Body of message {i}")
+
+    def _record(self, kind, message, **extra):
+        self.history_id += 1
+        message['historyId'] = str(self.history_id)
+        summary = {key: message[key] for key in ('id', 'threadId', 'labelIds')}
+        self.history.append({
+            'id': str(self.history_id),
+            'messages': [summary],
+            kind: [dict(message=summary, **extra)],
+        })
+
+    def add(self, subject, sender, snippet, labels=('INBOX', 'UNREAD')):
+        with self.lock:
+            message_id = f"{self.next_id:016x}"
+            self.next_id += 1
+            self.messages[message_id] = message = {
+                'id': message_id,
+                'threadId': message_id,
+                'labelIds': list(labels),
+                'snippet': snippet,
+                'internalDate': str(1700000000000 + self.next_id * 60000),
+                'payload': {
+                    'headers': [
+                        {'name': 'From', 'value': sender},
+                        {'name': 'Subject', 'value': subject},
+                        {'name': 'To', 'value': 'me@example.com'},
+                    ],
+                    'body': {'data': snippet},
+                },
+            }
+            self.order.insert(0, message_id)
+            self._record('messagesAdded', message)
+            return message_id
+
+    def modify(self, message_id, add=(), remove=()):
+        with self.lock:
+            message = self.messages[message_id]
+            added = [label for label in add if label not in message['labelIds']]
+            removed = [label for label in remove if label in message['labelIds']]
+            message['labelIds'] = [label for label in message['labelIds'] if label not in removed] + added
+            if added:
+                self._record('labelsAdded', message, labelIds=added)
+            if removed:
+                self._record('labelsRemoved', message, labelIds=removed)
+
+    def delete(self, message_id):
+        with self.lock:
+            message = self.messages.pop(message_id)
+            self.order.remove(message_id)
+            self._record('messagesDeleted', message)
+
+    def expire_history(self):
+        """Forget all history records, as Gmail does after about a week"""
+        with self.lock:
+            self.history = []
+            self.oldest_history_id = self.history_id
+
+
+def handle(server, method, path, body):
+    """Route one API call; returns (status, payload)"""
+    url = urlparse(path)
+    params = parse_qs(url.query)
+    route = url.path[len(API_PREFIX):] if url.path.startswith(API_PREFIX) else None
+    mailbox = server.mailbox
+
+    if method == 'GET' and route == '/profile':
+        with mailbox.lock:
+            return 200, {
+                'emailAddress': 'me@example.com',
+                'messagesTotal': len(mailbox.messages),
+                'historyId': str(mailbox.history_id),
+            }
+
+    if method == 'GET' and route == '/history':
+        start_id = int(params['startHistoryId'][0])
+        max_results = int(params.get('maxResults', ['100'])[0])
+        offset = int(params.get('pageToken', ['0'])[0])
+        with mailbox.lock:
+            if start_id < getattr(mailbox, 'oldest_history_id', 0):
+                return 404, {'error': {'code': 404, 'message': 'Requested entity was not found.'}}
+            records = [record for record in mailbox.history if int(record['id']) > start_id]
+            result = {'historyId': str(mailbox.history_id)}
+        page = records[offset:offset + max_results]
+        if page:
+            result['history'] = page
+        if offset + max_results < len(records):
+            result['nextPageToken'] = str(offset + max_results)
+        return 200, result
+
+    if method == 'GET' and route == '/messages':
+        label_ids = params.get('labelIds', [])
+        max_results = int(params.get('maxResults', ['100'])[0])
+        start = int(params.get('pageToken', ['0'])[0])
+        with mailbox.lock:
+            ids = [
+                message_id for message_id in mailbox.order
+                if all(label in mailbox.messages[message_id]['labelIds'] for label in label_ids)
+            ]
+        page = ids[start:start + max_results]
+        result = {
+            'messages': [{'id': message_id, 'threadId': message_id} for message_id in page],
+            'resultSizeEstimate': len(ids),
+        }
+        if start + max_results < len(ids):
+            result['nextPageToken'] = str(start + max_results)
+        return 200, result
+
+    if method == 'GET' and route and route.startswith('/messages/'):
+        message = mailbox.messages.get(route.split('/')[2])
+        if message is None:
+            return 404, {'error': {'code': 404, 'message': 'Requested entity was not found.'}}
+        message = json.loads(json.dumps(message))
+        if params.get('format', ['full'])[0] == 'metadata':
+            wanted = {name.lower() for name in params.get('metadataHeaders', [])}
+            headers = message['payload']['headers']
+            message['payload'] = {
+                'headers': [h for h in headers if not wanted or h['name'].lower() in wanted]
+            }
+        return 200, message
+
+    if method == 'POST' and route == '/drafts':
+        with mailbox.lock:
+            mailbox.draft_count += 1
+            draft_id = f"r{mailbox.draft_count}"
+        mailbox.drafts[draft_id] = body
+        return 200, {'id': draft_id, 'message': {'id': draft_id}}
+
+    if method == 'POST' and route == '/drafts/send':
+        if body.get('id') not in mailbox.drafts:
+            return 404, {'error': {'code': 404, 'message': 'Draft not found.'}}
+        mailbox.drafts.pop(body['id'])
+        return 200, {'id': body['id'], 'labelIds': ['SENT']}
+
+    return 404, {'error': {'code': 404, 'message': f'No fake route for {method} {url.path}'}}
+
+
+class FakeGmailHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def setup(self):
+        super().setup()
+        with self.server.stats_lock:
+            self.server.connections += 1
+
+    def _send(self, status, payload, content_type='application/json'):
+        data = payload if isinstance(payload, bytes) else json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _read_body(self):
+        return self.rfile.read(int(self.headers.get('Content-Length', 0)))
+
+    def _count(self, calls=1):
+        with self.server.stats_lock:
+            self.server.requests += 1
+            self.server.calls += calls
+
+    def _injected_error(self):
+        """Fail the request with a 503 at the configured error rate"""
+        if random.random() < self.server.error_rate:
+            self._send(503, {'error': {'code': 503, 'message': 'Injected backend error'}})
+            return True
+        return False
+
+    def _batch_item_error(self, path):
+        """A 429 for a batched message get listed in failing_items, as Gmail rate limits single items"""
+        message_id = urlparse(path).path.rsplit('/', 1)[-1]
+        with self.server.stats_lock:
+            if self.server.failing_items.get(message_id, 0) <= 0:
+                return None
+            self.server.failing_items[message_id] -= 1
+        return 429, {'error': {'code': 429, 'message': 'Injected rate limit'}}
+
+    def do_GET(self):
+        self._count()
+        time.sleep(self.server.latency)
+        if not self._injected_error():
+            self._send(*handle(self.server, 'GET', self.path, {}))
+
+    def do_POST(self):
+        body = self._read_body()
+        if urlparse(self.path).path == '/batch/gmail/v1':
+            self._batch(body)
+            return
+        self._count()
+        time.sleep(self.server.latency)
+        if not self._injected_error():
+            self._send(*handle(self.server, 'POST', self.path, json.loads(body or b'{}')))
+
+    def _batch(self, body):
+        message = email.message_from_bytes(
+            f"Content-Type: {self.headers['Content-Type']}\r\n\r\n".encode() + body
+        )
+        parts = message.get_payload()
+        self._count(len(parts))
+        time.sleep(self.server.latency + self.server.batch_part_latency * len(parts))
+
+        boundary = 'fake_gmail_batch'
+        chunks = []
+        for part in parts:
+            request_line, _, rest = part.get_payload().partition('\n')
+            method, path, _ = request_line.strip().split(' ', 2)
+            headers_text, _, request_body = rest.replace('\r\n', '\n').partition('\n\n')
+            status, payload = self._batch_item_error(path) or handle(
+                self.server, method, path, json.loads(request_body) if request_body.strip() else {}
+            )
+            data = json.dumps(payload)
+            content_id = part['Content-ID'].strip('<>')
+            chunks.append(
+                f"--{boundary}\r\nContent-Type: application/http\r\nContent-ID: <response-{content_id}>\r\n\r\n"
+                f"HTTP/1.1 {status} {'OK' if status == 200 else 'Error'}\r\n"
+                f"Content-Type: application/json\r\nContent-Length: {len(data)}\r\n\r\n{data}\r\n"
+            )
+        chunks.append(f"--{boundary}--\r\n")
+        self._send(200, ''.join(chunks).encode(), f'multipart/mixed; boundary={boundary}')
+
+
+def start_server(port=0, messages=500, latency=0.04, batch_part_latency=0.0005, error_rate=0.0):
+    """Start the fake server on a background thread and return it.
+
+    latency and error_rate can be changed on the returned server while it runs, and
+    failing_items maps a message id to how many more of its batched gets fail with 429.
+    """
+    server = ThreadingHTTPServer(('127.0.0.1', port), FakeGmailHandler)
+    server.daemon_threads = True
+    server.mailbox = Mailbox(messages)
+    server.latency = latency
+    server.batch_part_latency = batch_part_latency
+    server.error_rate = error_rate
+    server.failing_items = {}
+    server.stats_lock = threading.Lock()
+    server.connections = server.requests = server.calls = 0
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def use_fake_gmail(server):
+    """Point the agent's Gmail client at server, with the mailbox index in a fresh temporary directory"""
+    from google.auth.credentials import AnonymousCredentials
+    from agent import gmail_tools
+    gmail_tools._client = gmail_tools.GmailClient(
+        credentials=AnonymousCredentials(), api_endpoint=f"http://127.0.0.1:{server.server_address[1]}/"
+    )
+    os.environ['MAILBOX_INDEX_PATH'] = os.path.join(tempfile.mkdtemp(), 'mailbox.db')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--port', type=int, default=8766)
+    parser.add_argument('--messages', type=int, default=500)
+    parser.add_argument('--latency-ms', type=int, default=40)
+    args = parser.parse_args()
+    server = start_server(args.port, args.messages, args.latency_ms / 1000)
+    print(f"Fake Gmail API on http://127.0.0.1:{server.server_address[1]}/")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""Local stand-in for the OpenAI API that counts the connections clients open.
+
+Serves the speech endpoint of fake_tts_server plus POST /v1/chat/completions,
+which streams a final_result tool call (what the pydantic-ai agent asks for)
+answering every question with the same sentences after a configurable
+delay, and answers HEAD (keep-warm pings) on any path. Every new connection
+is counted in server.connections and first waits connect_delay, standing in
+for the DNS lookup and TCP and TLS handshakes a real connection to the API
+costs.
+
+    python benchmarks/fake_openai_server.py --port 8766 --connect-ms 150
+"""
+import argparse
+import json
+import threading
+import time
+from http.server import ThreadingHTTPServer
+
+from fake_tts_server import FakeTTSHandler
+
+ANSWER = "You have three new emails. The first one is from Sam about lunch."
+
+
+class FakeOpenAIHandler(FakeTTSHandler):
+    connect_delay = 0.15
+    completion_delay = 0.3
+    answer = ANSWER
+
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.connections += 1
+        time.sleep(self.connect_delay)
+
+    def do_HEAD(self):
+        self.send_response(404)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def do_POST(self):
+        if self.path.rstrip('/') != '/v1/chat/completions':
+            super().do_POST()
+            return
+        body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+        self.server.requests.append(body)
+
+        time.sleep(self.completion_delay)
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+        arguments = json.dumps({'answer': self.answer, 'confidence': 0.9, 'requires_followup': False})
+        pieces = [arguments[i:i + 16] for i in range(0, len(arguments), 16)]
+        for i, piece in enumerate(pieces):
+            call = {'index': 0, 'function': {'arguments': piece}}
+            if i == 0:
+                call.update(id='call_1', type='function')
+                call['function']['name'] = 'final_result'
+            self._event({'tool_calls': [call]}, None)
+        self._event({}, 'tool_calls')
+        self._chunk(b'data: [DONE]\n\n')
+        self.wfile.write(b"0\r\n\r\n")
+
+    def _event(self, delta, finish_reason):
+        chunk = {
+            'id': 'chatcmpl-fake', 'object': 'chat.completion.chunk', 'created': int(time.time()), 'model': 'gpt-4o',
+            'choices': [{'index': 0, 'delta': delta, 'finish_reason': finish_reason}],
+        }
+        self._chunk(f"data: {json.dumps(chunk)}\n\n".encode())
+
+    def _chunk(self, data):
+        self.wfile.write(f"{len(data):X}\r\n".encode() + data + b"\r\n")
+        self.wfile.flush()
+
+
+def start_server(port=0, connect_delay=0.15, completion_delay=0.3, first_byte_delay=0.3, realtime_factor=0.2):
+    """Start the fake server on a background thread and return it"""
+    handler = type('Handler', (FakeOpenAIHandler,), {
+        'connect_delay': connect_delay,
+        'completion_delay': completion_delay,
+        'first_byte_delay': first_byte_delay,
+        'realtime_factor': realtime_factor,
+    })
+    server = ThreadingHTTPServer(('127.0.0.1', port), handler)
+    server.requests = []
+    server.connections = 0
+    server.lock = threading.Lock()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--port', type=int, default=8766)
+    parser.add_argument('--connect-ms', type=int, default=150)
+    parser.add_argument('--completion-ms', type=int, default=300)
+    parser.add_argument('--first-byte-ms', type=int, default=300)
+    args = parser.parse_args()
+    server = start_server(args.port, args.connect_ms / 1000, args.completion_ms / 1000, args.first_byte_ms / 1000)
+    print(f"Fake OpenAI server on http://127.0.0.1:{server.server_address[1]}/v1")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
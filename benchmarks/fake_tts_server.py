@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""Local stand-in for the OpenAI speech endpoint.
+
+Serves POST /v1/audio/speech with chunked 24 kHz PCM (a tone whose length
+follows the input text) after a configurable first-byte delay and at a
+configurable synthesis speed. Point the client at it with
+OPENAI_BASE_URL=http://127.0.0.1:<port>/v1 and any OPENAI_API_KEY.
+
+    python benchmarks/fake_tts_server.py --port 8765 --first-byte-ms 300
+"""
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+SAMPLE_RATE = 24000
+SECONDS_PER_CHARACTER = 0.06
+
+
+def synthesize(text):
+    duration = max(0.2, len(text) * SECONDS_PER_CHARACTER)
+    t = np.arange(int(duration * SAMPLE_RATE)) / SAMPLE_RATE
+    return (3000 * np.sin(2 * np.pi * 220 * t)).astype(np.int16).tobytes()
+
+
+class FakeTTSHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    first_byte_delay = 0.3
+    realtime_factor = 0.2  # seconds of synthesis per second of audio
+    chunk_seconds = 0.1
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        if self.path.rstrip('/') != '/v1/audio/speech':
+            self.send_error(404)
+            return
+        body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+        audio = synthesize(body.get('input', ''))
+        self.server.requests.append(body)
+
+        time.sleep(self.first_byte_delay)
+        self.send_response(200)
+        self.send_header('Content-Type', 'audio/pcm')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+        chunk_size = int(self.chunk_seconds * SAMPLE_RATE) * 2
+        for offset in range(0, len(audio), chunk_size):
+            chunk = audio[offset:offset + chunk_size]
+            self.wfile.write(f"{len(chunk):X}\r\n".encode() + chunk + b"\r\n")
+            self.wfile.flush()
+            time.sleep(self.chunk_seconds * self.realtime_factor)
+        self.wfile.write(b"0\r\n\r\n")
+
+
+def start_server(port=0, first_byte_delay=0.3, realtime_factor=0.2):
+    """Start the fake server on a background thread and return it"""
+    handler = type('Handler', (FakeTTSHandler,), {
+        'first_byte_delay': first_byte_delay,
+        'realtime_factor': realtime_factor,
+    })
+    server = ThreadingHTTPServer(('127.0.0.1', port), handler)
+    server.requests = []
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--first-byte-ms', type=int, default=300)
+    parser.add_argument('--realtime-factor', type=float, default=0.2)
+    args = parser.parse_args()
+    server = start_server(args.port, args.first_byte_ms / 1000, args.realtime_factor)
+    print(f"Fake TTS server on http://127.0.0.1:{server.server_address[1]}/v1")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""Compare inbox fetch latency of the old per-message path with batched GmailClient fetches.
+
+Runs against benchmarks/fake_gmail_server.py with a simulated round trip,
+then checks that batch items rate limited once are retried and that items
+that keep failing are reported rather than dropped.
+
+    python benchmarks/gmail_bench.py [--latency-ms 40]
+"""
+import argparse
+import os
+import sys
+import time
+
+os.environ.setdefault('OPENAI_API_KEY', 'unused')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from google.auth.credentials import AnonymousCredentials
+from googleapiclient.discovery import build
+
+from agent.gmail_tools import GmailClient, MessageFetchError, header_value, list_recent_emails
+from fake_gmail_server import start_server
+
+
+def legacy_fetch(endpoint, max_results):
+    """What fetch_recent_emails did before: new service, then one full get per message"""
+    service = build('gmail', 'v1', credentials=AnonymousCredentials(),
+                    client_options={'api_endpoint': endpoint}, static_discovery=True)
+    results = service.users().messages().list(
+        userId='me', maxResults=max_results, labelIds=['INBOX']
+    ).execute()
+    messages = []
+    for msg in results.get('messages', []):
+        message = service.users().messages().get(userId='me', id=msg['id']).execute()
+        messages.append((header_value(message, 'From'), header_value(message, 'Subject')))
+    return messages
+
+
+def client_fetch(client, max_results):
+    return [
+        (header_value(message, 'From'), header_value(message, 'Subject'))
+        for message in list_recent_emails(client, max_results)
+    ]
+
+
+def timed(server, fetch, *args):
+    requests_before = server.requests
+    started = time.perf_counter()
+    messages = fetch(*args)
+    return time.perf_counter() - started, len(messages), server.requests - requests_before
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--latency-ms', type=int, default=40)
+    args = parser.parse_args()
+
+    server = start_server(0, messages=500, latency=args.latency_ms / 1000)
+    endpoint = f"http://127.0.0.1:{server.server_address[1]}/"
+    client = GmailClient(credentials=AnonymousCredentials(), api_endpoint=endpoint)
+    client_fetch(client, 1)  # build the service once, as the long-lived client would have
+
+    print(f"simulated round trip {args.latency_ms} ms")
+    for count in (20, 100, 500):
+        legacy = timed(server, legacy_fetch, endpoint, count)
+        batched = timed(server, client_fetch, client, count)
+        assert legacy[1] == batched[1] == count
+        print(f"{count:4d} messages: per-message {legacy[0] * 1000:7.0f} ms ({legacy[2]} HTTP requests), "
+              f"batched {batched[0] * 1000:6.0f} ms ({batched[2]} HTTP requests)")
+
+    # Per-item 429s inside the batch response, as Gmail sends when rate limiting
+    limited = server.mailbox.order[:5]
+    server.failing_items.update({message_id: 1 for message_id in limited})
+    retried = timed(server, client_fetch, client, 100)
+    assert retried[1] == 100, "items rate limited once must be retried"
+    print(f"100 messages, 5 rate limited once: {retried[0] * 1000:6.0f} ms ({retried[2]} HTTP requests)")
+    server.failing_items.update({message_id: 100 for message_id in limited})
+    try:
+        client_fetch(client, 100)
+        raise AssertionError("items that keep failing must be reported")
+    except MessageFetchError as e:
+        assert sorted(e.errors) == sorted(limited) and len(e.messages) == 95
+        print(f"100 messages, 5 always rate limited: {len(e.messages)} fetched, {len(e.errors)} reported as failed")
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""Mailbox index against the fake Gmail server: sync costs, query latency and consistency.
+
+Runs a full sync, a no-op incremental sync, an incremental sync after new
+mail / read state changes / a deletion, and a rebuild after the history
+has expired. After each step the index is checked against the fake
+mailbox. Query latency is compared with a live inbox fetch.
+
+    python benchmarks/mailbox_index_bench.py [--messages 1000] [--latency-ms 40]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+os.environ.setdefault('OPENAI_API_KEY', 'unused')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from google.auth.credentials import AnonymousCredentials
+
+from agent.gmail_tools import GmailClient, list_recent_emails
+from agent.mailbox_index import MailboxIndex
+from fake_gmail_server import start_server
+
+
+def check_consistent(index, mailbox):
+    """Assert the index holds exactly the fake mailbox's messages and labels"""
+    indexed = {row['id']: row for row in index.between(0, 2**62, limit=10**6, label=None)}
+    assert set(indexed) == set(mailbox.messages), (
+        f"{len(set(indexed) - set(mailbox.messages))} stale, {len(set(mailbox.messages) - set(indexed))} missing"
+    )
+    for message_id, message in mailbox.messages.items():
+        assert sorted(indexed[message_id]['labels']) == sorted(message['labelIds']), message_id
+    unread = sum('UNREAD' in m['labelIds'] and 'INBOX' in m['labelIds'] for m in mailbox.messages.values())
+    assert index.unread_count() == unread
+
+
+def timed(server, action):
+    requests_before = server.requests
+    started = time.perf_counter()
+    result = action()
+    return (time.perf_counter() - started) * 1000, server.requests - requests_before, result
+
+
+def query_latency(action, repeats=200):
+    started = time.perf_counter()
+    for _ in range(repeats):
+        action()
+    return (time.perf_counter() - started) / repeats * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--messages', type=int, default=1000)
+    parser.add_argument('--latency-ms', type=int, default=40)
+    args = parser.parse_args()
+
+    server = start_server(0, messages=args.messages, latency=args.latency_ms / 1000)
+    mailbox = server.mailbox
+    client = GmailClient(credentials=AnonymousCredentials(), api_endpoint=f"http://127.0.0.1:{server.server_address[1]}/")
+
+    with tempfile.TemporaryDirectory() as directory:
+        index = MailboxIndex(client, os.path.join(directory, 'mailbox.db'), full_sync_limit=2 * args.messages)
+
+        def step(name, action=index.sync):
+            ms, requests, changed = timed(server, action)
+            check_consistent(index, mailbox)
+            print(f"{name:28s} {ms:7.0f} ms  {requests:3d} HTTP requests  {changed:5d} messages changed")
+
+        print(f"{args.messages} messages, simulated round trip {args.latency_ms} ms")
+        step("full sync")
+        step("incremental, no changes")
+
+        new_ids = [mailbox.add(f"New {i}", 'Robin <robin@example.com>', f"New mail {i}") for i in range(5)]
+        for message_id in mailbox.order[5:10]:
+            mailbox.modify(message_id, remove=['UNREAD'])
+        mailbox.modify(new_ids[0], add=['STARRED'])
+        mailbox.delete(mailbox.order[-1])
+        step("incremental, 11 changes")
+
+        # Gmail rate limits single items in a batch; once is retried, a lasting failure must not lose the change
+        mailbox.modify(mailbox.order[10], remove=['UNREAD'])
+        server.failing_items[mailbox.order[10]] = 1
+        step("incremental, item 429 once")
+        mailbox.modify(mailbox.order[11], remove=['UNREAD'])
+        server.failing_items[mailbox.order[11]] = 100
+        history_id = index.history_id
+        ms, requests, _ = timed(server, index.sync)
+        assert index.history_id == history_id, "a failed fetch must not advance the history id"
+        print(f"{'incremental, item failing':28s} {ms:7.0f} ms  {requests:3d} HTTP requests  history id kept")
+        server.failing_items.clear()
+        step("incremental, after the error")
+
+        mailbox.add("After expiry", 'Robin <robin@example.com>', "Arrived while history expired")
+        mailbox.expire_history()
+        step("history expired, rebuild")
+
+        live_ms, _, _ = timed(server, lambda: list_recent_emails(client, 20))
+        first, last = mailbox.messages[mailbox.order[-1]], mailbox.messages[mailbox.order[0]]
+        queries = {
+            'recent inbox (20)': lambda: index.recent('INBOX', 20),
+            'from sender': lambda: index.from_sender('robin', 20),
+            'date range': lambda: index.between(int(first['internalDate']), int(last['internalDate']), 50),
+            'unread count': lambda: index.unread_count(),
+        }
+        print(f"live inbox fetch (20)        {live_ms:7.1f} ms")
+        for name, action in queries.items():
+            print(f"index: {name:21s} {query_latency(action):7.3f} ms")
+        index.close()
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
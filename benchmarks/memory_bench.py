@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""Prompt size over a long session with no memory, unbounded history and ConversationMemory.
+
+The agent runs its real tools against the fake Gmail server while the LLM
+is a scripted FunctionModel that records how many tokens each request
+carries. Inbox questions return a large listing; draft requests return an
+ID that a later follow-up ("send that draft") has to find in the history.
+
+    python benchmarks/memory_bench.py [--turns 30]
+"""
+import argparse
+import asyncio
+import os
+import re
+import sys
+
+os.environ.setdefault('OPENAI_API_KEY', 'unused')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pydantic_ai.messages import ModelResponse, TextPart, ToolCallPart, ToolReturnPart, UserPromptPart
+from pydantic_ai.models.function import FunctionModel
+
+import agent
+from agent.memory import estimate_tokens
+from fake_gmail_server import start_server, use_fake_gmail
+
+agent_module = sys.modules['agent.agent']
+
+QUESTIONS = [
+    "What's in my inbox?",
+    "Draft an email to sam@example.com saying I'll be late",
+    "Tell me a fun fact about octopuses",
+    "Any emails from Jordan?",
+    "How many unread emails do I have?",
+    "Explain how a heat pump works, briefly",
+]
+
+
+def scripted_model(prompt_tokens):
+    """FunctionModel stand-in for the LLM, recording the prompt size of every request"""
+
+    def respond(messages, info):
+        prompt_tokens.append(estimate_tokens(messages))
+        last = messages[-1].parts[-1]
+        if isinstance(last, UserPromptPart):
+            question = last.content.lower()
+            if 'send that draft' in question:
+                # Look the draft ID up in the history like the real model would
+                found = re.findall(r"Draft created with ID: (\w+)", str(messages))
+                if found:
+                    return ModelResponse([ToolCallPart.from_raw_args('send_draft', {'draft_id': found[-1]})])
+                return final("I don't know which draft you mean.")
+            if 'inbox' in question:
+                return ModelResponse([ToolCallPart.from_raw_args('recent_emails', {'max_results': 50})])
+            if 'from jordan' in question:
+                return ModelResponse([ToolCallPart.from_raw_args('emails_from', {'sender': 'jordan', 'max_results': 20})])
+            if 'unread' in question:
+                return ModelResponse([ToolCallPart.from_raw_args('unread_email_count', {})])
+            if 'draft' in question:
+                return ModelResponse([ToolCallPart.from_raw_args(
+                    'create_draft_email', {'subject': 'Running late', 'body': "I'll be late", 'to': 'sam@example.com'}
+                )])
+            return final("Here is a reasonably detailed answer to that question. " * 4)
+        if isinstance(last, ToolReturnPart):
+            return final(f"Done. {str(last.content)[:80]}")
+        return ModelResponse([TextPart("ok")])
+
+    return FunctionModel(respond)
+
+
+def final(answer):
+    return ModelResponse([ToolCallPart.from_raw_args('final_result', {'answer': answer, 'confidence': 0.9})])
+
+
+async def session(turns, memory_factory):
+    prompt_tokens = []
+    memory = memory_factory()
+    sent = None
+    with agent_module.agent.override(model=scripted_model(prompt_tokens)):
+        for turn in range(turns):
+            question = QUESTIONS[turn % len(QUESTIONS)]
+            await agent.process_query(question, memory)
+            if turn == turns - 1:
+                response = await agent.process_query("Please send that draft", memory)
+                sent = response.answer
+    return prompt_tokens, sent
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--turns', type=int, default=30)
+    args = parser.parse_args()
+
+    server = start_server(0, messages=300, latency=0)
+    use_fake_gmail(server)
+
+    configurations = {
+        'no memory': lambda: None,
+        'unbounded history': lambda: agent.ConversationMemory(max_tokens=10**9, max_tool_chars=10**9),
+        'ConversationMemory': agent.ConversationMemory,
+    }
+    for name, factory in configurations.items():
+        prompt_tokens, sent = asyncio.run(session(args.turns, factory))
+        print(f"{name:20s} prompt tokens per request: mean {sum(prompt_tokens) / len(prompt_tokens):6.0f}, "
+              f"max {max(prompt_tokens):6d}, total {sum(prompt_tokens):7d}; follow-up: {sent!r}")
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
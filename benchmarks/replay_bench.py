@@ -0,0 +1,401 @@
+#!/usr/bin/env python3
+"""Replay a corpus of WAV files through the full assistant loop, with stub backends.
+
+Each corpus file holds one interaction: a wake word followed by a request.
+The files are fed in real time as a virtual capture device into the same
+Assistant that va.py runs, waiting for every turn to finish before the next
+file. Speech-to-text returns the transcript from the manifest, the LLM is a
+scripted streaming model, and TTS and Gmail are the local fake servers, each
+with a configurable latency. Reports end-to-end latency (end of speech to
+first audio), per-stage latencies, missed wake words and CPU usage, and can
+fail the run when latency or misses exceed a limit.
+
+A corpus is a directory with a manifest.json list of
+{"wav": "file.wav", "transcript": "...", "speech_end": seconds}. Without
+--corpus a synthetic one is generated: a tone stands in for the wake word
+(detected by ToneWakeEngine) and harmonic bursts for speech. Recordings of
+the real wake word can be replayed through Porcupine with --porcupine
+(ACCESS_KEY and KEYWORD_PATH from the environment).
+
+    python benchmarks/replay_bench.py [--utterances 8] [--llm-ms 600] [--max-p95-ms 2500]
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import queue
+import random
+import sys
+import tempfile
+import threading
+import time
+import wave
+
+import numpy as np
+
+os.environ.setdefault('OPENAI_API_KEY', 'unused')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pydantic_ai.messages import ToolReturnPart, UserPromptPart
+from pydantic_ai.models.function import DeltaToolCall, FunctionModel
+
+import agent
+from assistant import Assistant
+from barge_in_bench import speech_like
+from fake_gmail_server import start_server as start_gmail_server, use_fake_gmail
+from fake_tts_server import start_server as start_tts_server
+from tts_bench import RealtimeNullOutput
+from voice import NOTIFICATION_CUE, SpeechCache, SpeechToText, StreamingSpeaker, WakeStream, create_speech_to_text
+
+agent_module = sys.modules['agent.agent']
+
+SAMPLE_RATE = 16000
+WAKE_TONE_HZ = 2800
+REQUESTS = [
+    "what's in my inbox",
+    "draft an email to sam saying I'll be late",
+    "how many unread emails do I have",
+    "what time is it",
+    "tell me something interesting about octopuses",
+    "any emails from jordan",
+    "draft an email to alex saying thanks for the report",
+    "what's the weather usually like in march",
+]
+
+
+class ToneWakeEngine:
+    """Stands in for Porcupine: fires once per burst of a pure tone, one frequency per keyword.
+
+    process() returns the index of the keyword (frequency) that fired, or -1.
+    """
+
+    sample_rate = SAMPLE_RATE
+    frame_length = 512
+
+    def __init__(self, frequencies=(WAKE_TONE_HZ,), min_seconds: float = 0.2, min_ratio: float = 0.5):
+        self.min_frames = max(1, int(min_seconds * self.sample_rate / self.frame_length))
+        self.min_ratio = min_ratio
+        t = np.arange(self.frame_length) / self.sample_rate
+        self._probes = np.exp(-2j * np.pi * np.outer(frequencies, t))
+        self._runs = np.zeros(len(frequencies), dtype=int)
+
+    def process(self, frame) -> int:
+        samples = np.asarray(frame, dtype=np.float64)
+        energy = np.dot(samples, samples)
+        # Share of the frame's energy at each tone frequency (1.0 for a pure tone)
+        ratios = 2 * np.abs(self._probes @ samples) ** 2 / (len(samples) * energy) if energy else 0.0
+        self._runs = np.where(ratios >= self.min_ratio, self._runs + 1, 0)
+        fired = np.flatnonzero(self._runs == self.min_frames)
+        return int(fired[0]) if len(fired) else -1
+
+    def delete(self):
+        pass
+
+
+class ScriptedSpeechToText(SpeechToText):
+    """Returns the manifest transcript of the clip being replayed, revealing words as audio arrives"""
+
+    name = 'scripted'
+
+    def __init__(self, sample_rate: int, transcript, latency: float, words_per_second: float = 2.5):
+        super().__init__(sample_rate)
+        self.transcript = transcript
+        self.latency = latency
+        self.words_per_second = words_per_second
+        self._seconds = 0.0
+
+    def start(self):
+        self._seconds = 0.0
+
+    def accept(self, data: bytes) -> str:
+        self._seconds += len(data) / self.sample_width / self.sample_rate
+        words = self.transcript().split()
+        return ' '.join(words[:int(self._seconds * self.words_per_second)])
+
+    def finish(self) -> str:
+        time.sleep(self.latency)
+        return self.transcript()
+
+
+class WavInput:
+    """A virtual capture device: publishes queued clips in real time, and quiet room noise in between"""
+
+    def __init__(self, sample_rate: int, block_length: int, noise_amplitude: float = 30.0):
+        self.sample_rate = sample_rate
+        self.block_length = block_length
+        self.noise_amplitude = noise_amplitude
+        self._clips = queue.Queue()
+        self._thread = None
+        self._stopping = threading.Event()
+
+    def play(self, pcm: np.ndarray) -> float:
+        """Replay a clip and block until it has been published; returns the monotonic time of its sample 0"""
+        done = queue.Queue()
+        self._clips.put((pcm, done))
+        return done.get()
+
+    def start(self, on_block) -> bool:
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, args=(on_block,), daemon=True)
+        self._thread.start()
+        return True
+
+    def is_active(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def close(self):
+        self._stopping.set()
+
+    def _run(self, on_block):
+        rng = np.random.default_rng(0)
+        block_seconds = self.block_length / self.sample_rate
+        deadline = time.monotonic()
+        clip, done, offset, origin = None, None, 0, None
+        while not self._stopping.is_set():
+            if clip is None:
+                try:
+                    clip, done = self._clips.get_nowait()
+                    offset, origin = 0, deadline
+                except queue.Empty:
+                    pass
+            noise = rng.normal(0, self.noise_amplitude, self.block_length)
+            if clip is not None:
+                block = clip[offset:offset + self.block_length]
+                noise[:len(block)] += block
+                offset += self.block_length
+            # A block is published once all of it has been "captured"
+            deadline += block_seconds
+            time.sleep(max(0.0, deadline - time.monotonic()))
+            on_block(np.clip(noise, -32768, 32767).astype(np.int16).tobytes())
+            if clip is not None and offset >= len(clip):
+                done.put(origin)
+                clip = None
+
+
+def wake_tone(frequency: float = WAKE_TONE_HZ, amplitude: float = 4000.0, seconds: float = 0.3) -> np.ndarray:
+    """The synthetic wake word: a tone burst with 10 ms fades"""
+    t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    return amplitude * np.sin(2 * np.pi * frequency * t) * np.minimum(1, np.minimum(t, t[-1] - t) / 0.01)
+
+
+def synthetic_corpus(directory: str, count: int, rng: random.Random) -> list:
+    """Write count interactions (noise, wake tone, request) and return the manifest"""
+    manifest = []
+    for i in range(count):
+        transcript = REQUESTS[i % len(REQUESTS)]
+        tone = wake_tone()
+        speech = speech_like(SAMPLE_RATE, 0.35 * len(transcript.split()), np.random.default_rng(i),
+                             pitch=rng.uniform(110, 200))
+        parts = [np.zeros(int(rng.uniform(0.5, 1.0) * SAMPLE_RATE)), tone, np.zeros(int(0.3 * SAMPLE_RATE)), speech]
+        speech_end = sum(len(part) for part in parts) / SAMPLE_RATE
+        parts.append(np.zeros(int(1.0 * SAMPLE_RATE)))
+        name = f"{i:03d}.wav"
+        with wave.open(os.path.join(directory, name), 'w') as wav_file:
+            wav_file.setnchannels(1)
+            wav_file.setsampwidth(2)
+            wav_file.setframerate(SAMPLE_RATE)
+            wav_file.writeframes(np.concatenate(parts).astype(np.int16).tobytes())
+        manifest.append({'wav': name, 'transcript': transcript, 'speech_end': round(speech_end, 3)})
+    with open(os.path.join(directory, 'manifest.json'), 'w') as f:
+        json.dump(manifest, f, indent=1)
+    return manifest
+
+
+def read_wav(path: str):
+    with wave.open(path) as wav_file:
+        if wav_file.getnchannels() != 1 or wav_file.getsampwidth() != 2:
+            raise ValueError(f"{path}: expected mono 16-bit PCM")
+        pcm = np.frombuffer(wav_file.readframes(wav_file.getnframes()), dtype=np.int16)
+        return wav_file.getframerate(), pcm.astype(np.float64)
+
+
+def scripted_llm(latency: float):
+    """Streaming LLM stand-in: tools for inbox and draft requests, a short answer otherwise"""
+
+    async def stream(messages, info):
+        await asyncio.sleep(latency)
+        last = messages[-1].parts[-1]
+        answer = "Okay."
+        if isinstance(last, UserPromptPart):
+            words = last.content.lower().split()
+            if words[0] == 'draft':
+                to = words[words.index('to') + 1]
+                body = ' '.join(words[words.index('saying') + 1:])
+                yield {0: DeltaToolCall('create_draft_email', json.dumps({'subject': 'Note', 'body': body,
+                                                                          'to': f'{to}@example.com'}))}
+                return
+            if 'inbox' in words or 'unread' in words:
+                yield {0: DeltaToolCall('unread_email_count' if 'unread' in words else 'recent_emails',
+                                        json.dumps({} if 'unread' in words else {'max_results': 5}))}
+                return
+            if 'from' in words:
+                yield {0: DeltaToolCall('emails_from', json.dumps({'sender': words[-1], 'max_results': 5}))}
+                return
+            answer = "Here is a short answer. It has two sentences."
+        elif isinstance(last, ToolReturnPart):
+            answer = "Done, I took care of that."
+        yield {0: DeltaToolCall('final_result', '{"answer": "')}
+        for word in answer.split(' '):
+            await asyncio.sleep(0.02)
+            yield {0: DeltaToolCall(None, word + ' ')}
+        yield {0: DeltaToolCall(None, '", "confidence": 0.9}')}
+
+    return FunctionModel(stream_function=stream)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--corpus', help="directory with manifest.json and WAV files (default: synthetic)")
+    parser.add_argument('--utterances', type=int, default=8, help="size of the synthetic corpus")
+    parser.add_argument('--porcupine', action='store_true', help="detect the wake word with Porcupine")
+    parser.add_argument('--noise', type=float, default=30.0, help="room noise amplitude mixed into the input")
+    parser.add_argument('--asr', default='scripted', help="'scripted', or a real backend name such as 'vosk'")
+    parser.add_argument('--asr-ms', type=int, default=300, help="scripted ASR latency after end of speech")
+    parser.add_argument('--llm-ms', type=int, default=600, help="scripted LLM latency per model request")
+    parser.add_argument('--tts-ms', type=int, default=300, help="fake TTS time to first byte")
+    parser.add_argument('--gmail-ms', type=int, default=80, help="fake Gmail latency per request")
+    parser.add_argument('--idle-seconds', type=float, default=3.0, help="silence replayed first to measure idle CPU")
+    parser.add_argument('--json', help="write the results to this file")
+    parser.add_argument('--max-p95-ms', type=float, help="fail if p95 end-to-end latency exceeds this")
+    parser.add_argument('--max-missed', type=int, help="fail if more wake words than this are missed")
+    parser.add_argument('--verbose', action='store_true', help="show the assistant's own output")
+    args = parser.parse_args()
+
+    if args.corpus:
+        directory = args.corpus
+        with open(os.path.join(directory, 'manifest.json')) as f:
+            manifest = json.load(f)
+    else:
+        directory = tempfile.mkdtemp()
+        manifest = synthetic_corpus(directory, args.utterances, random.Random(0))
+    clips = [read_wav(os.path.join(directory, item['wav'])) for item in manifest]
+    sample_rate = clips[0][0]
+    if any(rate != sample_rate for rate, _ in clips):
+        raise ValueError("All corpus files must have the same sample rate")
+
+    if args.porcupine:
+        import pvporcupine
+        wake_engine = pvporcupine.create(access_key=os.getenv('ACCESS_KEY'), keyword_paths=[os.getenv('KEYWORD_PATH')])
+    else:
+        wake_engine = ToneWakeEngine()
+    audio_input = WavInput(sample_rate, int(wake_engine.frame_length * sample_rate / wake_engine.sample_rate),
+                           noise_amplitude=args.noise)
+
+    current = {'transcript': ''}
+    if args.asr == 'scripted':
+        speech_to_text = ScriptedSpeechToText(sample_rate, lambda: current['transcript'], args.asr_ms / 1000)
+    else:
+        speech_to_text = create_speech_to_text(args.asr, sample_rate)
+
+    gmail = start_gmail_server(0, messages=100, latency=args.gmail_ms / 1000)
+    use_fake_gmail(gmail)
+    tts = start_tts_server(0, first_byte_delay=args.tts_ms / 1000)
+    speaker = StreamingSpeaker(
+        agent.clients.openai(f"http://127.0.0.1:{tts.server_address[1]}/v1", api_key="fake"),
+        RealtimeNullOutput(),
+        cache=SpeechCache(None)
+    )
+    traces = []
+    agent.tracer.log = lambda line: traces.append(json.loads(line))
+
+    assistant = Assistant(
+        [WakeStream('replay', audio_input, wake_engine)],
+        speech_to_text,
+        speaker,
+        notification=NOTIFICATION_CUE,
+        speech_cache=speaker.cache,
+        # The scripted LLM makes no requests, and the pings would go to the real API
+        keep_warm=False,
+    )
+    assistant.start_capture()
+    loop_ready = threading.Event()
+
+    def serve():
+        async def run():
+            loop_ready.set()
+            await assistant.run()
+
+        with agent_module.agent.override(model=scripted_llm(args.llm_ms / 1000)):
+            asyncio.run(run())
+
+    output = sys.stdout if args.verbose else io.StringIO()
+    results = []
+    with contextlib.redirect_stdout(output):
+        threading.Thread(target=serve, daemon=True).start()
+        loop_ready.wait()
+
+        started, cpu_started = time.monotonic(), time.process_time()
+        time.sleep(args.idle_seconds)
+        idle_cpu = (time.process_time() - cpu_started) / (time.monotonic() - started)
+
+        started, cpu_started = time.monotonic(), time.process_time()
+        for item, (_, pcm) in zip(manifest, clips):
+            assistant.idle.wait()
+            turns_before = agent.tracer.turns
+            current['transcript'] = item['transcript']
+            origin = audio_input.play(pcm)
+            # The wake word is early in the clip, so its turn has started by the end of it
+            woke = agent.tracer.turns > turns_before or not assistant.idle.is_set()
+            if woke:
+                assistant.idle.wait(60)
+            latency = None
+            if woke and assistant.speech_queue.first_audio_at is not None:
+                latency = assistant.speech_queue.first_audio_at - (origin + item['speech_end'])
+            results.append({'transcript': item['transcript'], 'woke': woke, 'latency': latency})
+            print(f"{'woke' if woke else 'MISSED':6s} "
+                  f"{'-' if latency is None else f'{latency * 1000:.0f} ms':>8s}  {item['transcript']}",
+                  file=sys.stderr)
+        elapsed = time.monotonic() - started
+        turn_cpu = (time.process_time() - cpu_started) / elapsed
+        assistant.close()
+
+    latencies = [result['latency'] * 1000 for result in results if result['latency'] is not None]
+    missed = sum(not result['woke'] for result in results)
+    stages = agent.tracer.stage_stats()
+    summary = {
+        'utterances': len(results),
+        'missed_wake_words': missed,
+        'answered': len(latencies),
+        'latency_ms': {
+            'p50': float(np.percentile(latencies, 50)),
+            'p95': float(np.percentile(latencies, 95)),
+            'max': max(latencies),
+        } if latencies else None,
+        'cpu_idle_percent': idle_cpu * 100,
+        'cpu_replay_percent': turn_cpu * 100,
+        'stages_ms': {stage: {'p50': stats['p50_seconds'] * 1000, 'p95': stats['p95_seconds'] * 1000}
+                      for stage, stats in sorted(stages.items())},
+        'traces': len(traces),
+    }
+    print(f"\n{len(results)} utterances over {elapsed:.1f} s: {missed} wake words missed, {len(latencies)} answered")
+    if latencies:
+        print(f"end of speech -> first audio: p50 {summary['latency_ms']['p50']:.0f} ms, "
+              f"p95 {summary['latency_ms']['p95']:.0f} ms, max {summary['latency_ms']['max']:.0f} ms")
+    print(f"CPU: {summary['cpu_idle_percent']:.1f}% of a core idle (wake loop), "
+          f"{summary['cpu_replay_percent']:.1f}% during the replay")
+    print("stages (p50 / p95 ms):")
+    for stage, stats in summary['stages_ms'].items():
+        print(f"  {stage:28s} {stats['p50']:7.0f} {stats['p95']:7.0f}")
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(summary, f, indent=1)
+    gmail.shutdown()
+    tts.shutdown()
+
+    failures = []
+    if args.max_p95_ms is not None:
+        if not latencies:
+            failures.append("no turn was answered")
+        elif summary['latency_ms']['p95'] > args.max_p95_ms:
+            failures.append(f"p95 latency {summary['latency_ms']['p95']:.0f} ms > {args.max_p95_ms:.0f} ms")
+    if args.max_missed is not None and missed > args.max_missed:
+        failures.append(f"{missed} missed wake words > {args.max_missed}")
+    if failures:
+        print("FAIL: " + '; '.join(failures))
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
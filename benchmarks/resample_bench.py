@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""Compare CPU cost of the old per-frame FFT resample path with StreamingResampler.
+
+Run from the repo root: python benchmarks/resample_bench.py
+"""
+import os
+import sys
+import time
+
+import numpy as np
+from scipy import signal
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from voice import StreamingResampler
+
+FRAME_LENGTH = 512  # porcupine.frame_length
+TARGET_RATE = 16000  # porcupine.sample_rate
+SECONDS = 10
+
+
+def legacy_frames(audio, input_rate):
+    """The path va.py used before: FFT resample each frame, then truncate/pad"""
+    input_frame_length = int(FRAME_LENGTH * input_rate / TARGET_RATE)
+    for start in range(0, len(audio) - input_frame_length + 1, input_frame_length):
+        pcm = tuple(audio[start:start + input_frame_length])
+        resampled = signal.resample(np.array(pcm), int(len(pcm) * TARGET_RATE / input_rate)).astype(np.int16)
+        if len(resampled) > FRAME_LENGTH:
+            resampled = resampled[:FRAME_LENGTH]
+        elif len(resampled) < FRAME_LENGTH:
+            resampled = np.pad(resampled, (0, FRAME_LENGTH - len(resampled)))
+        yield resampled
+
+
+def streaming_frames(audio, input_rate):
+    input_frame_length = int(FRAME_LENGTH * input_rate / TARGET_RATE)
+    resampler = StreamingResampler(input_rate, TARGET_RATE, FRAME_LENGTH)
+    for start in range(0, len(audio) - input_frame_length + 1, input_frame_length):
+        yield from resampler.process(audio[start:start + input_frame_length])
+
+
+def cpu_per_audio_second(frames, audio, input_rate):
+    start = time.process_time()
+    count = sum(1 for _ in frames(audio, input_rate))
+    elapsed = time.process_time() - start
+    return elapsed / SECONDS * 1000, count
+
+
+def main():
+    rng = np.random.default_rng(0)
+    for input_rate in (44100, 48000):
+        audio = (rng.standard_normal(input_rate * SECONDS) * 3000).astype(np.int16)
+        legacy_ms, legacy_count = cpu_per_audio_second(legacy_frames, audio, input_rate)
+        stream_ms, stream_count = cpu_per_audio_second(streaming_frames, audio, input_rate)
+        print(f"{input_rate} Hz -> {TARGET_RATE} Hz")
+        print(f"  legacy FFT resample: {legacy_ms:7.2f} ms CPU per audio second ({legacy_count} frames)")
+        print(f"  streaming polyphase: {stream_ms:7.2f} ms CPU per audio second ({stream_count} frames)")
+
+
+if __name__ == '__main__':
+    main()
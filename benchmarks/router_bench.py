@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""Intent router in front of a mocked agent: per-turn source, latency and hit rate.
+
+The LLM is replaced with pydantic-ai's TestModel plus a fixed simulated
+model latency, so no API key or network access is needed. Inbox and sender
+questions call their mailbox tools against the fake Gmail server, as the
+real model would, so their answers must never come from the cache.
+
+    python benchmarks/router_bench.py [--model-latency-ms 1500]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+os.environ.setdefault('OPENAI_API_KEY', 'unused')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pydantic_ai.models.test import TestModel
+
+import agent
+from agent.router import IntentClassifier, IntentRouter
+from fake_gmail_server import start_server, use_fake_gmail
+
+agent_module = sys.modules['agent.agent']
+
+SESSION = [
+    "What time is it?",
+    "What's in my inbox?",
+    "Hey, what's in my inbox",
+    "Summarize the email from Sam",
+    "what is the date today",
+    "Draft a reply to Sam saying I'll be late",
+    "Draft a reply to Sam saying I'll be late",
+    "Summarize the email from Sam please",
+    "what is 2 plus 3",
+    "what is 2 plus 4",
+    "Who wrote Hamlet?",
+    "so who wrote hamlet",
+    "Thanks!",
+    "do you know what time it is",
+    "what time is it in tokyo",
+    "what day is it today in sydney",
+    "never mind",
+    "What's in my inbox right now?",
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--model-latency-ms', type=int, default=1500)
+    args = parser.parse_args()
+
+    use_fake_gmail(start_server(0, messages=50, latency=0))
+    result_args = {
+        'answer': "Here is a mocked answer. It has two sentences.",
+        'confidence': 0.9,
+        'requires_followup': False,
+    }
+    agent_calls = []
+
+    def model_for(question):
+        if 'inbox' in question.lower():
+            return TestModel(call_tools=['recent_emails'], custom_result_args=result_args)
+        if 'from sam' in question.lower():
+            return TestModel(call_tools=['emails_from'], custom_result_args=result_args)
+        return TestModel(call_tools=[], custom_result_args=result_args)
+
+    async def run_agent(question, on_sentence):
+        agent_calls.append(question)
+        await asyncio.sleep(args.model_latency_ms / 1000)
+        with agent_module.agent.override(model=model_for(question)):
+            return await agent.process_query_stream(question, on_sentence)
+
+    for classifier in (None, IntentClassifier()):
+        router = IntentRouter(run_agent, classifier=classifier)
+        agent_calls.clear()
+        print(f"--- rules{' + classifier' if classifier else ''} ---")
+
+        async def session():
+            for question in SESSION:
+                sentences = []
+                started = time.perf_counter()
+                await router.route(question, sentences.append)
+                elapsed = (time.perf_counter() - started) * 1000
+                print(f"{elapsed:8.1f} ms  {router.last_source:13s} {question!r} -> {' '.join(sentences)!r}")
+
+        asyncio.run(session())
+        stats = router.stats()
+        assert agent_calls.count("Draft a reply to Sam saying I'll be late") == 2, "actions must not be cached"
+        assert "what is 2 plus 4" in agent_calls, "different questions must not share an answer"
+        assert {"what time is it in tokyo", "what day is it today in sydney"} <= set(agent_calls), (
+            "the local clock must not answer for another place"
+        )
+        assert "What's in my inbox right now?" in agent_calls, "answers from live tools must not be cached"
+        assert "so who wrote hamlet" not in agent_calls, "repeated questions should be answered from the cache"
+        print(f"{stats['turns']} turns: {stats['intent_hits']} intent, {stats['cache_hits']} cache "
+              f"({stats['hit_rate']:.0%} answered locally), {len(agent_calls)} agent calls, "
+              f"~{stats['saved_seconds']:.1f} s saved")
+
+
+if __name__ == '__main__':
+    main()
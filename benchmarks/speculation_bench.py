@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""Speculative agent runs on replayed partial transcripts: latency saved, waste and side effects.
+
+Each utterance is replayed as a word-by-word partial transcript. A partial
+counts as stable after PARTIAL_STABLE seconds without change and the final
+transcript arrives HANGOVER seconds after the last word, as with the
+endpointer. The agent runs for real (process_query_stream with memory and
+the Gmail tools against the fake server) with a scripted streaming model
+that takes MODEL_LATENCY per call. Reports the time from final transcript
+to first sentence with and without speculation and checks that held
+side effects (draft creation) happened exactly once, for the final text.
+
+    python benchmarks/speculation_bench.py
+"""
+import asyncio
+import base64
+import email
+import json
+import os
+import sys
+import time
+
+os.environ.setdefault('OPENAI_API_KEY', 'unused')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pydantic_ai.messages import ToolReturnPart, UserPromptPart
+from pydantic_ai.models.function import DeltaToolCall, FunctionModel
+
+import agent
+from fake_gmail_server import start_server, use_fake_gmail
+
+agent_module = sys.modules['agent.agent']
+
+WORD_SECONDS = 0.25
+PARTIAL_STABLE = 0.3
+HANGOVER = 0.5
+MODEL_LATENCY = 0.6
+
+# (words as recognized while speaking, final transcript, pauses after word index in seconds)
+UTTERANCES = [
+    ("what's in my inbox", "what's in my inbox", {}),
+    ("draft an email to sam saying I'll be late", "draft an email to sam saying I'll be late", {}),
+    # The user pauses mid-sentence: the first speculation is wasted, the second is accepted
+    ("draft an email to sam saying I'll be late tomorrow", "draft an email to sam saying I'll be late tomorrow", {7: 0.6}),
+    # The recognizer revises a word in the final transcript: the speculation is wasted
+    ("draft an email to sam saying I'm on my way", "draft an email to pam saying I'm on my way", {}),
+    ("tell me something interesting about octopuses", "tell me something interesting about octopuses", {}),
+]
+
+
+async def stream_model(messages, info):
+    """Scripted streaming LLM: drafts for 'draft ...', inbox listing for 'inbox', text otherwise"""
+    await asyncio.sleep(MODEL_LATENCY)
+    last = messages[-1].parts[-1]
+    if isinstance(last, UserPromptPart):
+        words = last.content.split()
+        if words[0] == 'draft':
+            to = words[words.index('to') + 1]
+            body = ' '.join(words[words.index('saying') + 1:])
+            yield {0: DeltaToolCall('create_draft_email', json.dumps({'subject': 'Note', 'body': body, 'to': to}))}
+            return
+        if 'inbox' in words:
+            yield {0: DeltaToolCall('recent_emails', json.dumps({'max_results': 5}))}
+            return
+        answer = "Octopuses have three hearts. Two pump blood to the gills. Their blood is blue."
+    elif isinstance(last, ToolReturnPart):
+        answer = f"Done. {str(last.content)[:60].splitlines()[0]}."
+    else:
+        answer = "Okay."
+    yield {0: DeltaToolCall('final_result', '{"answer": "')}
+    for word in answer.split(' '):
+        await asyncio.sleep(0.02)
+        yield {0: DeltaToolCall(None, json.dumps(word + ' ')[1:-1])}
+    yield {0: DeltaToolCall(None, '", "confidence": 0.9}')}
+
+
+async def replay(words, final, pauses, speculator):
+    """Feed partials on a real clock; returns seconds from final transcript to first sentence"""
+    first_sentence = asyncio.Event()
+    words = words.split()
+    stable_at = None
+    for i in range(len(words)):
+        await asyncio.sleep(WORD_SECONDS)
+        pause = pauses.get(i, 0.0)
+        if pause >= PARTIAL_STABLE:
+            await asyncio.sleep(PARTIAL_STABLE)
+            if speculator:
+                speculator.speculate(' '.join(words[:i + 1]))
+            await asyncio.sleep(pause - PARTIAL_STABLE)
+    await asyncio.sleep(PARTIAL_STABLE)
+    if speculator:
+        speculator.speculate(' '.join(words))
+    await asyncio.sleep(HANGOVER - PARTIAL_STABLE)
+
+    final_at = time.monotonic()
+    run = speculator.run if speculator else memory_run
+    task = asyncio.create_task(run(final, lambda sentence: first_sentence.set()))
+    await first_sentence.wait()
+    latency = time.monotonic() - final_at
+    await task
+    return latency
+
+
+memory = None
+
+def memory_run(text, on_sentence):
+    return agent.process_query_stream(text, on_sentence, memory)
+
+
+def drafted_recipients(mailbox, since):
+    recipients = []
+    for draft_id in sorted(mailbox.drafts, key=lambda d: int(d[1:])):
+        if int(draft_id[1:]) > since:
+            raw = mailbox.drafts[draft_id]['message']['raw']
+            recipients.append(email.message_from_bytes(base64.urlsafe_b64decode(raw))['to'])
+    return recipients
+
+
+def main():
+    global memory
+    server = start_server(0, messages=50, latency=0.04)
+    use_fake_gmail(server)
+    model = FunctionModel(stream_function=stream_model)
+
+    async def session(speculative):
+        global memory
+        memory = agent.ConversationMemory()
+        speculator = agent.Speculator(memory_run) if speculative else None
+        latencies = []
+        with agent_module.agent.override(model=model):
+            for words, final, pauses in UTTERANCES:
+                drafts_before = server.mailbox.draft_count
+                latency = await replay(words, final, pauses, speculator)
+                latencies.append(latency)
+                recipients = drafted_recipients(server.mailbox, drafts_before)
+                expected = [final.split()[final.split().index('to') + 1]] if final.startswith('draft') else []
+                assert recipients == expected, f"{final!r}: drafts to {recipients}, expected {expected}"
+                print(f"  {latency * 1000:6.0f} ms to first sentence  {final!r}")
+        # Every exchange is in memory exactly once
+        prompts = [part.content for message in memory.history() for part in message.parts
+                   if isinstance(part, UserPromptPart)]
+        assert prompts == [final for _, final, _ in UTTERANCES], prompts
+        return latencies, speculator
+
+    print("without speculation")
+    baseline, _ = asyncio.run(session(False))
+    print("with speculation")
+    speculative, speculator = asyncio.run(session(True))
+    stats = speculator.stats()
+    print(f"mean latency after final transcript: {sum(baseline) / len(baseline) * 1000:.0f} ms -> "
+          f"{sum(speculative) / len(speculative) * 1000:.0f} ms; {stats['accepted']} accepted, "
+          f"{stats['wasted']} wasted of {stats['started']} speculative runs, ~{stats['saved_seconds']:.2f} s saved")
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
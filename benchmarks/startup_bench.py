@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""Startup time: import cost per module and time until the wake-word engine sees its first frame.
+
+Each run is a fresh interpreter that starts up the way va.py does, with a
+silent virtual microphone and a stand-in wake engine (PyAudio and Porcupine
+are replaced, everything else is real). 'eager' imports and builds the whole
+assistant before listening, as va.py used to; 'lazy' starts wake-word
+detection first and then imports the agent, OpenAI and Gmail clients while
+it is already listening. Reports time to first frame and time until the
+assistant is ready, from interpreter launch, plus the slowest top-level
+imports of each path from python -X importtime.
+
+    python benchmarks/startup_bench.py [--runs 5]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+WAKE_IMPORTS = 'import numpy, voice'
+ASSISTANT_IMPORTS = 'import agent, assistant, openai, agent.gmail_tools'
+
+
+class SilentInput:
+    """Publishes blocks of silence in real time, like a quiet PyAudioInput"""
+
+    def __init__(self, sample_rate=16000, block_length=512):
+        self.sample_rate = sample_rate
+        self.block_length = block_length
+        self._active = False
+
+    def start(self, on_block):
+        self._active = True
+
+        def publish():
+            while self._active:
+                on_block(bytes(2 * self.block_length))
+                time.sleep(self.block_length / self.sample_rate)
+
+        threading.Thread(target=publish, daemon=True).start()
+        return True
+
+    def is_active(self):
+        return self._active
+
+    def close(self):
+        self._active = False
+
+
+class FirstFrameEngine:
+    """Porcupine stand-in that records when it is handed its first frame"""
+
+    sample_rate = 16000
+    frame_length = 512
+
+    def __init__(self):
+        self.first_frame = threading.Event()
+        self.first_frame_at = None
+
+    def process(self, frame):
+        if self.first_frame_at is None:
+            self.first_frame_at = time.monotonic()
+            self.first_frame.set()
+        return -1
+
+
+def build_assistant(streams, wake_word_engine=None):
+    import agent
+    from assistant import Assistant
+    from voice import SpeechToText, StreamingSpeaker
+    agent.gmail_tools.get_gmail_client()
+    return Assistant(
+        streams,
+        SpeechToText(16000),
+        StreamingSpeaker(agent.clients.openai(), None),
+        wake_word_engine=wake_word_engine
+    )
+
+
+def child(mode):
+    """One startup in this process; prints the monotonic times of first frame and readiness"""
+    sys.path.insert(0, ROOT)
+    from voice import WakeStream, WakeWordEngine
+    engine = FirstFrameEngine()
+    stream = WakeStream('startup', SilentInput(), engine)
+    callbacks = (lambda stream, pcm, decisions: None, lambda stream, keyword, detected_at: None)
+    if mode == 'eager':
+        # Everything is imported and built before listening starts
+        wake_word_engine = build_assistant([stream]).wake_word_engine
+        stream.start_capture()
+        wake_word_engine.start(*callbacks)
+        ready_at = time.monotonic()
+    else:
+        # Listening first, then the rest is imported and takes over the running engine
+        stream.start_capture()
+        wake_word_engine = WakeWordEngine([stream])
+        wake_word_engine.start(*callbacks)
+        build_assistant([stream], wake_word_engine)
+        ready_at = time.monotonic()
+    engine.first_frame.wait(10)
+    print(json.dumps({'first_frame': engine.first_frame_at, 'ready': ready_at}))
+
+
+def run(mode):
+    started = time.monotonic()
+    output = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), '--child', mode],
+        capture_output=True, text=True, check=True, env={**os.environ, 'OPENAI_API_KEY': 'unused'}
+    ).stdout
+    times = json.loads(output.splitlines()[-1])
+    return times['first_frame'] - started, times['ready'] - started
+
+
+def import_times(statement, top=6):
+    """The slowest top-level imports of statement as (cumulative microseconds, module), and their total"""
+    stderr = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', statement],
+        capture_output=True, text=True, cwd=ROOT, env={**os.environ, 'OPENAI_API_KEY': 'unused'}
+    ).stderr
+    modules = []
+    statement_imports = False
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line.split('|')
+        if statement_imports and not name[1:].startswith(' '):
+            modules.append((int(cumulative), name.strip()))
+        # Everything up to and including site is the interpreter's own startup
+        statement_imports = statement_imports or name.strip() == 'site'
+    return sorted(modules, reverse=True)[:top], sum(cumulative for cumulative, _ in modules)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--child', choices=['eager', 'lazy'], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        child(args.child)
+        return
+
+    for label, statement in (('wake-word path', WAKE_IMPORTS), ('assistant path', ASSISTANT_IMPORTS)):
+        modules, total = import_times(statement)
+        print(f"{label} ({statement}): {total / 1000:.0f} ms of imports")
+        for cumulative, name in modules:
+            print(f"  {name:40s} {cumulative / 1000:7.0f} ms")
+
+    for mode in ('eager', 'lazy'):
+        results = [run(mode) for _ in range(args.runs)]
+        first_frame = statistics.median(first for first, _ in results)
+        ready = statistics.median(ready for _, ready in results)
+        print(f"{mode:5s}: first wake-word frame after {first_frame * 1000:5.0f} ms, "
+              f"assistant ready after {ready * 1000:5.0f} ms (median of {args.runs})")
+
+
+if __name__ == '__main__':
+    main()
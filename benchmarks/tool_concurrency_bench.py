@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""Parallel tool calls against a slow fake Gmail backend, plus the per-tool metrics they produce.
+
+A scripted model asks for several tools in one step (three drafts and two
+index queries). The step is timed with tools offloaded to threads, and
+with the offload replaced by inline calls (how the tools used to block the
+event loop). A heartbeat task measures the worst event loop stall. Then
+tools are called with injected backend errors and the scrapeable metrics
+are printed.
+
+    python benchmarks/tool_concurrency_bench.py [--latency-ms 200]
+"""
+import argparse
+import asyncio
+import contextlib
+import os
+import sys
+import time
+from unittest import mock
+
+os.environ.setdefault('OPENAI_API_KEY', 'unused')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pydantic_ai.messages import ModelResponse, ToolCallPart, ToolReturnPart
+from pydantic_ai.models.function import FunctionModel
+
+import agent
+from agent import mailbox_index, tool_metrics
+from fake_gmail_server import start_server, use_fake_gmail
+
+agent_module = sys.modules['agent.agent']
+
+
+def model(messages, info):
+    if isinstance(messages[-1].parts[-1], ToolReturnPart):
+        return ModelResponse([ToolCallPart.from_raw_args('final_result', {'answer': 'Done.', 'confidence': 1.0})])
+    return ModelResponse([
+        *[
+            ToolCallPart.from_raw_args('create_draft_email', {'subject': f'Note {i}', 'body': 'Hi', 'to': 'sam@example.com'})
+            for i in range(3)
+        ],
+        ToolCallPart.from_raw_args('emails_from', {'sender': 'alex', 'max_results': 5}),
+        ToolCallPart.from_raw_args('unread_email_count', {}),
+    ])
+
+
+async def inline(func, *args, **kwargs):
+    return func(*args, **kwargs)
+
+
+async def run_step():
+    """Run one agent turn; returns (seconds, worst event loop stall in seconds)"""
+    stalls = []
+
+    async def heartbeat():
+        while True:
+            before = time.perf_counter()
+            await asyncio.sleep(0.005)
+            stalls.append(time.perf_counter() - before - 0.005)
+
+    beat = asyncio.create_task(heartbeat())
+    started = time.perf_counter()
+    with agent_module.agent.override(model=FunctionModel(model)):
+        await agent.process_query("Draft three notes to Sam and tell me about Alex's mail")
+    elapsed = time.perf_counter() - started
+    beat.cancel()
+    return elapsed, max(stalls)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--latency-ms', type=int, default=200)
+    args = parser.parse_args()
+
+    server = start_server(0, messages=200, latency=0.0)
+    use_fake_gmail(server)
+    # Build the index up front and keep it fresh for the run, so only the tools' own requests are timed
+    mailbox_index.get_mailbox_index().sync()
+    mailbox_index.get_mailbox_index().max_age_seconds = 3600
+    server.latency = args.latency_ms / 1000
+
+    print(f"backend latency {args.latency_ms} ms, 5 tool calls in one model step")
+    variants = (
+        ('inline (blocking)', mock.patch('asyncio.to_thread', inline)),
+        ('offloaded', contextlib.nullcontext()),
+    )
+    for name, patch in variants:
+        with patch:
+            tool_metrics.reset()
+            elapsed, stall = asyncio.run(run_step())
+        serial = sum(tool['mean_seconds'] * tool['calls'] for tool in tool_metrics.snapshot().values())
+        print(f"{name:18s} turn {elapsed * 1000:5.0f} ms, sum of tool times {serial * 1000:5.0f} ms, "
+              f"worst event loop stall {stall * 1000:5.0f} ms")
+
+    tool_metrics.reset()
+    server.latency = 0.02
+    server.error_rate = 0.3
+    create_draft = agent_module.agent._function_tools['create_draft_email'].function
+
+    async def calls():
+        results = await asyncio.gather(
+            *[create_draft(None, 'Subject', 'Body', 'sam@example.com') for _ in range(40)],
+            return_exceptions=True
+        )
+        return sum(isinstance(result, Exception) for result in results)
+
+    failed = asyncio.run(calls())
+    snapshot = tool_metrics.snapshot()['create_draft_email']
+    print(f"\n40 create_draft_email calls at 30% injected errors: {failed} raised, "
+          f"recorded error rate {snapshot['error_rate']:.0%}, mean {snapshot['mean_seconds'] * 1000:.0f} ms")
+    print(tool_metrics.render_prometheus())
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
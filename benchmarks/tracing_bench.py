@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""Per-turn tracing: span overhead, a traced simulated turn, and the scraped metrics.
+
+Measures the cost of a span with and without an active turn, then runs
+simulated turns through the real pipeline pieces: listen and ASR (sleeps in
+a worker thread), process_query_stream with a scripted streaming model that
+drafts an email through the Gmail tool against the fake server, and a
+SpeechQueue with a fake speaker that synthesizes and plays at fixed rates.
+Prints the last turn's breakdown and JSON log line, then fetches /metrics
+from the metrics server.
+
+    python benchmarks/tracing_bench.py [--turns 20]
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+import urllib.request
+
+os.environ.setdefault('OPENAI_API_KEY', 'unused')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pydantic_ai.messages import ToolReturnPart
+from pydantic_ai.models.function import DeltaToolCall, FunctionModel
+
+import agent
+from agent import tool_metrics, tracer
+from fake_gmail_server import start_server, use_fake_gmail
+from voice import SpeechQueue
+
+agent_module = sys.modules['agent.agent']
+
+
+async def stream_model(messages, info):
+    await asyncio.sleep(random.uniform(0.2, 0.4))
+    if not isinstance(messages[-1].parts[-1], ToolReturnPart):
+        yield {0: DeltaToolCall('create_draft_email', json.dumps({'subject': 'Late', 'body': 'Running late',
+                                                                  'to': 'sam@example.com'}))}
+        return
+    yield {0: DeltaToolCall('final_result', '{"answer": "')}
+    for word in "Done. I drafted the email to Sam. Anything else?".split(' '):
+        await asyncio.sleep(0.02)
+        yield {0: DeltaToolCall(None, word + ' ')}
+    yield {0: DeltaToolCall(None, '", "confidence": 0.9}')}
+
+
+class FakeOutput:
+    def write(self, pcm):
+        time.sleep(len(pcm) / 48000 / 20)  # 20x faster than real time
+
+
+class FakeSpeaker:
+    output = FakeOutput()
+
+    def stream(self, text):
+        time.sleep(0.08)
+        for _ in range(len(text) // 10 + 1):
+            time.sleep(0.005)
+            yield b'\0' * 4800
+
+
+def span_overhead(n=100_000):
+    started = time.perf_counter()
+    for _ in range(n):
+        with tracer.span('bench'):
+            pass
+    idle = (time.perf_counter() - started) / n
+    trace = tracer.start_turn('bench')
+    started = time.perf_counter()
+    for _ in range(n):
+        with tracer.span('bench'):
+            pass
+    active = (time.perf_counter() - started) / n
+    trace.spans.clear()
+    tracer.reset()
+    return idle, active
+
+
+def blocking_stage(seconds):
+    time.sleep(seconds)
+    return "draft an email to sam"
+
+
+async def turn(speech_queue):
+    detected_at = time.monotonic()
+    trace = tracer.start_turn('hotword', detected_at)
+    await asyncio.sleep(0.002)
+    tracer.record('wake', detected_at)
+    with tracer.span('notification'):
+        await asyncio.to_thread(time.sleep, 0.1)
+    with tracer.span('listen'):
+        await asyncio.to_thread(blocking_stage, random.uniform(0.8, 1.5))
+    with tracer.span('asr'):
+        text = await asyncio.to_thread(blocking_stage, random.uniform(0.15, 0.4))
+    started = time.monotonic()
+    with tracer.span('answer'):
+        await agent.process_query_stream(text, speech_queue.put)
+    with tracer.span('speech.drain'):
+        await asyncio.to_thread(speech_queue.join)
+    tracer.record('first_audio', started, speech_queue.first_audio_at)
+    tracer.finish(trace)
+    return trace
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--turns', type=int, default=20)
+    args = parser.parse_args()
+
+    idle, active = span_overhead()
+    print(f"span overhead: {idle * 1e9:.0f} ns between turns, {active * 1e9:.0f} ns in a traced turn")
+
+    server = start_server(0, messages=20, latency=0.05)
+    use_fake_gmail(server)
+    log_lines = []
+    tracer.log = log_lines.append
+    metrics = agent.start_metrics_server(0, tracer.render_prometheus, tool_metrics.render_prometheus, host='127.0.0.1')
+    speech_queue = SpeechQueue(FakeSpeaker(), on_span=tracer.record)
+
+    async def session():
+        with agent_module.agent.override(model=FunctionModel(stream_function=stream_model)):
+            for _ in range(args.turns):
+                trace = await turn(speech_queue)
+        return trace
+
+    trace = asyncio.run(session())
+    print(f"\nlast of {args.turns} turns:\n{trace.breakdown()}")
+    print(f"\nJSON log line ({len(log_lines)} written):\n{log_lines[-1]}")
+
+    print("\nstage latency over all turns (ms):")
+    for stage, stats in sorted(tracer.stage_stats().items()):
+        print(f"  {stage:28s} n={stats['count']:3d}  p50 {stats['p50_seconds'] * 1000:6.0f}  "
+              f"p95 {stats['p95_seconds'] * 1000:6.0f}  p99 {stats['p99_seconds'] * 1000:6.0f}")
+
+    url = f"http://127.0.0.1:{metrics.server_address[1]}/metrics"
+    scraped = urllib.request.urlopen(url).read().decode()
+    quantiles = [line for line in scraped.splitlines()
+                 if line.startswith('voice_stage_recent_seconds{stage="turn"') or line.startswith('agent_tool_calls')]
+    print(f"\nscraped {url}: {len(scraped.splitlines())} lines, e.g.\n" + '\n'.join(quantiles))
+    metrics.shutdown()
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
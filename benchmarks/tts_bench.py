@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""Measure time-to-first-audio of StreamingSpeaker against the fake TTS server.
+
+Playback goes to a null output that consumes audio at real-time speed, so
+the numbers reflect what a listener would hear without needing a device.
+
+    python benchmarks/tts_bench.py [--first-byte-ms 300]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from openai import OpenAI
+
+from fake_tts_server import start_server
+from voice import PCM_SAMPLE_RATE, StreamingSpeaker
+
+RESPONSES = [
+    "Draft created.",
+    "You have three new emails, the most recent is from Alex about the quarterly report.",
+    "Sure, I can help with that. Who should the email go to, and what would you like it to say?",
+]
+
+
+class RealtimeNullOutput:
+    """Accepts PCM like a PyAudio output stream and blocks for its playback duration"""
+
+    def __init__(self):
+        self.played = 0.0
+
+    def write(self, data):
+        seconds = len(data) / 2 / PCM_SAMPLE_RATE
+        self.played += seconds
+        time.sleep(seconds)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--first-byte-ms', type=int, default=300)
+    parser.add_argument('--realtime-factor', type=float, default=0.2)
+    args = parser.parse_args()
+
+    server = start_server(0, args.first_byte_ms / 1000, args.realtime_factor)
+    client = OpenAI(base_url=f"http://127.0.0.1:{server.server_address[1]}/v1", api_key="fake")
+    output = RealtimeNullOutput()
+    speaker = StreamingSpeaker(client, output)
+
+    for text in RESPONSES:
+        played_before = output.played
+        started = time.monotonic()
+        time_to_first_audio = speaker.speak(text)
+        total = time.monotonic() - started
+        print(f"{len(text):3d} chars: time to first audio {1000 * time_to_first_audio:6.0f} ms, "
+              f"total {1000 * total:6.0f} ms for {output.played - played_before:.2f} s of audio")
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
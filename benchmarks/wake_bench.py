@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""Multi-stream wake-word detection: CPU per stream, detection latency and routing.
+
+Runs WakeWordEngine on N virtual microphones (WavInput from replay_bench)
+fed in real time. Each event is a wake word spoken in one room: that room's
+mic gets it at full level, every other mic later and quieter, as if heard
+through the house. Two keywords (two tones) stand in for per-user keyword
+files. Reports each stream's CPU share and detection latency, missed wake
+words, and whether the first stream to fire (which wins the turn) was the
+room the wake word was spoken in.
+
+With --porcupine the engines are real Porcupine instances (ACCESS_KEY and
+KEYWORD_PATH, os.pathsep-separated for several keywords) and the streams
+carry only room noise, which measures Porcupine's CPU cost per stream.
+
+    python benchmarks/wake_bench.py [--streams 1 2 4 8] [--events 6]
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from replay_bench import SAMPLE_RATE, ToneWakeEngine, WavInput, wake_tone
+from voice import WakeStream, WakeWordEngine, keyword_name
+
+KEYWORDS = {'alex': 2800, 'sam': 3300}
+
+
+def create_engines(count, porcupine):
+    if not porcupine:
+        return [ToneWakeEngine(list(KEYWORDS.values())) for _ in range(count)], list(KEYWORDS)
+    import pvporcupine
+    paths = os.getenv('KEYWORD_PATH').split(os.pathsep)
+    engines = [pvporcupine.create(access_key=os.getenv('ACCESS_KEY'), keyword_paths=paths) for _ in range(count)]
+    return engines, [keyword_name(path) for path in paths]
+
+
+def run(count, events, porcupine, seconds):
+    engines, keywords = create_engines(count, porcupine)
+    streams = [
+        WakeStream(f"room{i}", WavInput(SAMPLE_RATE, engine.frame_length), engine, keywords=keywords)
+        for i, engine in enumerate(engines)
+    ]
+    detections = []
+    lock = threading.Lock()
+
+    def on_wake(stream, keyword, detected_at):
+        with lock:
+            detections.append((detected_at, stream.name, keyword))
+
+    for stream in streams:
+        stream.start_capture()
+    engine = WakeWordEngine(streams)
+    engine.start(lambda stream, pcm, decisions: None, on_wake)
+
+    rng = np.random.default_rng(count)
+    results = []
+    if porcupine:
+        time.sleep(seconds)
+    for event in range(events):
+        room = event % count
+        keyword = event % len(keywords)
+        tone = wake_tone(KEYWORDS[keywords[keyword]])
+        clips = []
+        for i in range(count):
+            # Other rooms hear it 10-30 ms later and 12-24 dB quieter
+            delay = 0 if i == room else int(rng.uniform(0.01, 0.03) * SAMPLE_RATE)
+            gain = 1.0 if i == room else 10 ** (-rng.uniform(12, 24) / 20)
+            clips.append(np.concatenate((np.zeros(int(0.3 * SAMPLE_RATE) + delay), gain * tone,
+                                         np.zeros(int(0.7 * SAMPLE_RATE) - delay))))
+        started = time.monotonic()
+        players = [threading.Thread(target=stream.audio_input.play, args=(clip,))
+                   for stream, clip in zip(streams, clips)]
+        for player in players:
+            player.start()
+        for player in players:
+            player.join()
+        with lock:
+            heard = sorted(detection for detection in detections if detection[0] >= started)
+        results.append({
+            'room': f"room{room}",
+            'keyword': keywords[keyword],
+            'first': heard[0][1] if heard else None,
+            'first_keyword': heard[0][2] if heard else None,
+            'missed': not any(name == f"room{room}" for _, name, _ in heard),
+        })
+
+    engine.stop()
+    for stream in streams:
+        stream.close()
+    return engine.stats(), results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--streams', type=int, nargs='+', default=[1, 2, 4, 8])
+    parser.add_argument('--events', type=int, default=6)
+    parser.add_argument('--porcupine', action='store_true')
+    parser.add_argument('--seconds', type=float, default=10.0, help="noise-only run length with --porcupine")
+    args = parser.parse_args()
+
+    for count in args.streams:
+        stats, results = run(count, 0 if args.porcupine else args.events, args.porcupine, args.seconds)
+        cpu = [stream['cpu_percent'] for stream in stats.values()]
+        latencies = [stream['latency_p50_seconds'] * 1000 for stream in stats.values()
+                     if stream['latency_p50_seconds'] is not None]
+        line = (f"{count} streams: CPU per stream mean {np.mean(cpu):.1f}% max {max(cpu):.1f}% "
+                f"(total {sum(cpu):.1f}% of a core)")
+        if results:
+            routed = sum(result['first'] == result['room'] and result['first_keyword'] == result['keyword']
+                         for result in results)
+            missed = sum(result['missed'] for result in results)
+            line += (f", detection latency p50 {np.median(latencies):.1f} ms, {missed} of {len(results)} missed, "
+                     f"{routed} routed to the speaker's room")
+        print(line)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,365 +1,270 @@
 #!/usr/bin/env python3
+import argparse
+import asyncio
 import os
+import sys
+import threading
+import time
+# Taken before the third-party imports so the startup times printed include them
+STARTED_AT = time.monotonic()
 from dotenv import load_dotenv
 import pvporcupine
 import pyaudio
-import struct
-import speech_recognition as sr
-import agent  # Change back to importing the whole module
-import subprocess
-from openai import OpenAI  # Add OpenAI import
-import numpy as np
-import wave
-from playsound import playsound
-from scipy import signal  # Add this import at the top
-import sys
-import time
-
-# Load environment variables from .env file
-load_dotenv()
-
-access_key = os.getenv('ACCESS_KEY')
-keyword_path = os.getenv('KEYWORD_PATH')
-
-# Initialize Porcupine with the downloaded keyword file and specified sample rate
-porcupine = pvporcupine.create(
-    access_key=access_key,
-    keyword_paths=[keyword_path],
+# Only what wake-word detection needs is imported up front; the agent, OpenAI and Gmail
+# clients are imported in build_assistant() once Porcupine is already listening
+from voice import (
+    NOTIFICATION_CUE,
+    PCM_SAMPLE_RATE,
+    PyAudioInput,
+    WakeStream,
+    WakeWordEngine,
+    keyword_name,
 )
 
-pa = pyaudio.PyAudio()  # Initialize PyAudio first
+def parse_args():
+    parser = argparse.ArgumentParser(description="Wake-word voice assistant")
+    parser.add_argument('--trace', action='store_true', default=os.getenv('TRACE_TURNS', '0') == '1',
+                        help="print a per-stage latency breakdown after each turn")
+    parser.add_argument('--trace-log', default=os.getenv('TRACE_LOG'),
+                        help="append every turn's trace as a JSON line to this file ('-' for stdout)")
+    parser.add_argument('--metrics-port', type=int, default=int(os.getenv('METRICS_PORT', '0')),
+                        help="serve Prometheus metrics at http://<host>:PORT/metrics (0 disables)")
+    parser.add_argument('--list-devices', action='store_true', help="print the available audio devices and exit")
+    return parser.parse_args()
+
+def list_devices(pa):
+    print("Available audio devices:")
+    for i in range(pa.get_device_count()):
+        device_info = pa.get_device_info_by_index(i)
+        print(f"Device {i}: {device_info['name']}")
 
-# Print available audio devices
-print("Available audio devices:")
-for i in range(pa.get_device_count()):
-    device_info = pa.get_device_info_by_index(i)
-    print(f"Device {i}: {device_info['name']}")
+def find_input_devices(pa):
+    """Return the input device indices to listen on.
 
-# Try to find the default input device
-default_input_device = None
-for i in range(pa.get_device_count()):
-    device_info = pa.get_device_info_by_index(i)
-    if device_info['maxInputChannels'] > 0:
-        default_input_device = i
+    INPUT_DEVICES is a comma-separated list of device indices, one stream per
+    microphone; by default the first input device is used, without querying
+    every device (run with --list-devices to see them all).
+    """
+    if os.getenv('INPUT_DEVICES'):
+        devices = [int(device) for device in os.getenv('INPUT_DEVICES').split(',')]
+    else:
+        devices = next(
+            ([i] for i in range(pa.get_device_count()) if pa.get_device_info_by_index(i)['maxInputChannels'] > 0),
+            []
+        )
+    if not devices:
+        raise RuntimeError("No input device found")
+    for i in devices:
+        device_info = pa.get_device_info_by_index(i)
         print(f"Using device: {device_info['name']}")
         print(f"Default sample rate: {int(device_info['defaultSampleRate'])}")
-        break
+    return devices
 
-if default_input_device is None:
-    raise RuntimeError("No input device found")
+def keyword_paths(device):
+    """Keyword files for a device: KEYWORD_PATH_<device> if set, else KEYWORD_PATH.
 
-# Get device info to check supported sample rate
-device_info = pa.get_device_info_by_index(default_input_device)
-supported_sample_rate = int(device_info['defaultSampleRate'])
+    Either may list several files separated by os.pathsep, e.g. one per user.
+    """
+    paths = os.getenv(f'KEYWORD_PATH_{device}') or os.getenv('KEYWORD_PATH')
+    return paths.split(os.pathsep)
 
-# Check if the device's sample rate matches Porcupine's required rate
-if supported_sample_rate != porcupine.sample_rate:
-    print(f"Warning: Device sample rate ({supported_sample_rate}) differs from Porcupine's required rate ({porcupine.sample_rate})")
-    # You might need to use a different device or configure your system's audio settings
-
-# Modify the audio stream setup to be more robust
-def create_audio_stream(pa, device_index, sample_rate, frame_length):
+# Persistent output stream for speech; TTS audio is written into it as it streams in
+def create_output_stream(pa, device_index, sample_rate):
     try:
         return pa.open(
             rate=sample_rate,
             channels=1,
             format=pyaudio.paInt16,
-            input=True,
-            frames_per_buffer=frame_length,
-            input_device_index=device_index
+            output=True,
+            output_device_index=device_index
         )
     except OSError as e:
-        print(f"Error opening audio stream: {e}")
+        print(f"Error opening output stream: {e}")
         return None
 
-# Replace the audio_stream initialization with:
-audio_stream = create_audio_stream(
-    pa,
-    default_input_device,
-    supported_sample_rate,
-    int(porcupine.frame_length * supported_sample_rate / porcupine.sample_rate)
-)
+def build_assistant(args, streams, wake_word_engine, output_stream, sample_rate):
+    """Import and set up everything a turn needs beyond wake-word detection.
 
-if audio_stream is None:
-    print("Failed to initialize audio stream. Exiting.")
-    sys.exit(1)
-
-recognizer = sr.Recognizer()  # Initialize the recognizer
-
-# Create a short beep sound file if it doesn't exist
-def generate_beep_file():
-    frequency = 880  # A5 note
-    duration = 0.1  # seconds
-    sample_rate = 16000
-    t = np.linspace(0, duration, int(duration * sample_rate), False)
-    note = np.sin(2 * np.pi * frequency * t)
-    
-    # Add fade in/out
-    fade_length = int(0.005 * sample_rate)
-    fade_in = np.linspace(0, 1, fade_length)
-    fade_out = np.linspace(1, 0, fade_length)
-    note[:fade_length] *= fade_in
-    note[-fade_length:] *= fade_out
-    
-    audio = note * (2**15 - 1) / np.max(np.abs(note))
-    audio = audio.astype(np.int16)
-    
-    # Save as WAV file
-    with wave.open('notification.wav', 'w') as wav_file:
-        wav_file.setnchannels(1)
-        wav_file.setsampwidth(2)
-        wav_file.setframerate(sample_rate)
-        wav_file.writeframes(audio.tobytes())
-
-# Generate the beep file when the script starts
-generate_beep_file()
-
-# Add this function after generate_beep_file()
-def speak_text(text):
-    client = OpenAI()  # Uses API key from environment variables
-    
-    try:
-        # Generate speech using OpenAI's TTS
-        response = client.audio.speech.create(
-            model="tts-1",
-            voice="onyx",
-            input=text
-        )
-        
-        temp_file = "temp_speech.mp3"
-        temp_wav = "temp_speech.wav"
-        
-        with open(temp_file, 'wb') as f:
-            response.write_to_file(temp_file)
-        
-        # Convert MP3 to WAV first using ffmpeg for Linux systems
-        if os.name == 'posix':
-            try:
-                subprocess.run(['ffmpeg', '-y', '-i', temp_file, temp_wav], 
-                             stdout=subprocess.DEVNULL, 
-                             stderr=subprocess.DEVNULL)
-                # Use -D parameter to specify ALSA device
-                subprocess.run(['aplay', '-D', 'plughw:1,0', temp_wav],  # Modify 1,0 to match your device
-                             stdout=subprocess.DEVNULL, 
-                             stderr=subprocess.DEVNULL)
-                os.remove(temp_wav)
-            except Exception as e:
-                print(f"Error with ffmpeg/aplay: {e}")
-        else:
+    pydantic-ai, openai, googleapiclient and speech_recognition take seconds
+    to import on a Pi, so this runs while the wake-word engine is already
+    listening; the clients are then warmed in the background.
+    """
+    import agent
+    from agent.gmail_tools import get_gmail_client
+    from agent.mailbox_index import get_mailbox_index
+    from agent.tracing import json_log
+    from assistant import Assistant
+    from voice import SpeechCache, StreamingSpeaker, create_speech_to_text
+
+    # Every turn is traced stage by stage; the traces can be logged and the stage latencies scraped
+    if args.trace_log:
+        agent.tracer.log = json_log(args.trace_log)
+
+    # Speech-to-text backend: 'google' (default) or 'vosk' for offline streaming decoding
+    speech_to_text = create_speech_to_text(
+        os.getenv('ASR_BACKEND', 'google'),
+        sample_rate,
+        **({'model_path': os.getenv('VOSK_MODEL_PATH')} if os.getenv('VOSK_MODEL_PATH') else {})
+    )
+
+    # Synthesized PCM for repeated phrases is served from memory/disk instead of the API
+    speech_cache = SpeechCache(
+        os.getenv('TTS_CACHE_DIR', '.tts_cache'),
+        max_memory_bytes=int(os.getenv('TTS_CACHE_MEMORY_MB', '16')) * 2**20,
+        max_disk_bytes=int(os.getenv('TTS_CACHE_DISK_MB', '256')) * 2**20
+    )
+
+    # TTS shares the agent's pooled, kept-alive OpenAI connections (uses API key and OPENAI_BASE_URL
+    # from environment variables); HTTP_KEEPALIVE_SECONDS sets how long idle connections are kept
+    speaker = StreamingSpeaker(agent.clients.openai(), output_stream, model="tts-1", voice="onyx", cache=speech_cache)
+
+    # Stock phrases are synthesized in the background at startup, separated by '|'
+    prewarm_phrases = [
+        phrase.strip()
+        for phrase in os.getenv(
+            'TTS_PREWARM_PHRASES',
+            "Sorry, I didn't catch that.|Draft created.|Okay.|Is there anything else?"
+        ).split('|')
+        if phrase.strip()
+    ]
+
+    def warm_clients():
+        try:
+            speaker.prewarm(prewarm_phrases)
+        except Exception as e:
+            print(f"Error pre-warming speech cache: {e}")
+        # Building the Gmail service parses its discovery document, and the mailbox index's
+        # first sync lists the whole mailbox (seconds); both are skipped until the first
+        # tool call if there is no saved token, since that needs the browser flow
+        client = get_gmail_client()
+        if os.path.exists(client.token_path):
             try:
-                # For Windows, we can use the winmm audio backend with device selection
-                import sounddevice as sd
-                import soundfile as sf
-                
-                # Convert MP3 to WAV for sounddevice compatibility
-                subprocess.run(['ffmpeg', '-y', '-i', temp_file, temp_wav],
-                             stdout=subprocess.DEVNULL,
-                             stderr=subprocess.DEVNULL)
-                
-                # Read the WAV file
-                data, samplerate = sf.read(temp_wav)
-                
-                # Play through specified device (change device number as needed)
-                sd.play(data, samplerate, device=1)  # Modify device number as needed
-                sd.wait()  # Wait until audio is finished playing
-                
-                os.remove(temp_wav)
+                client.service
+                get_mailbox_index().sync()
             except Exception as e:
-                print(f"Error playing audio: {e}")
-                # Fallback to playsound if sounddevice fails
-                try:
-                    playsound(temp_file)
-                except Exception as e:
-                    print(f"Error playing audio with playsound: {e}")
-        
-        os.remove(temp_file)
-    except Exception as e:
-        print(f"Error in text-to-speech: {e}")
-
-def resample_audio(audio_data, original_rate, target_rate):
-    """Resample audio data to target sample rate."""
-    # Calculate resampling ratio
-    ratio = target_rate / original_rate
-    # Calculate new length
-    new_length = int(len(audio_data) * ratio)
-    # Resample using scipy.signal.resample
-    resampled = signal.resample(audio_data, new_length)
-    return resampled.astype(np.int16)
-
-# Modify the Microphone setup to use the supported sample rate instead of Porcupine's rate
-def create_speech_recognizer(device_index, sample_rate):
-    try:
-        mic = sr.Microphone(
-            device_index=device_index,
-            sample_rate=sample_rate,  # Use the device's supported rate
-            chunk_size=1024  # Use a standard chunk size
+                print(f"Error setting up Gmail client or mailbox index: {e}")
+
+    threading.Thread(target=warm_clients, daemon=True).start()
+
+    assistant = Assistant(
+        streams,
+        speech_to_text,
+        speaker,
+        memory=agent.ConversationMemory(
+            max_tokens=int(os.getenv('CONVERSATION_MAX_TOKENS', '2000')),
+            idle_seconds=float(os.getenv('CONVERSATION_IDLE_SECONDS', '600'))
+        ),
+        notification=NOTIFICATION_CUE,
+        speech_cache=speech_cache,
+        preroll_seconds=float(os.getenv('PREROLL_SECONDS', '0.3')),
+        barge_in_preroll_seconds=float(os.getenv('BARGE_IN_PREROLL_SECONDS', '0.6')),
+        vad_threshold_db=float(os.getenv('VAD_THRESHOLD_DB', '9.0')),
+        vad_hangover_ms=int(os.getenv('VAD_HANGOVER_MS', '500')),
+        barge_in_mode=os.getenv('BARGE_IN_MODE', 'speech'),
+        speculation=os.getenv('SPECULATIVE_AGENT', '1') == '1',
+        speculation_max_divergence=float(os.getenv('SPECULATION_MAX_DIVERGENCE', '0')),
+        partial_stable_seconds=float(os.getenv('PARTIAL_STABLE_SECONDS', '0.3')),
+        response_cache_ttl=float(os.getenv('RESPONSE_CACHE_TTL', '300')),
+        intent_classifier=os.getenv('INTENT_CLASSIFIER', '0') == '1',
+        trace_turns=args.trace,
+        wake_word_engine=wake_word_engine
+    )
+
+    if args.metrics_port:
+        agent.start_metrics_server(
+            args.metrics_port,
+            agent.tracer.render_prometheus,
+            agent.tool_metrics.render_prometheus,
+            wake_word_engine.render_prometheus
         )
-        return mic
-    except Exception as e:
-        print(f"Error creating speech recognizer: {e}")
-        return None
+        print(f"Serving metrics on port {args.metrics_port}")
+    return assistant
 
-try:
-    while True:
-        try:
-            # Check if stream is closed or not active and recreate if necessary
-            if audio_stream is None or not audio_stream.is_active():
-                print("Recreating audio stream...")
-                if audio_stream is not None:
-                    try:
-                        audio_stream.stop_stream()
-                        audio_stream.close()
-                    except:
-                        pass
-                
-                audio_stream = create_audio_stream(
-                    pa,
-                    default_input_device,
-                    supported_sample_rate,
-                    int(porcupine.frame_length * supported_sample_rate / porcupine.sample_rate)
-                )
-                
-                if audio_stream is None:
-                    print("Failed to create audio stream. Retrying in 2 seconds...")
-                    time.sleep(2)
-                    continue
-                
-                # Add a small delay after creating the stream
-                time.sleep(0.5)
-
-            # Calculate required input frames based on sample rate ratio
-            input_frame_length = int(porcupine.frame_length * supported_sample_rate / porcupine.sample_rate)
-            pcm = audio_stream.read(input_frame_length, exception_on_overflow=False)
-            pcm = struct.unpack_from("h" * input_frame_length, pcm)
-            
-            # Resample if the rates don't match
-            if supported_sample_rate != porcupine.sample_rate:
-                pcm = resample_audio(
-                    np.array(pcm), 
-                    supported_sample_rate, 
-                    porcupine.sample_rate
-                )
-                
-            # Ensure we have exactly the number of frames Porcupine expects
-            if len(pcm) > porcupine.frame_length:
-                pcm = pcm[:porcupine.frame_length]
-            elif len(pcm) < porcupine.frame_length:
-                pcm = np.pad(pcm, (0, porcupine.frame_length - len(pcm)))
-
-            keyword_index = porcupine.process(pcm)
-            if keyword_index >= 0:
-                print("Hotword detected!")
-                # Play the notification sound using cross-platform method
-                try:
-                    # Might need this on Ubuntu `sudo apt-get install alsa-utils pulseaudio``
-                    playsound('notification.wav')
-                except Exception as e:
-                    print(f"Error playing sound: {e}")
-                    # Fallback for Linux systems if playsound fails
-                    if os.name == 'posix':
-                        try:
-                            subprocess.run(['aplay' if os.system('which aplay') == 0 else 'paplay', 'notification.wav'])
-                        except Exception as e:
-                            print(f"Fallback audio playback failed: {e}")
-
-                # Close the existing stream before creating new one
-                audio_stream.stop_stream()
-                audio_stream.close()
-                
-                # time.sleep(1.0)  # Increase delay to give more time for audio system to stabilize
-                
-                try:
-                    mic = create_speech_recognizer(default_input_device, supported_sample_rate)
-                    if mic is None:
-                        raise Exception("Failed to create microphone instance")
-                        
-                    with mic as source:
-                        # print("Adjusting for ambient noise...")
-                        # recognizer.adjust_for_ambient_noise(source, duration=1.0)
-                        print("Listening...")
-                        try:
-                            audio = recognizer.listen(source, timeout=5, phrase_time_limit=10)
-                            print("Processing speech...")
-                            text = recognizer.recognize_google(audio)
-                            print(f"Recognized Text: {text}")
-                        except sr.WaitTimeoutError:
-                            print("No speech detected within timeout period")
-                            continue
-                        except sr.UnknownValueError:
-                            print("Could not understand audio")
-                            continue
-                        except sr.RequestError as e:
-                            print(f"Could not request results; {e}")
-                            continue
-                    
-                except Exception as e:
-                    print(f"Error during speech recognition: {str(e)}")
-
-
-                # Use the module-style import and extract just the answer text
-                response = agent.process_query_sync(text)
-                returned_text = response.answer
-                print(f"Returned Text: {returned_text}")
-                speak_text(returned_text)  # Speak the response
-
-                # Add automatic follow-up listening if required
-                if response.requires_followup:
-                    print("Listening for follow-up response...")
-                    try:
-                        mic = create_speech_recognizer(default_input_device, supported_sample_rate)
-                        if mic is None:
-                            raise Exception("Failed to create microphone instance for follow-up")
-                            
-                        with mic as source:
-                            print("Adjusting for ambient noise...")
-                            recognizer.adjust_for_ambient_noise(source, duration=0.5)
-                            print("Listening for follow-up...")
-                            try:
-                                audio = recognizer.listen(source, timeout=5, phrase_time_limit=10)
-                                follow_up_text = recognizer.recognize_google(audio)
-                                print(f"Follow-up response: {follow_up_text}")
-                                
-                                # Process the follow-up response
-                                follow_up_response = agent.process_query_sync(follow_up_text)
-                                returned_text = follow_up_response.answer
-                                print(f"Returned Text: {returned_text}")
-                                speak_text(returned_text)
-                            except sr.WaitTimeoutError:
-                                print("No follow-up speech detected within timeout period")
-                            except sr.UnknownValueError:
-                                print("Could not understand follow-up audio")
-                            except sr.RequestError as e:
-                                print(f"Could not request results for follow-up; {e}")
-                    except Exception as e:
-                        print(f"Error during follow-up speech recognition: {str(e)}")
-
-                # After speech recognition is complete, reopen the stream for hotword detection
-                audio_stream = create_audio_stream(
-                    pa,
-                    default_input_device,
-                    supported_sample_rate,
-                    int(porcupine.frame_length * supported_sample_rate / porcupine.sample_rate)
-                )
-                if audio_stream is None:
-                    print("Failed to reopen audio stream. Retrying...")
-                    time.sleep(1)
-                    continue
-
-        except OSError as e:
-            print(f"Audio stream error: {e}")
-            # Close the stream if it exists
-            if audio_stream is not None:
-                try:
-                    audio_stream.stop_stream()
-                    audio_stream.close()
-                except:
-                    pass
-            audio_stream = None
-            time.sleep(2)  # Increased wait time before retrying
-            continue
-finally:
-    if audio_stream is not None:
-        audio_stream.stop_stream()
-        audio_stream.close()
-    porcupine.delete()
-    pa.terminate()
\ No newline at end of file
+def main():
+    # Load environment variables from .env file
+    load_dotenv()
+    args = parse_args()
+
+    pa = pyaudio.PyAudio()  # Initialize PyAudio first
+    if args.list_devices:
+        list_devices(pa)
+        pa.terminate()
+        return
+    input_devices = find_input_devices(pa)
+
+    # Every microphone is captured at the first one's default rate, so utterances from any
+    # of them can go through the same endpointer and speech-to-text backend
+    device_info = pa.get_device_info_by_index(input_devices[0])
+    supported_sample_rate = int(device_info['defaultSampleRate'])
+
+    # One Porcupine instance per microphone, each listening for that device's keywords
+    streams = []
+    for device in input_devices:
+        paths = keyword_paths(device)
+        porcupine = pvporcupine.create(access_key=os.getenv('ACCESS_KEY'), keyword_paths=paths)
+
+        # Check if the device's sample rate matches Porcupine's required rate
+        if supported_sample_rate != porcupine.sample_rate:
+            print(f"Warning: Device sample rate ({supported_sample_rate}) differs from Porcupine's required rate ({porcupine.sample_rate})")
+            # You might need to use a different device or configure your system's audio settings
+
+        # Calculate required input frames based on sample rate ratio
+        input_frame_length = int(porcupine.frame_length * supported_sample_rate / porcupine.sample_rate)
+
+        # The capture stream is opened once and stays open for the life of the process
+        streams.append(WakeStream(
+            f"{device}:{pa.get_device_info_by_index(device)['name']}",
+            PyAudioInput(pa, device, supported_sample_rate, input_frame_length),
+            porcupine,
+            keywords=[keyword_name(path) for path in paths],
+            vad_threshold_db=float(os.getenv('VAD_THRESHOLD_DB', '9.0')),
+            echo_margin_db=float(os.getenv('ECHO_MARGIN_DB', '6.0'))
+        ))
+
+    output_device = os.getenv('OUTPUT_DEVICE_INDEX')
+    output_stream = create_output_stream(
+        pa,
+        int(output_device) if output_device else None,
+        PCM_SAMPLE_RATE
+    )
+    if output_stream is None:
+        # Without it every answer would fail in the playback worker and nothing would be spoken
+        print("Failed to open audio output stream. Exiting.")
+        sys.exit(1)
+
+    # Porcupine starts listening before anything else is imported. A wake word heard while the
+    # rest is loading gets its beep right away, and the audio after it is buffered in a bus
+    # subscription until the assistant can transcribe and answer it
+    startup_wakes = []
+
+    def on_startup_wake(stream, keyword, detected_at):
+        if startup_wakes:
+            return
+        print(f"Hotword '{keyword}' detected on {stream.name} while starting up")
+        startup_wakes.append((stream, detected_at, stream.audio_bus.subscribe(
+            preroll_seconds=float(os.getenv('PREROLL_SECONDS', '0.3'))
+        )))
+        threading.Thread(target=output_stream.write, args=(NOTIFICATION_CUE,), daemon=True).start()
+
+    if not all([stream.start_capture() for stream in streams]):
+        print("Failed to initialize audio stream. Exiting.")
+        sys.exit(1)
+    wake_word_engine = WakeWordEngine(streams)
+    wake_word_engine.start(lambda stream, pcm, decisions: None, on_startup_wake)
+    print(f"Listening for the wake word {time.monotonic() - STARTED_AT:.2f} s after start")
+
+    assistant = build_assistant(args, streams, wake_word_engine, output_stream, supported_sample_rate)
+    print(f"Assistant ready {time.monotonic() - STARTED_AT:.2f} s after start")
+
+    try:
+        asyncio.run(assistant.run(startup_wakes))
+    finally:
+        assistant.close()
+        output_stream.stop_stream()
+        output_stream.close()
+        for stream in streams:
+            stream.wake_engine.delete()
+        pa.terminate()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,34 @@
+from .asr import SpeechRecognitionError, SpeechToText, create_speech_to_text
+from .bus import AudioBus, BusSubscription
+from .capture import PcmReader, PyAudioInput
+from .cues import NOTIFICATION_CUE, beep
+from .echo import BargeInDetector, EchoGate
+from .resample import StreamingResampler
+from .tts import PCM_SAMPLE_RATE, SpeechCache, SpeechQueue, StreamingSpeaker
+from .vad import Endpointer, SpeechTimeoutError, VoiceActivityDetector
+from .wake import WakeStream, WakeWordEngine, keyword_name
+
+__all__ = [
+    'AudioBus',
+    'BargeInDetector',
+    'BusSubscription',
+    'EchoGate',
+    'Endpointer',
+    'NOTIFICATION_CUE',
+    'PCM_SAMPLE_RATE',
+    'PcmReader',
+    'PyAudioInput',
+    'SpeechCache',
+    'SpeechQueue',
+    'SpeechRecognitionError',
+    'SpeechTimeoutError',
+    'SpeechToText',
+    'StreamingResampler',
+    'StreamingSpeaker',
+    'VoiceActivityDetector',
+    'WakeStream',
+    'WakeWordEngine',
+    'beep',
+    'create_speech_to_text',
+    'keyword_name',
+]
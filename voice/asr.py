@@ -0,0 +1,117 @@
+import json
+
+
+class SpeechRecognitionError(Exception):
+    """The speech-to-text service could not be reached or rejected the request"""
+
+
+class SpeechToText:
+    """Base interface for speech-to-text backends.
+
+    Audio is pushed in as it is captured so streaming backends can decode
+    while the user is still talking; finish() then only has to flush the
+    tail of the utterance.
+    """
+
+    name = 'base'
+
+    def __init__(self, sample_rate: int, sample_width: int = 2):
+        self.sample_rate = sample_rate
+        self.sample_width = sample_width
+
+    def start(self):
+        """Begin a new utterance, discarding any previous state"""
+
+    def accept(self, data: bytes) -> str:
+        """Feed raw int16 PCM and return the current partial transcript"""
+        raise NotImplementedError
+
+    def finish(self) -> str:
+        """Return the final transcript, or an empty string if nothing was understood"""
+        raise NotImplementedError
+
+    def transcribe(self, data: bytes) -> str:
+        """Decode a complete utterance in one call"""
+        self.start()
+        self.accept(data)
+        return self.finish()
+
+
+class GoogleSpeechToText(SpeechToText):
+    """Buffers the utterance and sends it to the Google Web Speech API at the end"""
+
+    name = 'google'
+
+    def __init__(self, sample_rate: int, sample_width: int = 2):
+        super().__init__(sample_rate, sample_width)
+        import speech_recognition as sr
+        self._sr = sr
+        self._recognizer = sr.Recognizer()
+        self._buffer = bytearray()
+
+    def start(self):
+        self._buffer.clear()
+
+    def accept(self, data: bytes) -> str:
+        self._buffer += data
+        return ""
+
+    def finish(self) -> str:
+        audio = self._sr.AudioData(bytes(self._buffer), self.sample_rate, self.sample_width)
+        self._buffer.clear()
+        try:
+            return self._recognizer.recognize_google(audio)
+        except self._sr.UnknownValueError:
+            return ""
+        except self._sr.RequestError as e:
+            raise SpeechRecognitionError(str(e)) from e
+
+
+class VoskSpeechToText(SpeechToText):
+    """Offline streaming recognizer using Vosk (Kaldi) on the CPU"""
+
+    name = 'vosk'
+
+    def __init__(self, sample_rate: int, sample_width: int = 2, model_path: str = 'model'):
+        super().__init__(sample_rate, sample_width)
+        import vosk
+        vosk.SetLogLevel(-1)
+        self._vosk = vosk
+        self._model = vosk.Model(model_path)
+        self.start()
+
+    def start(self):
+        self._recognizer = self._vosk.KaldiRecognizer(self._model, self.sample_rate)
+        self._segments = []
+
+    def accept(self, data: bytes) -> str:
+        if self._recognizer.AcceptWaveform(data):
+            # Vosk closed a segment at an internal pause
+            text = json.loads(self._recognizer.Result()).get('text', '')
+            if text:
+                self._segments.append(text)
+            partial = ''
+        else:
+            partial = json.loads(self._recognizer.PartialResult()).get('partial', '')
+        return ' '.join(self._segments + ([partial] if partial else []))
+
+    def finish(self) -> str:
+        text = json.loads(self._recognizer.FinalResult()).get('text', '')
+        if text:
+            self._segments.append(text)
+        return ' '.join(self._segments)
+
+
+BACKENDS = {
+    GoogleSpeechToText.name: GoogleSpeechToText,
+    VoskSpeechToText.name: VoskSpeechToText,
+}
+
+
+def create_speech_to_text(name: str, sample_rate: int, **options) -> SpeechToText:
+    """Build a backend by name ('google' or 'vosk')"""
+    try:
+        backend = BACKENDS[name]
+    except KeyError:
+        raise ValueError(f"Unknown ASR backend '{name}', expected one of {sorted(BACKENDS)}")
+    return backend(sample_rate, **options)
@@ -0,0 +1,97 @@
+import threading
+import time
+from collections import deque
+
+
+class BusSubscription:
+    """One consumer's view of the audio bus.
+
+    Exposes the same read(num_frames, exception_on_overflow) call as a
+    PyAudio stream so PcmReader and speech_recognition can use it unchanged.
+    """
+
+    def __init__(self, bus, max_blocks: int, timeout: float):
+        self._bus = bus
+        self._blocks = deque(maxlen=max_blocks)
+        self._pending = bytearray()
+        self._ready = threading.Condition()
+        self.timeout = timeout
+        self.dropped = 0
+        self.last_block_time = None  # time.monotonic() at which the newest block read was published
+        self.preroll_blocks = 0  # blocks from before subscribe() the subscription started with
+
+    def _put(self, published: float, data: bytes):
+        with self._ready:
+            if len(self._blocks) == self._blocks.maxlen:
+                self.dropped += 1
+            self._blocks.append((published, data))
+            self._ready.notify()
+
+    def read(self, num_frames: int, exception_on_overflow: bool = False) -> bytes:
+        """Block until num_frames int16 samples are available and return them"""
+        size = num_frames * self._bus.sample_width
+        while len(self._pending) < size:
+            with self._ready:
+                if not self._ready.wait_for(lambda: self._blocks, self.timeout):
+                    raise OSError("No audio received from capture stream")
+                self.last_block_time, block = self._blocks.popleft()
+                if not self._pending and len(block) == size:
+                    # Reads of exactly one capture block (PcmReader's) get the block itself, without a copy
+                    return block
+                self._pending += block
+        data = bytes(self._pending[:size])
+        del self._pending[:size]
+        return data
+
+    def clear(self):
+        """Discard everything queued, e.g. audio captured while a turn was running"""
+        with self._ready:
+            self._blocks.clear()
+            self._pending.clear()
+
+    def close(self):
+        self._bus.unsubscribe(self)
+
+
+class AudioBus:
+    """Fans out blocks from a single capture stream to any number of subscribers.
+
+    The bus also keeps a short history of recent blocks so a new subscriber
+    can start with pre-roll audio captured before it subscribed.
+    """
+
+    def __init__(self, sample_rate: int, block_length: int, history_seconds: float = 2.0, sample_width: int = 2):
+        self.sample_rate = sample_rate
+        self.block_length = block_length
+        self.sample_width = sample_width
+        self._history = deque(maxlen=max(1, int(history_seconds * sample_rate / block_length)))
+        self._subscribers = []
+        self._lock = threading.Lock()
+
+    def publish(self, data: bytes):
+        """Called from the capture thread with each new block"""
+        published = time.monotonic()
+        with self._lock:
+            self._history.append((published, data))
+            subscribers = list(self._subscribers)
+        for subscription in subscribers:
+            subscription._put(published, data)
+
+    def subscribe(self, preroll_seconds: float = 0.0, max_seconds: float = 10.0, timeout: float = 2.0) -> BusSubscription:
+        """Start receiving blocks, optionally seeded with the last preroll_seconds of audio"""
+        max_blocks = max(1, int(max_seconds * self.sample_rate / self.block_length))
+        subscription = BusSubscription(self, max_blocks, timeout)
+        preroll_blocks = int(round(preroll_seconds * self.sample_rate / self.block_length))
+        with self._lock:
+            if preroll_blocks:
+                preroll = list(self._history)[-preroll_blocks:]
+                subscription.preroll_blocks = len(preroll)
+                for published, data in preroll:
+                    subscription._put(published, data)
+            self._subscribers.append(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: BusSubscription):
+        with self._lock:
+            if subscription in self._subscribers:
+                self._subscribers.remove(subscription)
@@ -0,0 +1,70 @@
+import numpy as np
+
+
+class PcmReader:
+    """Reads int16 blocks from a PyAudio stream (or an audio bus subscription) as numpy arrays.
+
+    Each read is reinterpreted with np.frombuffer: no tuple of Python ints and
+    no copy, so the steady state does not allocate beyond the bytes object
+    the stream itself returns. The array is read-only and stays valid after
+    later reads; recent history for pre-roll is kept by the AudioBus.
+    """
+
+    def __init__(self, stream, block_length: int):
+        self.stream = stream
+        self.block_length = block_length
+
+    def read(self) -> np.ndarray:
+        """Read one block and return it as an int16 view of the bytes read"""
+        data = self.stream.read(self.block_length, exception_on_overflow=False)
+        return np.frombuffer(data, dtype=np.int16)
+
+
+class PyAudioInput:
+    """The capture device as a PyAudio callback stream that hands every block to on_block.
+
+    The stream runs on PyAudio's own thread; it can be closed and started
+    again if the device goes away.
+    """
+
+    def __init__(self, pa, device_index: int, sample_rate: int, block_length: int):
+        self.pa = pa
+        self.device_index = device_index
+        self.sample_rate = sample_rate
+        self.block_length = block_length
+        self._stream = None
+
+    def start(self, on_block) -> bool:
+        """Open the stream; returns False if the device could not be opened"""
+        import pyaudio
+
+        def callback(in_data, frame_count, time_info, status):
+            on_block(in_data)
+            return (None, pyaudio.paContinue)
+
+        try:
+            self._stream = self.pa.open(
+                rate=self.sample_rate,
+                channels=1,
+                format=pyaudio.paInt16,
+                input=True,
+                frames_per_buffer=self.block_length,
+                input_device_index=self.device_index,
+                stream_callback=callback
+            )
+        except OSError as e:
+            print(f"Error opening audio stream: {e}")
+            self._stream = None
+        return self._stream is not None
+
+    def is_active(self) -> bool:
+        return self._stream is not None and self._stream.is_active()
+
+    def close(self):
+        if self._stream is not None:
+            try:
+                self._stream.stop_stream()
+                self._stream.close()
+            except Exception:
+                pass
+            self._stream = None
@@ -0,0 +1,19 @@
+import numpy as np
+
+from .tts import PCM_SAMPLE_RATE
+
+
+def beep(frequency: float = 880.0, seconds: float = 0.1, sample_rate: int = PCM_SAMPLE_RATE,
+         fade_seconds: float = 0.005) -> bytes:
+    """A full-scale sine tone with faded edges, as 16-bit mono PCM"""
+    t = np.arange(int(seconds * sample_rate)) / sample_rate
+    note = np.sin(2 * np.pi * frequency * t)
+    fade = np.linspace(0, 1, int(fade_seconds * sample_rate))
+    note[:len(fade)] *= fade
+    note[-len(fade):] *= fade[::-1]
+    return (note * (2**15 - 1) / np.max(np.abs(note))).astype(np.int16).tobytes()
+
+
+# Played when the wake word is heard (A5). Computed once at import and kept in memory, so
+# it goes straight into the output stream: no WAV file, player process or decoding per turn
+NOTIFICATION_CUE = beep()
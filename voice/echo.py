@@ -0,0 +1,114 @@
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+from .vad import VoiceActivityDetector
+
+
+class EchoGate:
+    """Reference-signal gate that tells the assistant's own voice apart from the user's.
+
+    The playback path reports every chunk it writes. The gate keeps the
+    speech-band energy of recent output and learns the coupling (level
+    difference between what is played and what the mic picks up) during
+    the first calibration_seconds of each playback. A mic frame is treated
+    as echo unless it is margin_db louder than the loudest recent output
+    frame plus that coupling.
+    """
+
+    def __init__(
+        self,
+        playback_rate: int,
+        window_seconds: float = 0.5,
+        margin_db: float = 6.0,
+        calibration_seconds: float = 0.3,
+    ):
+        self.window_seconds = window_seconds
+        self.margin_db = margin_db
+        self.calibration_seconds = calibration_seconds
+        self.coupling_db = 0.0
+        self._reference_vad = VoiceActivityDetector(playback_rate)
+        self._reference = deque()
+        self._playback_started = None
+        self._lock = threading.Lock()
+
+    def on_playback(self, pcm: bytes):
+        """Record output energy; call with every chunk just before it is written"""
+        now = time.monotonic()
+        energies = self._reference_vad.energies(np.frombuffer(pcm, dtype=np.int16))
+        with self._lock:
+            if not self._reference or now - self._reference[-1][0] > self.window_seconds:
+                self._playback_started = now
+            for energy in energies:
+                self._reference.append((now, energy))
+
+    def reference_db(self, now: float = None):
+        """Loudest output energy within the echo window, or None if nothing was played"""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            while self._reference and now - self._reference[0][0] > self.window_seconds:
+                self._reference.popleft()
+            if not self._reference:
+                return None
+            return max(energy for _, energy in self._reference)
+
+    def is_echo(self, mic_db: float, now: float = None, learn: bool = True) -> bool:
+        """Whether a voiced mic frame is explained by what is being played.
+
+        Only one consumer per mic should learn the coupling; others (e.g. the
+        endpointer, reading the same frames later) pass learn=False.
+        """
+        now = time.monotonic() if now is None else now
+        reference = self.reference_db(now)
+        if reference is None:
+            return False
+        difference = mic_db - reference
+        if now - self._playback_started < self.calibration_seconds:
+            # Assume the start of every playback is pure echo and learn the coupling from it
+            if learn:
+                self.coupling_db += 0.3 * (difference - self.coupling_db)
+            return True
+        if difference < self.coupling_db + self.margin_db:
+            if learn:
+                self.coupling_db += 0.05 * (difference - self.coupling_db)
+            return True
+        return False
+
+
+class BargeInDetector:
+    """Decides from ambient VAD output whether the user is talking over playback.
+
+    Only voiced frames that the EchoGate does not attribute to the
+    assistant's own voice count. Speech onset needs onset_ms worth of them
+    within a window twice that long, which tolerates gaps between syllables.
+    """
+
+    def __init__(self, gate: EchoGate, frame_seconds: float, onset_ms: int = 200):
+        self.gate = gate
+        self.onset_frames = max(1, int(onset_ms / 1000 / frame_seconds))
+        self.last_user_voice = None  # monotonic time of the last voiced frame that was not echo
+        self._recent = deque(maxlen=2 * self.onset_frames)
+
+    def process(self, decisions: np.ndarray, energies: np.ndarray) -> bool:
+        """Feed one block of VAD decisions/energies; True when user speech onset is detected"""
+        now = time.monotonic()
+        triggered = False
+        for voiced, energy in zip(decisions, energies):
+            user = bool(voiced) and not self.gate.is_echo(energy, now)
+            if user:
+                self.last_user_voice = now
+            self._recent.append(user)
+            if sum(self._recent) >= self.onset_frames:
+                triggered = True
+        if triggered:
+            self._recent.clear()
+        return triggered
+
+    def user_voice_recent(self, seconds: float = 1.0) -> bool:
+        """Whether the user (not the echo) was heard recently, e.g. while a hotword was spoken"""
+        return self.last_user_voice is not None and time.monotonic() - self.last_user_voice < seconds
+
+    def reset(self):
+        self._recent.clear()
@@ -0,0 +1,142 @@
+from math import gcd
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+
+def lowpass_filter(num_taps: int, cutoff: float, beta: float = 5.0) -> np.ndarray:
+    """Kaiser-windowed sinc low-pass with unit DC gain; cutoff is relative to Nyquist.
+
+    The same taps as scipy.signal.firwin(num_taps, cutoff, window=('kaiser', beta)),
+    without importing scipy.signal, which takes over a second at startup.
+    """
+    m = np.arange(num_taps) - (num_taps - 1) / 2
+    h = cutoff * np.sinc(cutoff * m) * np.kaiser(num_taps, beta)
+    return h / h.sum()
+
+
+class FrameQueue:
+    """Fixed-capacity sample queue that hands out exactly frame_length samples at a time.
+
+    Frames returned by pop_frames() are views into the backing buffer and are
+    only valid until the next push().
+    """
+
+    def __init__(self, frame_length: int, capacity_frames: int = 8):
+        self.frame_length = frame_length
+        self._buffer = np.zeros(frame_length * capacity_frames, dtype=np.int16)
+        self._start = 0
+        self._end = 0
+
+    def __len__(self):
+        return self._end - self._start
+
+    def push(self, samples: np.ndarray):
+        """Append samples, growing the backing buffer only if it overflows"""
+        # Move the leftover partial frame to the front before writing
+        size = self._end - self._start
+        if self._start:
+            self._buffer[:size] = self._buffer[self._start:self._end]
+            self._start, self._end = 0, size
+        needed = size + len(samples)
+        if needed > len(self._buffer):
+            grown = np.zeros(max(needed, 2 * len(self._buffer)), dtype=np.int16)
+            grown[:size] = self._buffer[:size]
+            self._buffer = grown
+        self._buffer[size:needed] = samples
+        self._end = needed
+
+    def pop_frames(self):
+        """Return every complete frame currently queued"""
+        count = (self._end - self._start) // self.frame_length
+        frames = [
+            self._buffer[i:i + self.frame_length]
+            for i in range(self._start, self._start + count * self.frame_length, self.frame_length)
+        ]
+        self._start += count * self.frame_length
+        return frames
+
+    def clear(self):
+        self._start = 0
+        self._end = 0
+
+
+class StreamingResampler:
+    """Polyphase FIR resampler that carries filter state across blocks.
+
+    Unlike resampling each block independently with an FFT, the tail of every
+    block is kept as history for the next one, so there are no edge artifacts
+    at block boundaries and the output is emitted in exact frame_length chunks.
+    """
+
+    def __init__(self, input_rate: int, output_rate: int, frame_length: int, half_length: int = 10):
+        g = gcd(input_rate, output_rate)
+        self.up = output_rate // g
+        self.down = input_rate // g
+        self.input_rate = input_rate
+        self.output_rate = output_rate
+        self._frames = FrameQueue(frame_length)
+
+        if self.up == self.down:
+            self._phases = None
+            self._taps = 0
+        else:
+            # Same anti-aliasing filter design as scipy.signal.resample_poly
+            max_rate = max(self.up, self.down)
+            num_taps = 2 * half_length * max_rate + 1
+            h = lowpass_filter(num_taps, 1.0 / max_rate, 5.0) * self.up
+            self._taps = -(-num_taps // self.up)
+            h = np.pad(h, (0, self._taps * self.up - num_taps))
+            # phases[p][i] == h[p + i * up]
+            self._phases = h.reshape(self._taps, self.up).T.copy()
+            self._tap_offsets = np.arange(self._taps)
+            self._reversed_taps = self._phases[0][::-1].copy()
+        self.reset()
+
+    @property
+    def frame_length(self):
+        return self._frames.frame_length
+
+    def reset(self):
+        """Drop filter history and any queued output, e.g. after reopening the stream"""
+        self._history = np.zeros(max(self._taps - 1, 0), dtype=np.float64)
+        self._position = 0  # next output position, in upsampled units from the block start
+        self._frames.clear()
+
+    def _filter(self, block: np.ndarray) -> np.ndarray:
+        block_length = len(block)
+        span = block_length * self.up
+        if self._position >= span:
+            self._position -= span
+            self._history = np.concatenate((self._history, block))[-(self._taps - 1):]
+            return np.empty(0, dtype=np.int16)
+
+        buffer = np.concatenate((self._history, block))
+        count = -(-(span - self._position) // self.down)
+        if self.up == 1:
+            # Integer decimation (e.g. 48 kHz -> 16 kHz): one phase, so a strided
+            # window view avoids gathering a copy of every tap window
+            windows = sliding_window_view(buffer, self._taps)
+            windows = windows[self._position:self._position + count * self.down:self.down]
+            output = windows @ self._reversed_taps
+        else:
+            positions = self._position + self.down * np.arange(count)
+            input_index = positions // self.up + (self._taps - 1)
+            windows = buffer[input_index[:, None] - self._tap_offsets]
+            output = np.einsum('ij,ij->i', windows, self._phases[positions % self.up])
+
+        self._position += count * self.down - span
+        self._history = buffer[len(buffer) - (self._taps - 1):]
+        return np.clip(np.rint(output), -32768, 32767).astype(np.int16)
+
+    def process(self, block) -> list:
+        """Feed a block of input samples and return all complete output frames"""
+        block = np.asarray(block)
+        if self._phases is None:
+            # Passthrough: a block that is already one whole frame needs no copy
+            if not len(self._frames) and len(block) == self.frame_length:
+                return [block]
+            self._frames.push(block)
+        else:
+            self._frames.push(self._filter(block.astype(np.float64)))
+        return self._frames.pop_frames()
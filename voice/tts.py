@@ -0,0 +1,307 @@
+import hashlib
+import os
+import queue
+import threading
+import time
+from collections import OrderedDict
+
+# OpenAI's 'pcm' response format: raw 24 kHz, 16-bit signed little-endian, mono
+PCM_SAMPLE_RATE = 24000
+PCM_SAMPLE_WIDTH = 2
+
+
+class SpeechCache:
+    """Content-addressed LRU cache of synthesized PCM, in memory and on disk.
+
+    Entries are keyed by a hash of (text, model, voice). Both tiers are
+    bounded by size and evict the least recently used entries; disk recency
+    is tracked through file modification times so it survives restarts.
+    """
+
+    def __init__(self, directory: str = None, max_memory_bytes: int = 16 * 2**20, max_disk_bytes: int = 256 * 2**20):
+        self.directory = directory
+        self.max_memory_bytes = max_memory_bytes
+        self.max_disk_bytes = max_disk_bytes
+        self.hits = 0
+        self.misses = 0
+        self._memory = OrderedDict()
+        self._memory_bytes = 0
+        self._lock = threading.Lock()
+        self._disk_bytes = 0
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+            self._disk_bytes = sum(entry.stat().st_size for entry in os.scandir(directory) if entry.is_file())
+
+    @staticmethod
+    def key(text: str, model: str, voice: str) -> str:
+        return hashlib.sha256(f"{model}\0{voice}\0{text}".encode()).hexdigest()
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._memory or bool(self.directory and os.path.exists(self._path(key)))
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.pcm")
+
+    def get(self, key: str):
+        """Return cached PCM for key, or None, updating hit/miss counters"""
+        with self._lock:
+            pcm = self._memory.get(key)
+            if pcm is not None:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return pcm
+            if self.directory and os.path.exists(self._path(key)):
+                with open(self._path(key), 'rb') as f:
+                    pcm = f.read()
+                os.utime(self._path(key))
+                self._remember(key, pcm)
+                self.hits += 1
+                return pcm
+            self.misses += 1
+            return None
+
+    def put(self, key: str, pcm: bytes):
+        with self._lock:
+            self._remember(key, pcm)
+            if self.directory and len(pcm) <= self.max_disk_bytes:
+                path = self._path(key)
+                if not os.path.exists(path):
+                    with open(path, 'wb') as f:
+                        f.write(pcm)
+                    self._disk_bytes += len(pcm)
+                    self._evict_disk()
+
+    def _remember(self, key, pcm):
+        if len(pcm) > self.max_memory_bytes:
+            return
+        if key in self._memory:
+            self._memory_bytes -= len(self._memory.pop(key))
+        self._memory[key] = pcm
+        self._memory_bytes += len(pcm)
+        while self._memory_bytes > self.max_memory_bytes:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= len(evicted)
+
+    def _evict_disk(self):
+        if self._disk_bytes <= self.max_disk_bytes:
+            return
+        entries = sorted(
+            (entry for entry in os.scandir(self.directory) if entry.is_file()),
+            key=lambda entry: entry.stat().st_mtime
+        )
+        for entry in entries:
+            if self._disk_bytes <= self.max_disk_bytes:
+                break
+            self._disk_bytes -= entry.stat().st_size
+            os.remove(entry.path)
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total else 0.0,
+            'memory_entries': len(self._memory),
+            'memory_bytes': self._memory_bytes,
+            'disk_bytes': self._disk_bytes,
+        }
+
+
+class StreamingSpeaker:
+    """Streams synthesized speech from the TTS API straight into an output stream.
+
+    Audio is requested as raw PCM so nothing has to be decoded, written to
+    disk or handed to ffmpeg/aplay; each chunk is written to the persistent
+    output stream as soon as it arrives.
+    """
+
+    def __init__(
+        self,
+        client,
+        output,
+        model: str = "tts-1",
+        voice: str = "onyx",
+        chunk_size: int = 4800,
+        cache: SpeechCache = None,
+    ):
+        self.client = client
+        self.output = output
+        self.model = model
+        self.voice = voice
+        self.chunk_size = chunk_size
+        self.cache = cache
+        self.time_to_first_audio = None
+
+    def stream(self, text: str):
+        """Yield PCM chunks of whole samples, from the cache or as the API returns them"""
+        if self.cache is None:
+            yield from self._synthesize(text)
+            return
+
+        key = SpeechCache.key(text, self.model, self.voice)
+        pcm = self.cache.get(key)
+        if pcm is not None:
+            for offset in range(0, len(pcm), self.chunk_size):
+                yield pcm[offset:offset + self.chunk_size]
+            return
+
+        chunks = []
+        for chunk in self._synthesize(text):
+            chunks.append(chunk)
+            yield chunk
+        # Only complete responses are cached
+        self.cache.put(key, b''.join(chunks))
+
+    def prewarm(self, phrases):
+        """Synthesize phrases into the cache without playing them"""
+        for text in phrases:
+            if SpeechCache.key(text, self.model, self.voice) not in self.cache:
+                for _ in self.stream(text):
+                    pass
+
+    def _synthesize(self, text: str):
+        remainder = b''
+        with self.client.audio.speech.with_streaming_response.create(
+            model=self.model,
+            voice=self.voice,
+            input=text,
+            response_format="pcm"
+        ) as response:
+            for chunk in response.iter_bytes(self.chunk_size):
+                if remainder:
+                    chunk = remainder + chunk
+                # Only whole samples can be written; keep a dangling byte for the next chunk
+                usable = len(chunk) - len(chunk) % PCM_SAMPLE_WIDTH
+                remainder = chunk[usable:]
+                if usable:
+                    yield chunk[:usable]
+
+    def speak(self, text: str):
+        """Synthesize and play text, returning seconds until the first audio was written"""
+        started = time.monotonic()
+        self.time_to_first_audio = None
+        for chunk in self.stream(text):
+            if self.time_to_first_audio is None:
+                self.time_to_first_audio = time.monotonic() - started
+            self.output.write(chunk)
+        return self.time_to_first_audio
+
+
+class SpeechQueue:
+    """Speaks sentences in order while later ones are still being generated.
+
+    One worker thread synthesizes each queued sentence as soon as it arrives
+    and another plays them back in order, so the next sentence is usually
+    already downloaded when the current one finishes playing. Playback is
+    written in short slices so cancel() can silence it mid-sentence.
+    on_span, if given, is called from the worker threads with
+    (name, start, end) in time.monotonic() seconds for the synthesis and
+    the playback of every sentence.
+    """
+
+    def __init__(self, speaker: StreamingSpeaker, on_playback=None, slice_seconds: float = 0.02, on_span=None):
+        self.speaker = speaker
+        self.on_playback = on_playback
+        self.on_span = on_span
+        self.slice_bytes = int(slice_seconds * PCM_SAMPLE_RATE) * PCM_SAMPLE_WIDTH
+        self.time_to_first_audio = None
+        self.first_audio_at = None  # time.monotonic() when the first slice was played
+        self.cancel_latency = None  # seconds from cancel() until the last slice finished
+        self._started = None
+        self._cancelled_at = None
+        self._generation = 0
+        self._sentences = queue.Queue()
+        self._playback = queue.Queue()
+        threading.Thread(target=self._synthesize_worker, daemon=True).start()
+        threading.Thread(target=self._playback_worker, daemon=True).start()
+
+    def put(self, text: str):
+        """Queue a sentence for synthesis and playback"""
+        if self._started is None:
+            self._started = time.monotonic()
+            self.time_to_first_audio = None
+            self.first_audio_at = None
+        self._sentences.put((self._generation, text))
+
+    def play(self, pcm: bytes):
+        """Play raw PCM, such as a cue, after anything already queued and wait until it has been played"""
+        chunks = queue.Queue()
+        chunks.put(pcm)
+        chunks.put(None)
+        self._playback.put((self._generation, chunks, None))
+        self._playback.join()
+
+    def is_speaking(self) -> bool:
+        """Whether anything is queued, being synthesized or being played"""
+        return bool(self._sentences.unfinished_tasks or self._playback.unfinished_tasks)
+
+    def cancel(self):
+        """Stop playback as soon as the current slice ends and drop everything queued"""
+        self._cancelled_at = time.monotonic()
+        self.cancel_latency = None
+        self._generation += 1
+
+    def reset_timing(self):
+        """Forget the previous response's timing, so a response that queues nothing reports none"""
+        self._started = None
+        self.time_to_first_audio = None
+        self.first_audio_at = None
+
+    def join(self):
+        """Wait until everything queued has been played (or cancelled), then reset the timing"""
+        self._sentences.join()
+        self._playback.join()
+        self._started = None
+
+    def _synthesize_worker(self):
+        while True:
+            generation, text = self._sentences.get()
+            chunks = queue.Queue()
+            try:
+                if generation != self._generation:
+                    continue
+                self._playback.put((generation, chunks, 'tts.playback'))
+                started = time.monotonic()
+                for chunk in self.speaker.stream(text):
+                    if generation != self._generation:
+                        break
+                    chunks.put(chunk)
+                self._span('tts.synthesize', started)
+            except Exception as e:
+                print(f"Error in text-to-speech: {e}")
+            finally:
+                chunks.put(None)
+                self._sentences.task_done()
+
+    def _playback_worker(self):
+        while True:
+            generation, chunks, span = self._playback.get()
+            started = None
+            try:
+                while generation == self._generation and (chunk := chunks.get()) is not None:
+                    for offset in range(0, len(chunk), self.slice_bytes):
+                        if generation != self._generation:
+                            break
+                        piece = chunk[offset:offset + self.slice_bytes]
+                        if started is None:
+                            started = time.monotonic()
+                        # Cues (span None) are not the answer's first audio
+                        if self._started is not None and self.time_to_first_audio is None and span is not None:
+                            self.first_audio_at = time.monotonic()
+                            self.time_to_first_audio = self.first_audio_at - self._started
+                        if self.on_playback is not None:
+                            self.on_playback(piece)
+                        self.speaker.output.write(piece)
+                if generation != self._generation and self.cancel_latency is None and self._cancelled_at:
+                    self.cancel_latency = time.monotonic() - self._cancelled_at
+                if started is not None and span is not None:
+                    self._span(span, started)
+            except Exception as e:
+                print(f"Error playing speech: {e}")
+            finally:
+                self._playback.task_done()
+
+    def _span(self, name, started):
+        if self.on_span is not None:
+            self.on_span(name, started, time.monotonic())
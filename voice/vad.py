@@ -0,0 +1,161 @@
+from collections import deque
+
+import numpy as np
+
+
+class SpeechTimeoutError(Exception):
+    """No speech started within the listen timeout"""
+
+
+class VoiceActivityDetector:
+    """Spectral-energy voice activity detector with a continuously tracked noise floor.
+
+    Audio is split into fixed frames and the speech-band energy of every frame
+    in a block is computed with one batched FFT. A frame is voiced when its
+    energy is threshold_db above the noise floor (and above min_energy_db).
+    The floor falls quickly, follows unvoiced frames, and drifts very slowly
+    during speech so a sudden change in background noise cannot lock it out.
+    """
+
+    def __init__(
+        self,
+        sample_rate: int,
+        frame_ms: int = 20,
+        threshold_db: float = 9.0,
+        min_energy_db: float = 35.0,
+        band_hz: tuple = (300, 3400),
+    ):
+        self.sample_rate = sample_rate
+        self.frame_length = int(sample_rate * frame_ms / 1000)
+        self.threshold_db = threshold_db
+        self.min_energy_db = min_energy_db
+        self.noise_floor_db = None
+        self._window = np.hanning(self.frame_length).astype(np.float32)
+        frequencies = np.fft.rfftfreq(self.frame_length, 1.0 / sample_rate)
+        self._band = (frequencies >= band_hz[0]) & (frequencies <= band_hz[1])
+        # Normalise so a full-band signal gives roughly its mean-square power
+        self._scale = 2.0 / (self.frame_length * np.sum(self._window ** 2))
+        self._leftover = np.empty(0, dtype=np.int16)
+        self.last_energies = np.empty(0, dtype=np.float32)
+
+    @property
+    def frame_seconds(self):
+        return self.frame_length / self.sample_rate
+
+    def energies(self, samples: np.ndarray) -> np.ndarray:
+        """Speech-band energy in dB for every complete frame, carrying the remainder over"""
+        if len(self._leftover):
+            samples = np.concatenate((self._leftover, samples))
+        count = len(samples) // self.frame_length
+        used = count * self.frame_length
+        self._leftover = samples[used:].copy()
+        if count == 0:
+            return np.empty(0, dtype=np.float32)
+        frames = samples[:used].reshape(count, self.frame_length) * self._window
+        spectrum = np.fft.rfft(frames, axis=1)[:, self._band]
+        power = np.sum(spectrum.real ** 2 + spectrum.imag ** 2, axis=1) * self._scale
+        return 10.0 * np.log10(power + 1e-10)
+
+    def process(self, samples: np.ndarray) -> np.ndarray:
+        """Return one voiced/unvoiced decision per complete frame and update the noise floor"""
+        energies = self.energies(samples)
+        self.last_energies = energies
+        decisions = np.empty(len(energies), dtype=bool)
+        floor = self.noise_floor_db
+        for i, energy in enumerate(energies):
+            if floor is None:
+                floor = energy
+            voiced = energy > max(floor + self.threshold_db, self.min_energy_db)
+            if energy < floor:
+                floor += 0.2 * (energy - floor)
+            elif not voiced:
+                floor += 0.05 * (energy - floor)
+            else:
+                floor += 0.001 * (energy - floor)
+            decisions[i] = voiced
+        self.noise_floor_db = floor
+        return decisions
+
+
+class Endpointer:
+    """Captures one utterance from a stream using VoiceActivityDetector decisions.
+
+    Speech starts after onset_ms of consecutive voiced frames and ends after
+    hangover_ms of consecutive unvoiced frames, or at phrase_time_limit.
+    """
+
+    def __init__(
+        self,
+        vad: VoiceActivityDetector,
+        block_length: int,
+        hangover_ms: int = 500,
+        onset_ms: int = 60,
+        preroll_ms: int = 300,
+    ):
+        self.vad = vad
+        self.block_length = block_length
+        self.hangover_frames = max(1, int(hangover_ms / 1000 / vad.frame_seconds))
+        self.onset_frames = max(1, int(onset_ms / 1000 / vad.frame_seconds))
+        self.preroll_blocks = max(1, int(preroll_ms / 1000 * vad.sample_rate / block_length))
+        self.end_seconds = None  # stream time at which the last utterance was endpointed
+
+    def listen(
+        self,
+        stream,
+        timeout: float = 5.0,
+        phrase_time_limit: float = 10.0,
+        on_audio=None,
+        preroll_blocks: int = 0,
+        is_echo=None,
+    ) -> bytes:
+        """Read blocks from stream until an utterance ends and return its PCM.
+
+        on_audio is called with every block read, so a streaming ASR backend
+        can decode while the utterance is still being captured. The first
+        preroll_blocks blocks are audio from before listening started (e.g.
+        the end of the wake word): they are kept at the start of the
+        utterance but cannot start it, and do not count towards the timeout.
+        is_echo(energy_db), if given, marks voiced frames that are the
+        assistant's own playback (such as the cue), which cannot start it either.
+        """
+        preroll = deque(maxlen=self.preroll_blocks + preroll_blocks)
+        utterance = []
+        started = False
+        voiced_run = unvoiced_run = 0
+        elapsed = phrase_elapsed = 0.0
+        blocks = 0
+        while True:
+            data = stream.read(self.block_length, exception_on_overflow=False)
+            if on_audio is not None:
+                on_audio(data)
+            block_seconds = len(data) / 2 / self.vad.sample_rate
+            blocks += 1
+            decisions = self.vad.process(np.frombuffer(data, dtype=np.int16))
+            if blocks <= preroll_blocks:
+                preroll.append(data)
+                continue
+            elapsed += block_seconds
+
+            if not started:
+                preroll.append(data)
+                if is_echo is not None:
+                    decisions = [
+                        voiced and not is_echo(energy) for voiced, energy in zip(decisions, self.vad.last_energies)
+                    ]
+                for voiced in decisions:
+                    voiced_run = voiced_run + 1 if voiced else 0
+                    if voiced_run >= self.onset_frames:
+                        started = True
+                        utterance.extend(preroll)
+                        break
+                if not started and elapsed >= timeout:
+                    raise SpeechTimeoutError("No speech detected within timeout period")
+                continue
+
+            utterance.append(data)
+            phrase_elapsed += block_seconds
+            for voiced in decisions:
+                unvoiced_run = 0 if voiced else unvoiced_run + 1
+            if unvoiced_run >= self.hangover_frames or phrase_elapsed >= phrase_time_limit:
+                self.end_seconds = elapsed
+                return b''.join(utterance)
@@ -0,0 +1,194 @@
+import os
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, List
+
+import numpy as np
+
+from .bus import AudioBus
+from .capture import PcmReader
+from .echo import BargeInDetector, EchoGate
+from .resample import StreamingResampler
+from .tts import PCM_SAMPLE_RATE
+from .vad import VoiceActivityDetector
+
+
+def keyword_name(path: str) -> str:
+    """Keyword of a Porcupine keyword file, e.g. 'craig-james' for craig-james_en_mac_v3_0_0.ppn"""
+    return os.path.basename(path).split('_')[0]
+
+
+class WakeStream:
+    """One microphone's always-on front end.
+
+    The input publishes into the stream's own bus. The detector worker reads it
+    through a ring buffer, runs the ambient VAD (whose noise floor seeds
+    endpointing) and resamples into the stream's wake engine, which may
+    listen for several keywords. Every stream has its own echo gate, since
+    each mic hears the assistant's voice at a different level.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        audio_input,
+        wake_engine,
+        keywords: List[str] = None,
+        vad_threshold_db: float = 9.0,
+        echo_margin_db: float = 6.0,
+        latency_window: int = 256,
+    ):
+        self.name = name
+        self.audio_input = audio_input
+        self.wake_engine = wake_engine
+        self.keywords = keywords or ['hotword']
+        self.sample_rate = audio_input.sample_rate
+        self.block_length = audio_input.block_length
+        self.audio_bus = AudioBus(self.sample_rate, self.block_length)
+        # Reads blocks as int16 arrays over the captured bytes instead of unpacking tuples
+        self.pcm_reader = PcmReader(None, self.block_length)
+        self.ambient_vad = VoiceActivityDetector(self.sample_rate, threshold_db=vad_threshold_db)
+        # Streaming resampler keeps filter state between reads and emits exact wake engine frames
+        self.resampler = StreamingResampler(self.sample_rate, wake_engine.sample_rate, wake_engine.frame_length)
+        self.echo_gate = EchoGate(PCM_SAMPLE_RATE, margin_db=echo_margin_db)
+        self.barge_in = BargeInDetector(self.echo_gate, self.ambient_vad.frame_seconds)
+        self.detections: Dict[str, int] = {keyword: 0 for keyword in self.keywords}
+        self.cpu_seconds = 0.0
+        self.started = None
+        # Seconds from the block with the wake word being published to its detection
+        self.latencies = deque(maxlen=latency_window)
+
+    def start_capture(self) -> bool:
+        return self.audio_input.start(self.audio_bus.publish)
+
+    def close(self):
+        self.audio_input.close()
+
+
+class WakeWordEngine:
+    """Wake-word detection on any number of WakeStreams, one worker thread per stream.
+
+    Each worker calls on_block(stream, pcm, decisions) with every block and
+    its ambient VAD decisions, and on_wake(stream, keyword, detected_at) when
+    the stream's engine fires. Porcupine (like numpy) releases the GIL while
+    it processes a frame, so the workers run in parallel on separate cores.
+    Per-stream CPU time (the worker's thread clock) and detection latency
+    are kept for sizing hardware. Calling start() again while the workers
+    run only replaces the callbacks, so detection can start before the
+    rest of the assistant exists and be handed over to it without a gap.
+    """
+
+    def __init__(self, streams: List[WakeStream]):
+        if not streams:
+            raise ValueError("At least one input stream is required")
+        self.streams = streams
+        self.stopping = threading.Event()
+        self.on_block: Callable = None
+        self.on_wake: Callable = None
+        self._workers: List[threading.Thread] = []
+
+    def is_running(self) -> bool:
+        return any(worker.is_alive() for worker in self._workers) and not self.stopping.is_set()
+
+    def start(self, on_block: Callable, on_wake: Callable):
+        self.on_block = on_block
+        self.on_wake = on_wake
+        if self.is_running():
+            return
+        self.stopping.clear()
+        self._workers = [
+            threading.Thread(target=self._detect, args=(stream,), name=f"wake-{stream.name}", daemon=True)
+            for stream in self.streams
+        ]
+        for worker in self._workers:
+            worker.start()
+
+    def stop(self, timeout: float = 3.0):
+        """Stop the workers so nothing touches the wake engines after they are deleted"""
+        self.stopping.set()
+        for worker in self._workers:
+            worker.join(timeout)
+
+    def _detect(self, stream: WakeStream):
+        subscription = stream.audio_bus.subscribe()
+        stream.pcm_reader.stream = subscription
+        stream.started = time.monotonic()
+        cpu_started = time.thread_time() - stream.cpu_seconds
+        while not self.stopping.is_set():
+            try:
+                # Check if the input is closed or not active and reopen it if necessary
+                if not stream.audio_input.is_active():
+                    print(f"Recreating audio stream {stream.name}...")
+                    stream.audio_input.close()
+                    if not stream.start_capture():
+                        print("Failed to create audio stream. Retrying in 2 seconds...")
+                        time.sleep(2)
+                        continue
+                    subscription.clear()
+                    stream.resampler.reset()
+
+                pcm = stream.pcm_reader.read()
+                decisions = stream.ambient_vad.process(pcm)
+                self.on_block(stream, pcm, decisions)
+
+                # Resampler returns zero or more frames of exactly wake_engine.frame_length samples
+                for frame in stream.resampler.process(pcm):
+                    index = stream.wake_engine.process(frame)
+                    if index >= 0:
+                        detected_at = time.monotonic()
+                        keyword = stream.keywords[index]
+                        stream.detections[keyword] += 1
+                        stream.latencies.append(detected_at - subscription.last_block_time)
+                        self.on_wake(stream, keyword, detected_at)
+                        break
+
+            except OSError as e:
+                print(f"Audio stream error on {stream.name}: {e}")
+                stream.audio_input.close()
+                time.sleep(2)  # Increased wait time before retrying
+            finally:
+                stream.cpu_seconds = time.thread_time() - cpu_started
+
+    def stats(self) -> Dict[str, dict]:
+        """Per stream: share of a core used, detections per keyword and detection latency"""
+        now = time.monotonic()
+        stats = {}
+        for stream in self.streams:
+            latencies = list(stream.latencies)
+            elapsed = now - stream.started if stream.started else 0.0
+            stats[stream.name] = {
+                'cpu_percent': 100 * stream.cpu_seconds / elapsed if elapsed else 0.0,
+                'detections': dict(stream.detections),
+                'latency_p50_seconds': float(np.percentile(latencies, 50)) if latencies else None,
+                'latency_p95_seconds': float(np.percentile(latencies, 95)) if latencies else None,
+            }
+        return stats
+
+    def render_prometheus(self) -> str:
+        lines = [
+            '# HELP voice_wake_cpu_seconds_total CPU time used by each wake-word worker.',
+            '# TYPE voice_wake_cpu_seconds_total counter',
+        ]
+        lines += [f'voice_wake_cpu_seconds_total{{stream="{stream.name}"}} {stream.cpu_seconds:.6f}'
+                  for stream in self.streams]
+        lines += [
+            '# HELP voice_wake_detections_total Wake-word detections.',
+            '# TYPE voice_wake_detections_total counter',
+        ]
+        for stream in self.streams:
+            for keyword, count in stream.detections.items():
+                lines.append(f'voice_wake_detections_total{{stream="{stream.name}",keyword="{keyword}"}} {count}')
+        lines += [
+            '# HELP voice_wake_detection_latency_seconds Time from capture of the wake word to its detection.',
+            '# TYPE voice_wake_detection_latency_seconds summary',
+        ]
+        for stream in self.streams:
+            latencies = list(stream.latencies)
+            if latencies:
+                for q in (0.5, 0.95, 0.99):
+                    lines.append(f'voice_wake_detection_latency_seconds{{stream="{stream.name}",quantile="{q}"}} '
+                                 f'{np.percentile(latencies, q * 100):.6f}')
+            lines.append(f'voice_wake_detection_latency_seconds_sum{{stream="{stream.name}"}} {sum(latencies):.6f}')
+            lines.append(f'voice_wake_detection_latency_seconds_count{{stream="{stream.name}"}} {len(latencies)}')
+        return '\n'.join(lines) + '\n'